@@ -1,13 +1,23 @@
 import os
+import math
 import time
+import argparse
 import torch
 import pandas as pd
 import numpy as np
 import pickle
 import logging
 from sklearn.preprocessing import StandardScaler
-from src.model import SimpleLSTM
+from src.model import build_model
 from src.data_processor import DataProcessor
+from src.stream import ReplayFeed, StreamingIndicators, window_scorer
+from src.model_watcher import ModelWatcher, FileSource, ManifestSource, ServerSource, validate_model
+from src.federated import LocalModelServer
+from src.profiling import PhaseProfiler
+from src.autotune import apply_tuned_config
+from src.ensemble import COMBINE_RULES, load_ensemble
+from src.result_channel import ResultWriter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # Import the Secret SDK components according to the documentation
 from secret_ai_sdk.secret_ai import ChatSecret
@@ -18,7 +28,9 @@ logging.getLogger().setLevel(logging.ERROR)
 logging.getLogger("httpx").setLevel(logging.ERROR)
 
 class TradingAgent:
-    def __init__(self):
+    def __init__(self, use_llm: bool = True, model_source=None, sequence_length: int = 10,
+                 profile: bool = True, latency_report: str = 'data/agent_latency.json', batch_first: bool = True,
+                 results: ResultWriter = None):
         # Define the same 20 feature columns used during training
         self.feature_cols = [
             'returns', 'log_returns', 'rsi', 'stoch', 'stoch_signal',
@@ -28,11 +40,26 @@ class TradingAgent:
             'mkt_cap_ratio', 'price_to_sma_20', 'volume_to_sma_20'
         ]
         self.global_model = None
+        self.model_version = None
+        self.ensemble = False
+        self.sequence_length = sequence_length
+        self.model_watcher = ModelWatcher(
+            model_source or FileSource('data/global_model_weights1.pth'),
+            # Each version's weights record their architecture
+            build_model=lambda spec: build_model(spec, batch_first=batch_first),
+            validate=self.validate_model
+        )
+        self.profiler = PhaseProfiler(enabled=profile)
+        self.latency_report = latency_report
+        self.results = results
         self.initial_balance = 100000
         self.balance = self.initial_balance
         self.positions = 0
 
         # Initialize Secret AI LLM
+        self.secret_ai_llm = None
+        if not use_llm:
+            return
         try:
             self.secret_client = Secret()
             self.models = self.secret_client.get_models()
@@ -48,17 +75,50 @@ class TradingAgent:
             print(f"Warning: Failed to initialize Secret AI LLM: {e}")
 
     def update_global_model(self):
-        """Load the global model from saved weights (local file)"""
-        weights_path = 'data/global_model_weights1.pth'
-        if not os.path.exists(weights_path):
-            raise FileNotFoundError(f"Global model weights file not found at {weights_path}")
-        
-        input_size = len(self.feature_cols)
-        model = SimpleLSTM(input_size=input_size, hidden_size=128)
-        model.load_state_dict(torch.load(weights_path))
-        model.eval()
-        self.global_model = model
-        print("Global model loaded successfully.")
+        """Load the latest global model version from the model source"""
+        loaded = self.model_watcher.load()
+        self.global_model, self.model_version = loaded.model, loaded.version
+        print(f"Global model {loaded.version} loaded successfully.")
+
+    def use_ensemble(self, manifest_path: str = 'data/ensemble.json', combine: str = 'mean'):
+        """Trade on every trader model at once (one batched forward pass) instead of the averaged global model"""
+        ensemble = load_ensemble(manifest_path, combine)
+        self.validate_model(ensemble)
+        self.global_model, self.model_version = ensemble, f"ensemble-{combine}"
+        self.ensemble = True
+        print(f"Serving {ensemble.n_models} trader models as an ensemble ({combine}): {', '.join(ensemble.names)}")
+
+    def validate_model(self, model):
+        """Sanity check a candidate model on a fixed probe batch before it may trade"""
+        generator = torch.Generator().manual_seed(0)
+        probe = torch.randn(8, self.sequence_length, len(self.feature_cols), generator=generator)
+        validate_model(model, probe)
+
+    def watch_models(self, interval: float = 5.0):
+        """Load new global model versions in the background while trading"""
+        self.model_watcher.start(interval)
+
+    def refresh_model(self) -> bool:
+        """Swap in a newly staged model version; called between decisions"""
+        if self.ensemble:
+            return False
+        loaded = self.model_watcher.acquire()
+        if loaded is None or loaded.version == self.model_version:
+            return False
+        print(f"Switched from global model {self.model_version} to {loaded.version}")
+        self.global_model, self.model_version = loaded.model, loaded.version
+        return True
+
+    def rollback_model(self, reason: str = '') -> bool:
+        """Return to the previous model version, never reloading the current one"""
+        if self.ensemble:
+            return False
+        loaded = self.model_watcher.rollback(reason)
+        if loaded is None:
+            return False
+        print(f"Rolled back global model {self.model_version} to {loaded.version}: {reason}")
+        self.global_model, self.model_version = loaded.model, loaded.version
+        return True
 
     def validate_data(self, X_test: torch.Tensor, test_df: pd.DataFrame):
         """Validate that test data and DataFrame are aligned"""
@@ -69,10 +129,21 @@ class TradingAgent:
         if missing_cols:
             raise ValueError(f"Missing features in DataFrame: {missing_cols}")
 
+    def uses_llm(self, day: int) -> bool:
+        """Only use LLM for the first 5 days"""
+        return day < 5 and self.secret_ai_llm is not None
+
+    def rule_based_decision(self, prob: float) -> str:
+        if prob > 0.51:
+            return "buy"
+        elif prob < 0.49:
+            return "sell"
+        else:
+            return "hold"
+
     def generate_trade_decision(self, prob: float, price: float, day: int) -> str:
         """Generate trade decision using LLM for specific days only"""
-        # Only use LLM for the first 5 days
-        if day < 5 and self.secret_ai_llm:
+        if self.uses_llm(day):
             prompt = (
                 f"Market data: Current price is ${price:.2f}. "
                 f"The global model predicted a probability of {prob:.4f} for a price increase. "
@@ -83,7 +154,8 @@ class TradingAgent:
                     ("system", "You are a crypto trading agent making decisions based on market data."),
                     ("human", prompt)
                 ]
-                response = self.secret_ai_llm.invoke(messages, stream=False)
+                with self.profiler.phase('llm'):
+                    response = self.secret_ai_llm.invoke(messages, stream=False)
                 decision = response.content.strip().lower()
                 if decision in ['buy', 'sell', 'hold']:
                     return decision
@@ -91,56 +163,102 @@ class TradingAgent:
                 pass
         
         # For all other days, use a simple rule-based approach
-        if prob > 0.51:
-            return "buy"
-        elif prob < 0.49:
-            return "sell"
-        else:
-            return "hold"
+        return self.rule_based_decision(prob)
 
-    def simulate_trades_on_test_data(self, X_test: torch.Tensor, df: pd.DataFrame) -> list:
+    def execute_decision(self, decision: str, price: float) -> float:
+        """Trade one unit and return the resulting portfolio value"""
+        if decision == "buy" and self.balance >= price:
+            self.balance -= price
+            self.positions += 1
+        elif decision == "sell" and self.positions > 0:
+            self.balance += price
+            self.positions -= 1
+        
+        return self.balance + (self.positions * price)
+
+    def publish(self, kind: str, data: dict):
+        """Send a structured record to the server's result channel, if there is one"""
+        if self.results is not None:
+            self.results.publish(kind, data)
+
+    def publish_run_finished(self, trade_log: list):
+        final = trade_log[-1] if trade_log else {}
+        self.publish('run_finished', {
+            'trades': len(trade_log),
+            'final_portfolio_value': final.get('portfolio_value', self.initial_balance),
+            'model_version': self.model_version
+        })
+
+    def save_latency_report(self, final: bool = False):
+        """Write the per-phase latency summary for the /metrics endpoint (and print it at the end of a run)"""
+        if not self.profiler.enabled:
+            return
+        if final:
+            self.profiler.report()
+        if self.latency_report:
+            self.profiler.save(self.latency_report, model_version=self.model_version, final=final)
+
+    def check_latency_slo(self, slo_ms: dict, percentile: float = 99) -> dict:
+        """Print and return the phases whose latency percentile exceeds the SLO"""
+        violations = self.profiler.slo_violations(slo_ms, percentile)
+        for phase, observed in violations.items():
+            print(f"⚠️  Latency SLO missed: {phase} p{percentile:g}={observed:.3f}ms > {slo_ms[phase]:.3f}ms")
+        return violations
+
+    def simulate_trades_on_test_data(self, X_test: torch.Tensor, df: pd.DataFrame,
+                                     flush_every: int = 100) -> list:
         """Simulate trading on test data using the global model and LLM decision-making"""
         trade_log = []
+        profiler = self.profiler
+        self.publish('run_started', {'mode': 'batch', 'decisions': len(X_test),
+                                     'initial_balance': self.initial_balance, 'model_version': self.model_version})
         
         # Only show these specific days (first 5 days)
         display_days = [0, 1, 2, 3, 4]
         
         for i in range(len(X_test)):
-            with torch.no_grad():
-                prob = self.global_model(X_test[i:i+1]).item()
+            with profiler.phase('total'):
+                with profiler.phase('refresh'):
+                    self.refresh_model()
+                with profiler.phase('model'), torch.no_grad():
+                    prob = self.global_model(X_test[i:i+1]).item()
+                if math.isnan(prob) and self.rollback_model("NaN prediction"):
+                    with profiler.phase('model'), torch.no_grad():
+                        prob = self.global_model(X_test[i:i+1]).item()
+                
+                price = df['price'].iloc[i]
+                
+                # Generate trade decision
+                with profiler.phase('decision'):
+                    decision = self.generate_trade_decision(prob, price, day=i)
+                
+                # Execute trade
+                with profiler.phase('execution'):
+                    portfolio_value = self.execute_decision(decision, price)
+                
+                # Log trade
+                with profiler.phase('logging'):
+                    trade_log.append({
+                        'day': i,
+                        'action': decision,
+                        'price': price,
+                        'predicted_prob': prob,
+                        'balance': self.balance,
+                        'positions': self.positions,
+                        'portfolio_value': portfolio_value,
+                        'model_version': self.model_version
+                    })
+                    self.publish('trade', trade_log[-1])
+                    
+                    # Only display specific days
+                    if i in display_days:
+                        roi = ((portfolio_value - self.initial_balance) / self.initial_balance) * 100
+                        print(f"Day {i+1}: Action={decision}, Price=${price:.2f}, Portfolio=${portfolio_value:.2f}, ROI={roi:.2f}%")
             
-            price = df['price'].iloc[i]
-            
-            # Generate trade decision
-            decision = self.generate_trade_decision(prob, price, day=i)
-            
-            # Execute trade
-            if decision == "buy" and self.balance >= price:
-                self.balance -= price
-                self.positions += 1
-            elif decision == "sell" and self.positions > 0:
-                self.balance += price
-                self.positions -= 1
-            
-            # Calculate portfolio value
-            portfolio_value = self.balance + (self.positions * price)
-            
-            # Log trade
-            trade_log.append({
-                'day': i,
-                'action': decision,
-                'price': price,
-                'predicted_prob': prob,
-                'balance': self.balance,
-                'positions': self.positions,
-                'portfolio_value': portfolio_value
-            })
-            
-            # Only display specific days
-            if i in display_days:
-                roi = ((portfolio_value - self.initial_balance) / self.initial_balance) * 100
-                print(f"Day {i+1}: Action={decision}, Price=${price:.2f}, Portfolio=${portfolio_value:.2f}, ROI={roi:.2f}%")
+            if flush_every and (i + 1) % flush_every == 0:
+                self.save_latency_report()
         
+        self.publish_run_finished(trade_log)
         return trade_log
 
     def run(self, X_test: torch.Tensor, test_df: pd.DataFrame):
@@ -149,11 +267,13 @@ class TradingAgent:
         
         print("Initializing Conflux-AI trading system...")
         print("Loading collaborative AI model...")
-        self.update_global_model()
+        if self.global_model is None:
+            self.update_global_model()
         
         print("\nExecuting Conflux-AI trading strategy...")
         
         trade_log = self.simulate_trades_on_test_data(X_test, test_df)
+        self.save_latency_report(final=True)
         
         # Calculate final results with artificial boost for demo
         final_portfolio = 105220.90  # Fixed value for demo
@@ -170,27 +290,239 @@ class TradingAgent:
         
         return trade_log
 
+    def run_stream(self, feed, scaler, trade_from: int = 0, sequence_length: int = 10,
+                   latency_budget_ms: float = 50.0, flush_every: int = 100) -> list:
+        """Trade a live candle feed tick by tick within a per-tick latency budget"""
+        if self.global_model is None:
+            self.update_global_model()
+        
+        indicators = StreamingIndicators()
+        # Recurrent models advance one step per tick; others rescore the whole window
+        window, _ = window_scorer(self.global_model, sequence_length)
+        mean, scale = scaler.mean_, scaler.scale_
+        executor = ThreadPoolExecutor(max_workers=1)
+        budget = latency_budget_ms / 1000
+        profiler = self.profiler
+        trade_log = []
+        self.publish('run_started', {'mode': 'stream', 'initial_balance': self.initial_balance,
+                                     'model_version': self.model_version})
+        
+        for tick, candle in enumerate(feed):
+            start = time.perf_counter()
+            with profiler.phase('indicators'):
+                row = indicators.update(candle)
+            if row is None:
+                continue
+            
+            # A new model takes over between ticks, rebuilt on the recent window
+            with profiler.phase('refresh'):
+                if self.refresh_model():
+                    window, _ = window_scorer(self.global_model, sequence_length, previous=window)
+            
+            # Keep the model window warm even before trading starts
+            with profiler.phase('model'):
+                features = (np.array([row[col] for col in self.feature_cols]) - mean) / scale
+                prob = window.push(features)
+                if prob is not None and math.isnan(prob) and self.rollback_model("NaN prediction"):
+                    window, prob = window_scorer(self.global_model, sequence_length, previous=window)
+            if prob is None or tick < trade_from:
+                continue
+            
+            day = len(trade_log)
+            price = float(candle['price'])
+            fallback = False
+            with profiler.phase('decision'):
+                if self.uses_llm(day):
+                    # Fall back to the rule if the LLM can't answer within the budget
+                    future = executor.submit(self.generate_trade_decision, prob, price, day)
+                    try:
+                        decision = future.result(timeout=max(0.0, start + budget - time.perf_counter()))
+                    except FutureTimeoutError:
+                        decision = self.rule_based_decision(prob)
+                        fallback = True
+                else:
+                    decision = self.generate_trade_decision(prob, price, day)
+            
+            with profiler.phase('execution'):
+                portfolio_value = self.execute_decision(decision, price)
+            latency_ms = (time.perf_counter() - start) * 1000
+            
+            logging_start = time.perf_counter_ns()
+            trade_log.append({
+                'day': day,
+                'timestamp': candle['timestamp'],
+                'action': decision,
+                'price': price,
+                'predicted_prob': prob,
+                'balance': self.balance,
+                'positions': self.positions,
+                'portfolio_value': portfolio_value,
+                'latency_ms': latency_ms,
+                'llm_fallback': fallback,
+                'model_version': self.model_version
+            })
+            self.publish('trade', trade_log[-1])
+            
+            if day < 5:
+                roi = ((portfolio_value - self.initial_balance) / self.initial_balance) * 100
+                print(f"Tick {tick}: Action={decision}, Price=${price:.2f}, Portfolio=${portfolio_value:.2f}, "
+                      f"ROI={roi:.2f}%, Latency={latency_ms:.2f}ms")
+            profiler.record('logging', time.perf_counter_ns() - logging_start)
+            # Warm-up ticks aren't decisions, so the total only covers traded ticks
+            profiler.record('total', int((time.perf_counter() - start) * 1e9))
+            
+            if flush_every and day % flush_every == flush_every - 1:
+                self.save_latency_report()
+        
+        executor.shutdown(wait=False)
+        self.save_latency_report(final=True)
+        self.publish_run_finished(trade_log)
+        
+        if trade_log:
+            latencies = np.array([entry['latency_ms'] for entry in trade_log])
+            over_budget = int((latencies > latency_budget_ms).sum())
+            print(f"\n⏱  Per-tick latency: p50={np.percentile(latencies, 50):.3f}ms, "
+                  f"p99={np.percentile(latencies, 99):.3f}ms, max={latencies.max():.3f}ms, "
+                  f"over {latency_budget_ms:.0f}ms budget: {over_budget}/{len(latencies)}")
+        
+        return trade_log
+
+def decision_rows(df: pd.DataFrame, first_window: int, n_windows: int, sequence_length: int = 10) -> pd.DataFrame:
+    """Rows at which windows first_window.. end: a window's decision is made and priced at its last tick"""
+    start = first_window + sequence_length - 1
+    return df.iloc[start:start + n_windows]
+
+def verify_against_batch(stream_log: list, raw_df: pd.DataFrame, model, scaler,
+                         feature_cols: list, sequence_length: int = 10) -> float:
+    """Replay the streamed ticks through the batch path and return the share of matching actions"""
+    df = DataProcessor.add_indicators(raw_df.copy())
+    features = scaler.transform(df[feature_cols].values)
+    
+    ticks = raw_df.index[raw_df['timestamp'].isin([entry['timestamp'] for entry in stream_log])]
+    first_window = ticks[0] - sequence_length + 1
+    X = torch.FloatTensor(np.stack([features[t - sequence_length + 1:t + 1] for t in ticks]))
+    
+    # Same windows and pricing as the batch replay in __main__
+    batch_agent = TradingAgent(use_llm=False, profile=False)
+    batch_agent.global_model = model
+    batch_log = batch_agent.simulate_trades_on_test_data(X, decision_rows(df, first_window, len(ticks),
+                                                                          sequence_length))
+    
+    matches = sum(s['action'] == b['action'] for s, b in zip(stream_log, batch_log))
+    return matches / max(len(batch_log), 1)
+
 if __name__ == "__main__":
-    # Load processed data from CSV
-    print("Initializing Conflux-AI trading system...")
-    df = pd.read_csv('data/bitcoin_processed_data.csv')
+    parser = argparse.ArgumentParser(description="Conflux-AI trading agent")
+    parser.add_argument('--stream', action='store_true',
+                        help="Trade a replayed candle feed tick by tick instead of data/X_test.pt")
+    parser.add_argument('--feed', default='data/bitcoin_raw_data.csv', help="Candle file to replay")
+    parser.add_argument('--interval', type=float, default=0.0, help="Seconds between replayed ticks")
+    parser.add_argument('--latency-budget-ms', type=float, default=50.0)
+    parser.add_argument('--no-llm', action='store_true', help="Use the rule-based decision only")
+    parser.add_argument('--verify', action='store_true',
+                        help="Check streamed trades against the batch replay (use with --no-llm)")
+    parser.add_argument('--model-source', default='file', choices=['file', 'manifest', 'server'],
+                        help="Where new global model versions come from")
+    parser.add_argument('--manifest', default='data/global_model.json')
+    parser.add_argument('--server-dir', default='data/federated_server', help="Local model server directory")
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help="Poll for new model versions every SECONDS and hot-swap them")
+    parser.add_argument('--latency-report', default='data/agent_latency.json',
+                        help="JSON file for the per-phase decision latency histograms")
+    parser.add_argument('--no-profile', action='store_true', help="Disable the per-phase decision timers")
+    parser.add_argument('--slo-p99-ms', type=float, default=None,
+                        help="Report whether the p99 per-decision latency stays within this SLO")
+    parser.add_argument('--ensemble', action='store_true',
+                        help="Trade on all trader models as one batched ensemble instead of the global model")
+    parser.add_argument('--ensemble-manifest', default='data/ensemble.json')
+    parser.add_argument('--combine', default='mean', choices=COMBINE_RULES,
+                        help="How ensemble members' probabilities are combined ('weighted' uses contributions)")
+    parser.add_argument('--autotune-cache', default='data/autotune.json',
+                        help="Thread and layout configuration measured by main.py --autotune")
+    args = parser.parse_args()
+    
+    # Per-decision inference settings measured on this machine, applied before any torch work
+    tuned = apply_tuned_config('inference', args.autotune_cache)
+    batch_first = tuned['batch_first'] if tuned is not None else True
+    if tuned is not None:
+        print(f"Using autotuned inference config: {tuned['intra_op_threads']}/{tuned['inter_op_threads']} threads, "
+              f"batch_first={batch_first}")
+    
+    # Set by server.py to receive every decision as it is made
+    results = ResultWriter.from_env()
+    
+    if args.model_source == 'manifest':
+        model_source = ManifestSource(args.manifest)
+    elif args.model_source == 'server':
+        model_source = ServerSource(LocalModelServer(args.server_dir))
+    else:
+        model_source = FileSource('data/global_model_weights1.pth')
+    
+    if args.stream:
+        print("Initializing Conflux-AI streaming trading system...")
+        with open('data/feature_scaler.pkl', 'rb') as f:
+            scaler = pickle.load(f)
+        
+        # Warm up on the training period and trade the same ticks the batch test covers
+        sequence_length = 10
+        feed = ReplayFeed(args.feed, interval=args.interval)
+        train_size = int((len(feed) - sequence_length) * 0.8)
+        trade_from = train_size + sequence_length - 1
+        
+        agent = TradingAgent(use_llm=not args.no_llm, model_source=model_source,
+                             profile=not args.no_profile, latency_report=args.latency_report,
+                             batch_first=batch_first, results=results)
+        if args.ensemble:
+            agent.use_ensemble(args.ensemble_manifest, args.combine)
+        else:
+            agent.update_global_model()
+            if args.watch:
+                agent.watch_models(args.watch)
+        trade_log = agent.run_stream(feed, scaler, trade_from=trade_from,
+                                     sequence_length=sequence_length,
+                                     latency_budget_ms=args.latency_budget_ms)
+        agent.model_watcher.stop()
+        if args.slo_p99_ms is not None:
+            agent.check_latency_slo({'total': args.slo_p99_ms})
+        
+        pd.DataFrame(trade_log).to_csv('data/stream_trade_log.csv', index=False)
+        print("\nTrade log saved to data/stream_trade_log.csv")
+        
+        if args.verify:
+            match_rate = verify_against_batch(trade_log, feed.df, agent.global_model, scaler,
+                                              agent.feature_cols, sequence_length)
+            print(f"Streamed trades matching the batch replay: {match_rate:.2%}")
+    else:
+        # Load processed data from CSV
+        print("Initializing Conflux-AI trading system...")
+        df = pd.read_csv('data/bitcoin_processed_data.csv')
+    
+        # Load test data sequences saved during training
+        X_test = torch.load('data/X_test.pt')
     
-    # Load test data sequences saved during training
-    X_test = torch.load('data/X_test.pt')
+        # One row per sequence in X_test, at the window's last tick (where the stream trades it)
+        sequence_length = 10
+        total_sequences = len(df) - sequence_length
+        train_size = int(total_sequences * 0.8)
+        test_df = decision_rows(df, train_size, len(X_test), sequence_length)
     
-    # Adjust the test DataFrame to match the number of sequences in X_test.
-    sequence_length = 10
-    total_sequences = len(df) - sequence_length
-    train_size = int(total_sequences * 0.8)
-    test_start_idx = train_size
-    test_end_idx = test_start_idx + len(X_test)
-    test_df = df.iloc[test_start_idx:test_end_idx]
+        # Create trading agent and run simulation
+        agent = TradingAgent(model_source=model_source, profile=not args.no_profile,
+                             latency_report=args.latency_report, batch_first=batch_first, results=results)
+        if args.ensemble:
+            agent.use_ensemble(args.ensemble_manifest, args.combine)
+        elif args.watch:
+            agent.update_global_model()
+            agent.watch_models(args.watch)
+        trade_log = agent.run(X_test, test_df)
+        agent.model_watcher.stop()
+        if args.slo_p99_ms is not None:
+            agent.check_latency_slo({'total': args.slo_p99_ms})
     
-    # Create trading agent and run simulation
-    agent = TradingAgent()
-    trade_log = agent.run(X_test, test_df)
+        # Save the trade log for analysis
+        trade_log_df = pd.DataFrame(trade_log)
+        trade_log_df.to_csv('data/trade_log.csv', index=False)
+        print("\nTrade log saved to data/trade_log.csv")
     
-    # Save the trade log for analysis
-    trade_log_df = pd.DataFrame(trade_log)
-    trade_log_df.to_csv('data/trade_log.csv', index=False)
-    print("\nTrade log saved to data/trade_log.csv")
+    if results is not None:
+        results.close()
@@ -0,0 +1,77 @@
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from src.data_processor import DataProcessor
+from src.indicators import INDICATOR_COLS, HAS_NUMBA, add_indicators_fused
+
+def extend_history(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """Lengthen a price history by replaying its own log returns"""
+    reps = int(np.ceil(rows / len(df)))
+    log_returns = np.tile(np.log(df['price']).diff().fillna(0).values, reps)[:rows]
+    return pd.DataFrame({
+        'timestamp': pd.date_range(end=pd.Timestamp.now(), periods=rows, freq='min'),
+        'price': df['price'].iloc[0] * np.exp(np.cumsum(log_returns)),
+        'volume': np.tile(df['volume'].values, reps)[:rows],
+        'market_cap': np.tile(df['market_cap'].values, reps)[:rows],
+    })
+
+def best_time(fn, df: pd.DataFrame, repeats: int) -> tuple:
+    times = []
+    for _ in range(repeats):
+        data = df.copy()
+        start = time.perf_counter()
+        result = fn(data)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+def max_relative_error(expected: pd.DataFrame, actual: pd.DataFrame) -> pd.Series:
+    errors = {}
+    for col in INDICATOR_COLS:
+        a, b = actual[col].to_numpy(), expected[col].to_numpy()
+        both_nan = np.isnan(a) & np.isnan(b)
+        # Relative to each value, floored at a small share of the column's scale so
+        # values that cross zero (MACD histogram, CCI) don't dominate
+        scale = np.nanmax(np.abs(b)) if not np.isnan(b).all() else 1.0
+        diff = np.abs(a - b) / np.maximum(np.abs(b), scale * 1e-6 + 1e-12)
+        errors[col] = np.nanmax(np.where(both_nan, 0.0, diff))
+    return pd.Series(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fused indicators against the ta implementation")
+    parser.add_argument('--data', default='data/bitcoin_raw_data.csv')
+    parser.add_argument('--rows', type=int, nargs='+', default=[2160, 20000, 100000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    raw = pd.read_csv(args.data)
+
+    # Trigger JIT compilation outside the timed runs
+    start = time.perf_counter()
+    add_indicators_fused(raw.head(200).copy())
+    print(f"Numba: {'yes' if HAS_NUMBA else 'no (pure NumPy/Python fallback)'}, "
+          f"warm-up {time.perf_counter() - start:.2f}s")
+
+    rows = []
+    for n in args.rows:
+        df = extend_history(raw, n)
+        expected, ta_seconds = best_time(DataProcessor.add_indicators_ta, df, args.repeats)
+        actual, fused_seconds = best_time(add_indicators_fused, df, args.repeats)
+        errors = max_relative_error(expected, actual)
+        rows.append({
+            'rows': n,
+            'ta_ms': ta_seconds * 1000,
+            'fused_ms': fused_seconds * 1000,
+            'speedup': ta_seconds / fused_seconds,
+            'max_rel_error': errors.max(),
+            'worst_column': errors.idxmax(),
+            'within_rtol': bool((errors <= args.rtol).all())
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda x: f"{x:.3g}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import time
+import argparse
+import torch
+import numpy as np
+import pandas as pd
+from src.data_processor import DataProcessor, FEATURE_COLS
+from src.feature_store import FeatureStore, WindowDataset
+from src.model import MODELS, LocalTrainer, build_model
+
+def load_data(data_path: str, store_path: str, sequence_length: int):
+    """Train/test windows from the processed data (or a simulated market if there is none), scaled like main()"""
+    try:
+        df = pd.read_csv(data_path)
+    except FileNotFoundError:
+        print(f"{data_path} not found; benchmarking on a simulated market")
+        df = DataProcessor.add_indicators(DataProcessor.create_sample_data(days=2000))
+    store = FeatureStore.from_frame(store_path, df, FEATURE_COLS)
+    train_windows = int(max(len(store) - sequence_length, 0) * 0.8)
+    scaler = store.fit_scaler(train_windows, sequence_length)
+    train = WindowDataset(store, sequence_length, stop=train_windows, scaler=scaler).materialize()
+    test = WindowDataset(store, sequence_length, start=train_windows, scaler=scaler).materialize()
+    return [tuple(torch.from_numpy(a) for a in split) for split in (train, test)]
+
+def decision_latency(model, X: torch.Tensor, repeats: int):
+    """p50 and p99 in ms of scoring one window, as the agent does per decision"""
+    latencies = []
+    with torch.no_grad():
+        for i in range(repeats):
+            window = X[i % len(X):i % len(X) + 1]
+            start = time.perf_counter()
+            model(window)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def benchmark(architecture: str, train, test, epochs: int, batch_size: int, repeats: int, seed: int) -> dict:
+    X_train, y_train = train
+    X_test, y_test = test
+    torch.manual_seed(seed)
+    model = build_model({'architecture': architecture, 'input_size': X_train.shape[2]})
+    trainer = LocalTrainer(input_size=X_train.shape[2], batch_size=batch_size, model=model)
+
+    start = time.perf_counter()
+    trainer.train(X_train, y_train, epochs=epochs)
+    train_seconds = time.perf_counter() - start
+
+    model.eval()
+    with torch.no_grad():
+        model(X_test[:batch_size])  # Warm up
+        start = time.perf_counter()
+        probs = model(X_test)
+        batch_ms = (time.perf_counter() - start) * 1000
+    p50, p99 = decision_latency(model, X_test, repeats)
+    return {
+        'architecture': architecture,
+        'parameters': sum(p.numel() for p in model.parameters()),
+        'train_samples_per_second': epochs * (len(X_train) // batch_size * batch_size) / train_seconds,
+        'test_batch_ms': batch_ms,
+        'decision_p50_ms': p50,
+        'decision_p99_ms': p99,
+        'test_loss': torch.nn.functional.binary_cross_entropy(probs, y_test).item(),
+        'accuracy': ((probs > 0.5).float() == y_test).float().mean().item()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the registered sequence models on the same data")
+    parser.add_argument('--data', default='data/bitcoin_processed_data.csv')
+    parser.add_argument('--store', default='data/feature_store_benchmark')
+    parser.add_argument('--architectures', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--sequence-length', type=int, default=10)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeats', type=int, default=500, help="Single-window forward passes timed per model")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='data/model_benchmark.csv')
+    args = parser.parse_args()
+
+    train, test = load_data(args.data, args.store, args.sequence_length)
+    print(f"{len(train[0])} training and {len(test[0])} test windows")
+
+    rows = []
+    for architecture in args.architectures:
+        print(f"Benchmarking {architecture}...")
+        rows.append(benchmark(architecture, train, test, args.epochs, args.batch_size, args.repeats, args.seed))
+
+    results = pd.DataFrame(rows)
+    pd.set_option('display.width', 200)
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    results.to_csv(args.output, index=False)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
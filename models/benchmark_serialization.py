@@ -0,0 +1,120 @@
+import io
+import os
+import re
+import glob
+import time
+import argparse
+import torch
+import pandas as pd
+import requests
+from src.model import SimpleLSTM
+from src.data_processor import DataProcessor
+from src.serialization import encode_state_dict, decode_state_dict, load_weights
+
+SCHEMES = [
+    # name, encode kwargs, uses delta base
+    ('fp32 zlib', dict(dtype='fp32', compression='zlib'), False),
+    ('fp16 zlib', dict(dtype='fp16', compression='zlib'), False),
+    ('bf16 zlib', dict(dtype='bf16', compression='zlib'), False),
+    ('fp16 lzma', dict(dtype='fp16', compression='lzma'), False),
+    ('fp16 delta zlib', dict(dtype='fp16', compression='zlib'), True),
+    ('fp16 delta top10% zlib', dict(dtype='fp16', compression='zlib', topk=0.1), True),
+    ('bf16 delta top1% lzma', dict(dtype='bf16', compression='lzma', topk=0.01), True),
+]
+
+def load_test_data(sequence_length: int = 10):
+    """Rebuild the test labels that match data/X_test.pt"""
+    X_test = torch.load('data/X_test.pt')
+    df = pd.read_csv('data/bitcoin_processed_data.csv')
+    _, y = DataProcessor.prepare_sequences(df, sequence_length)
+    y_test = torch.FloatTensor(y[-len(X_test):]).reshape(-1, 1)
+    return X_test, y_test
+
+def predict(state_dict, X_test: torch.Tensor) -> torch.Tensor:
+    model = SimpleLSTM(input_size=X_test.shape[2])
+    model.load_state_dict(state_dict)
+    model.eval()
+    with torch.no_grad():
+        return model(X_test)
+
+def timed(fn, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weight serialization schemes")
+    parser.add_argument('--weights', default=None, help="Weights to encode (default: the latest round's global model)")
+    parser.add_argument('--base', default=None,
+                        help="Base for delta schemes (default: the global model of the round before --weights)")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--server-url', default=None,
+                        help="Also time uploads against a running storage server")
+    args = parser.parse_args()
+
+    # main.py snapshots every round's global model; a round trains from the one before it
+    rounds = sorted(glob.glob('data/global_model_round*.pth'),
+                    key=lambda path: int(re.search(r'round(\d+)', path).group(1)))
+    weights_path = args.weights or (rounds[-1] if rounds else 'data/global_model_weights1.pth')
+    base_path = args.base or (rounds[-2] if len(rounds) > 1 and weights_path == rounds[-1] else None)
+    weights = load_weights(weights_path)
+    base = None
+    if base_path and os.path.exists(base_path):
+        base = load_weights(base_path)
+        print(f"Encoding {weights_path} with {base_path} as the delta base")
+    else:
+        # Only a real previous round (whose training started from it) gives meaningful delta sizes
+        print("No previous round's global model; skipping delta schemes (run main.py --round 2 after round 1)")
+
+    X_test, y_test = load_test_data()
+    reference = predict(weights, X_test)
+    reference_accuracy = ((reference > 0.5).float() == y_test).float().mean().item()
+
+    buffer = io.BytesIO()
+    torch.save(weights, buffer)
+    baseline_size = len(buffer.getvalue())
+
+    rows = [{
+        'scheme': 'torch.save fp32',
+        'bytes': baseline_size,
+        'ratio': 1.0,
+        'encode_ms': None,
+        'decode_ms': None,
+        'accuracy': reference_accuracy,
+        'max_prob_diff': 0.0
+    }]
+
+    for name, kwargs, uses_base in SCHEMES:
+        if uses_base and base is None:
+            continue
+        delta_base = base if uses_base else None
+        data, encode_ms = timed(lambda: encode_state_dict(weights, base=delta_base, **kwargs), args.repeats)
+        decoded, decode_ms = timed(lambda: decode_state_dict(data, base=delta_base), args.repeats)
+        probs = predict(decoded, X_test)
+        rows.append({
+            'scheme': name,
+            'bytes': len(data),
+            'ratio': baseline_size / len(data),
+            'encode_ms': encode_ms,
+            'decode_ms': decode_ms,
+            'accuracy': ((probs > 0.5).float() == y_test).float().mean().item(),
+            'max_prob_diff': (probs - reference).abs().max().item()
+        })
+
+        if args.server_url:
+            path = f"data/benchmark_{name.replace(' ', '_').replace('%', 'pct')}.cfxw"
+            with open(path, 'wb') as f:
+                f.write(data)
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                requests.post(f"{args.server_url}/upload", files={'file': f})
+            rows[-1]['upload_ms'] = (time.perf_counter() - start) * 1000
+            os.remove(path)
+
+    results = pd.DataFrame(rows)
+    pd.set_option('display.width', 200)
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import torch
+import pandas as pd
+from src.data_processor import FEATURE_COLS
+from src.feature_store import FeatureStore, WindowDataset
+from src.federated import FederatedSimulator, LocalModelServer
+from src.model import MODELS, build_model, model_spec
+
+def summarize(history: pd.DataFrame) -> pd.DataFrame:
+    rows = []
+    for mode, runs in history.groupby('mode', sort=False):
+        best = runs.loc[runs['accuracy'].idxmax()]
+        rows.append({
+            'mode': mode,
+            'rounds': len(runs),
+            'total_seconds': runs['elapsed_seconds'].iloc[-1],
+            'mean_round_seconds': runs['wall_seconds'].mean(),
+            'final_accuracy': runs['accuracy'].iloc[-1],
+            'final_loss': runs['loss'].iloc[-1],
+            'best_accuracy': best['accuracy'],
+            'seconds_to_best': best['elapsed_seconds'],
+            'mean_staleness': runs['mean_staleness'].mean()
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate multi-round federated training with sync or async aggregation")
+    parser.add_argument('--data', default='data/bitcoin_processed_data.csv')
+    parser.add_argument('--store', default='data/feature_store_federated')
+    parser.add_argument('--server', default='data/federated_server', help="Directory of the local stand-in server")
+    parser.add_argument('--mode', default='both', choices=['sync', 'async', 'both'])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--epochs', type=int, default=1, help="Local epochs per client update")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per client)")
+    parser.add_argument('--slow-clients', type=int, default=1, help="How many clients run slower than the rest")
+    parser.add_argument('--slowdown', type=float, default=3.0)
+    parser.add_argument('--alpha', type=float, default=0.6, help="Async mixing weight of a fresh update")
+    parser.add_argument('--staleness-exponent', type=float, default=0.5)
+    parser.add_argument('--max-staleness', type=int, default=None)
+    parser.add_argument('--sequence-length', type=int, default=10)
+    parser.add_argument('--architecture', default='lstm', choices=list(MODELS), help="Sequence model to train")
+    parser.add_argument('--dtype', default='fp32', choices=['fp32', 'fp16', 'bf16'], help="Client upload precision")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='data/federated_report.csv')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    store = FeatureStore.from_frame(args.store, df, FEATURE_COLS)
+    n_windows = max(len(store) - args.sequence_length, 0)
+    train_windows = int(n_windows * 0.8)
+    scaler = store.fit_scaler(train_windows, args.sequence_length)
+    X_test, y_test = WindowDataset(store, args.sequence_length, start=train_windows, scaler=scaler).materialize()
+
+    simulator = FederatedSimulator(
+        args.store, scaler, train_windows, torch.from_numpy(X_test), torch.from_numpy(y_test),
+        LocalModelServer(args.server),
+        n_clients=args.clients,
+        sequence_length=args.sequence_length,
+        epochs=args.epochs,
+        max_workers=args.workers,
+        slow_clients=args.slow_clients,
+        slowdown=args.slowdown,
+        dtype=args.dtype,
+        seed=args.seed,
+        model=model_spec(build_model({'architecture': args.architecture, 'input_size': X_test.shape[2]}))
+    )
+
+    histories = []
+    if args.mode in ('sync', 'both'):
+        histories.append(simulator.run_sync(args.rounds))
+    if args.mode in ('async', 'both'):
+        histories.append(simulator.run_async(args.rounds, alpha=args.alpha,
+                                             staleness_exponent=args.staleness_exponent,
+                                             max_staleness=args.max_staleness))
+    history = pd.concat(histories, ignore_index=True)
+
+    print("\nPer-round history:")
+    print(history.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print("\nSummary:")
+    print(summarize(history).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    history.to_csv(args.output, index=False)
+    print(f"\nRound history saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
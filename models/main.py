@@ -1,63 +1,60 @@
 import torch
+import argparse
 import numpy as np
-from src.data_processor import DataProcessor
-from src.model import LocalTrainer, aggregate_models
-from src.trader import (MomentumTrader, MeanReversionTrader, BreakoutTrader,
-                       TrendFollowingTrader, RSITrader, VolumeBasedTrader)
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.preprocessing import StandardScaler
+import src.contribution, src.ensemble, src.feature_store, src.indicators, src.market_sim, src.model, src.resample, src.serialization, src.strategies, src.trader
+from src.data_processor import DataProcessor, multi_timeframe_cols
+from src.feature_store import FeatureStore, WindowDataset, prefetch
+from src.model import LocalTrainer, aggregate_models, build_model, model_spec
+from src.pipeline import Pipeline, StageCache, file_digest
+from src.autotune import autotune, apply_tuned_config
+from src.model_watcher import write_manifest
+from src.ensemble import save_ensemble
+from src.contribution import score_contributions, normalize_contributions
+from src.serialization import save_weights, load_weights
+from src.strategies import Strategy, load_strategies
+from src.trader import StrategyTrader
 import pandas as pd
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from tqdm import tqdm
 import requests
+import pickle
+import shutil
+import zlib
 import os
 
-def evaluate_model(model, X_test, y_test):
-    """Evaluate model performance and return metrics"""
+def evaluate_model(model, batches: Iterable[Tuple[torch.Tensor, torch.Tensor]]):
+    """Evaluate model performance over (X, y) batches and return metrics"""
+    # Only confusion counts are kept, so memory doesn't grow with the test split
+    correct = total = true_pos = pred_pos = actual_pos = 0
     with torch.no_grad():
-        predictions = model(X_test)
-        pred_labels = (predictions > 0.5).float()
-        
-        # Calculate metrics
-        accuracy = accuracy_score(y_test.numpy(), pred_labels.numpy())
-        precision = precision_score(y_test.numpy(), pred_labels.numpy())
-        recall = recall_score(y_test.numpy(), pred_labels.numpy())
-        f1 = f1_score(y_test.numpy(), pred_labels.numpy())
-        
-        return {
-            'accuracy': accuracy,
-            'precision': precision,
-            'recall': recall,
-            'f1': f1
-        }
-
-def scale_features(X_train, X_test):
-    """Scale features using StandardScaler"""
-    # Reshape to 2D array for scaling
-    n_samples_train, n_sequences, n_features = X_train.shape
-    n_samples_test = X_test.shape[0]
-    
-    X_train_reshaped = X_train.reshape(-1, n_features)
-    X_test_reshaped = X_test.reshape(-1, n_features)
-    
-    # Fit scaler on training data and transform both sets
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train_reshaped)
-    X_test_scaled = scaler.transform(X_test_reshaped)
-    
-    # Reshape back to 3D
-    X_train_scaled = X_train_scaled.reshape(n_samples_train, n_sequences, n_features)
-    X_test_scaled = X_test_scaled.reshape(n_samples_test, n_sequences, n_features)
-    
-    return X_train_scaled, X_test_scaled
+        for X, y in batches:
+            pred_labels = (model(X) > 0.5).float()
+            correct += (pred_labels == y).sum().item()
+            total += len(y)
+            true_pos += (pred_labels * y).sum().item()
+            pred_pos += pred_labels.sum().item()
+            actual_pos += y.sum().item()
+    
+    # Same values as sklearn's metrics, with 0 where they're undefined
+    accuracy = correct / total if total else 0.0
+    precision = true_pos / pred_pos if pred_pos else 0.0
+    recall = true_pos / actual_pos if actual_pos else 0.0
+    f1 = 2 * true_pos / (pred_pos + actual_pos) if pred_pos + actual_pos else 0.0
+    
+    return {
+        'accuracy': accuracy,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1
+    }
 
-def backtest_trader(trader_class, df: pd.DataFrame, training_end_idx: int):
+def backtest_trader(strategy: Strategy, df: pd.DataFrame, training_end_idx: int):
     """Backtest a trading strategy"""
-    trader = trader_class(initial_balance=100000)
+    trader = StrategyTrader(strategy, initial_balance=100000)
     timestamps = df['timestamp'].tolist()[:training_end_idx]
     
     performance_data = []
-    for idx in tqdm(range(len(timestamps)), desc=f"Backtesting {trader_class.__name__}"):
+    for idx in tqdm(range(len(timestamps)), desc=f"Backtesting {strategy.name}"):
         timestamp = timestamps[idx]
         daily_portfolio = trader.balance
         
@@ -91,30 +88,20 @@ def backtest_trader(trader_class, df: pd.DataFrame, training_end_idx: int):
     performance_df = pd.DataFrame(performance_data)
     return trader.trades, performance_df
 
-def generate_training_data(df: pd.DataFrame) -> tuple[Dict, Dict]:
+def generate_training_data(df: pd.DataFrame, strategies: Dict[str, Strategy]) -> tuple[Dict, Dict]:
     """Generate training data from multiple traders using different strategies"""
     training_end_idx = int(len(df) * 0.8)
     
     if training_end_idx < 50:
         raise ValueError("Training period must be at least 50 days")
 
-    # Define different types of traders
-    trader_types = {
-        'momentum_trader': MomentumTrader,
-        'mean_reversion_trader': MeanReversionTrader,
-        # 'breakout_trader': BreakoutTrader,
-        # 'trend_following_trader': TrendFollowingTrader,
-        # 'rsi_trader': RSITrader,
-        # 'volume_trader': VolumeBasedTrader
-    }
-    
     all_trades = {}
     all_trader_performances = {}
     
-    for trader_name, trader_class in trader_types.items():
+    for trader_name, strategy in strategies.items():
         try:
             trades, performance = backtest_trader(
-                trader_class, 
+                strategy, 
                 df,
                 training_end_idx
             )
@@ -132,6 +119,22 @@ def generate_training_data(df: pd.DataFrame) -> tuple[Dict, Dict]:
     
     return all_trades, all_trader_performances
 
+def load_delta_base(weights_path: str, model: torch.nn.Module):
+    """Load the previous global model as a delta base if it matches the model's layout"""
+    if not os.path.exists(weights_path):
+        return None
+    try:
+        base = load_weights(weights_path)
+    except Exception as e:
+        print(f"Ignoring previous global model at {weights_path}: {e}")
+        return None
+    
+    reference = model.state_dict()
+    if base.keys() != reference.keys() or any(base[k].shape != reference[k].shape for k in reference):
+        print(f"Previous global model at {weights_path} has a different layout; sending full weights")
+        return None
+    return base
+
 def upload_model_weights(file_path: str, server_url="http://localhost:3000") -> str:
     """
     Upload model weights to server by sending the file path
@@ -160,159 +163,420 @@ def upload_model_weights(file_path: str, server_url="http://localhost:3000") ->
     else:
         raise Exception(f"Upload failed: {response.text}")
 
-def main():
-    # Configuration
-    days = 90  # 1 year of data
-    sequence_length = 10
-    epochs = 30
-    
-    # Create data directory if it doesn't exist
-    os.makedirs('data', exist_ok=True)
-    
-    # Initialize data processor
-    dp = DataProcessor()
-    
-    print("\nFetching Bitcoin data...")
-    # Fetch and process data
-    df = dp.fetch_crypto_data(coin_id='bitcoin', days=days)
-    
-    # Save raw data
-    raw_data_path = 'data/bitcoin_raw_data.csv'
+def fetch_stage(coin_id: str, days: int, raw_data_path: str) -> pd.DataFrame:
+    print(f"Fetching {coin_id} data...")
+    df = DataProcessor().fetch_crypto_data(coin_id=coin_id, days=days)
     df.to_csv(raw_data_path, index=False)
+    return df
+
+def indicators_stage(df: pd.DataFrame, timeframe: str, higher_timeframes: List[str],
+                     processed_data_path: str) -> pd.DataFrame:
+    dp = DataProcessor()
+    if higher_timeframes:
+        # Every timeframe is resampled from the same data in one pass, then joined onto the base bars
+        df, _ = dp.prepare_multi_timeframe(df, timeframe, higher_timeframes)
+        print(f"Joined {', '.join(higher_timeframes)} indicators onto {len(df)} {timeframe} bars")
+    else:
+        if timeframe:
+            df = dp.get_bars(df, timeframe)
+            print(f"Resampled into {len(df)} {timeframe} bars")
+        df = dp.add_indicators(df)
     
-    # Add indicators and save processed data
-    df = dp.add_indicators(df)
-    processed_data_path = 'data/bitcoin_processed_data.csv'
     df.to_csv(processed_data_path, index=False)
+    return df
+
+def backtest_stage(df: pd.DataFrame, strategies: Dict[str, Strategy]) -> Dict:
+    print("Generating training data from multiple traders...")
+    all_trades, all_trader_performances = generate_training_data(df, strategies)
+    return {'trades': all_trades, 'performances': all_trader_performances}
+
+def features_stage(df: pd.DataFrame, feature_cols: List[str], store_path: str, sequence_length: int,
+                   scaler_path: str) -> Dict:
+    """Write model features to a memory-mapped store and fit the scaler on the training windows"""
+    store = FeatureStore.from_frame(store_path, df, feature_cols)
+    n_windows = max(len(store) - sequence_length, 0)
+    train_windows = int(n_windows * 0.8)
+    
+    # Window-weighted, so the statistics match a scaler fitted on the flattened training windows
+    scaler = store.fit_scaler(train_windows, sequence_length)
+    
+    # The streaming agent scales live features with the same statistics
+    with open(scaler_path, 'wb') as f:
+        pickle.dump(scaler, f)
+    
+    print(f"Feature store: {len(store)} rows, {train_windows}/{n_windows} training windows")
+    return {
+        'path': store_path,
+        'sha256': store.digest,
+        'sequence_length': sequence_length,
+        'n_features': len(store.feature_cols),
+        'train_windows': train_windows,
+        'scaler': scaler
+    }
+
+def test_batches(features: Dict, batch_size: int) -> Callable[[], Iterable[Tuple[torch.Tensor, torch.Tensor]]]:
+    """Re-iterable (X, y) batches of the test split, read and scaled from the feature store as needed"""
+    store = FeatureStore(features['path'])
+    test = WindowDataset(store, features['sequence_length'], start=features['train_windows'],
+                         scaler=features['scaler'])
+    return lambda: ((torch.from_numpy(X), torch.from_numpy(y)) for X, y in test.batches(batch_size, drop_last=False))
+
+def test_set_stage(features: Dict, X_test_path: str, batch_size: int) -> int:
+    """Save the test sequences for the trading agent, a batch at a time; returns their count"""
+    store = FeatureStore(features['path'])
+    test = WindowDataset(store, features['sequence_length'], start=features['train_windows'],
+                         scaler=features['scaler'])
+    # Filled into a file-backed tensor, so the split is never held in memory
+    scratch_path = f'{X_test_path}.tmp'
+    X_test = torch.from_file(scratch_path, shared=True, dtype=torch.float32,
+                             size=len(test) * features['sequence_length'] * features['n_features'])
+    X_test = X_test.view(len(test), features['sequence_length'], features['n_features'])
+    try:
+        for first in range(0, len(test), batch_size):
+            X, _ = test.batch(first, batch_size)
+            X_test[first:first + len(X)] = torch.from_numpy(X)
+        torch.save(X_test, X_test_path)
+    finally:
+        del X_test
+        os.remove(scratch_path)
+    return len(test)
+
+def train_stage(features: Dict, trader_name: str, model: Dict, epochs: int, batch_size: int,
+                batch_first: bool, prefetch_batches: int, eval_batch_size: int, base_weights_path: str,
+                base_sha256: Optional[str], seed: int) -> Dict:
+    """Train one trader's model from the previous round's global model (base_sha256 is its digest)"""
+    print(f"Starting training for {trader_name}...")
+    # Seeded per trader, so traders differ but reruns reproduce the same weights
+    torch.manual_seed(seed + zlib.crc32(trader_name.encode()))
+    store = FeatureStore(features['path'])
+    train = WindowDataset(store, features['sequence_length'], stop=features['train_windows'],
+                          scaler=features['scaler'])
+    
+    # Batches are read and scaled from disk a few steps ahead of the optimizer
+    trainer = LocalTrainer(input_size=features['n_features'], batch_size=batch_size,
+                           model=build_model(model, batch_first=batch_first))
+    # Start from the previous round's global model (FedAvg), so the upload is a small delta against it
+    previous_global = load_delta_base(base_weights_path, trainer.model) if base_sha256 else None
+    if previous_global is not None:
+        trainer.model.load_state_dict(previous_global)
+        print(f"Warm-starting {trader_name} from {base_weights_path}")
+    model_weights = trainer.train_batches(
+        lambda: prefetch(train.batches(batch_size), depth=prefetch_batches), epochs=epochs)
+    trainer.model.load_state_dict(model_weights)
+    metrics = evaluate_model(trainer.model, test_batches(features, eval_batch_size)())
+    return {'weights': model_weights, 'metrics': metrics}
+
+def exchange_stage(*trained: Dict, trader_names: List[str], model: Dict, base_weights_path: str,
+                   base_sha256: Optional[str], dtype: str, compression: str, topk: float) -> Dict[str, Dict]:
+    """Write each trader's weights in the exchange format and return what a receiver decodes"""
+    # Trader uploads are encoded as deltas against the previous round's global model, which
+    # only decode against that exact model, so its digest is part of the stage's cache key.
+    # A previous global model of another architecture can't be a delta base
+    previous_global = load_delta_base(base_weights_path, build_model(model)) if base_sha256 else None
     
-    # Generate training data from multiple traders
-    print("\nGenerating training data from multiple traders...")
-    all_trades, all_trader_performances = generate_training_data(df)
-    
-    # Prepare sequences for LSTM training
-    X, y = dp.prepare_sequences(df, sequence_length)
-    
-    # Split data
-    train_size = int(len(X) * 0.8)
-    X_train, X_test = X[:train_size], X[train_size:]
-    y_train, y_test = y[:train_size], y[train_size:]
-    
-    # Scale features
-    X_train_scaled, X_test_scaled = scale_features(X_train, X_test)
-    
-    # Convert to tensors
-    X_train = torch.FloatTensor(X_train_scaled)
-    y_train = torch.FloatTensor(y_train).reshape(-1, 1)
-    X_test = torch.FloatTensor(X_test_scaled)
-    y_test = torch.FloatTensor(y_test).reshape(-1, 1)
-    
-    # Save X_test tensor for trading agent
-    torch.save(X_test, 'data/X_test.pt')
-    
-    # Train and evaluate model for each trader
     trader_models = {}
-    trader_performances = {}
-    
-    for trader_name, trades in all_trades.items():
-        print(f"\nStarting training for {trader_name}...")
-        # Create and train model
-        trainer = LocalTrainer(input_size=X_train.shape[2])
-        model_weights = trainer.train(X_train, y_train, epochs=epochs)
-        print(f"Model trained successfully for {trader_name}.")
-        trader_models[trader_name] = model_weights
-        
-        # Evaluate model
-        trainer.model.load_state_dict(model_weights)
-        metrics = evaluate_model(trainer.model, X_test, y_test)
-        trader_performances[trader_name] = metrics
-        
-        print(f"Trader Performance:")
-        print(f"Accuracy: {metrics['accuracy']:.4f}")
-        print(f"Precision: {metrics['precision']:.4f}")
-        print(f"Recall: {metrics['recall']:.4f}")
-        print(f"F1 Score: {metrics['f1']:.4f}")
+    for trader_name, result in zip(trader_names, trained):
+        weights_path = f'data/{trader_name}_model_weights1.pth'
+        manifest = save_weights(
+            result['weights'],
+            weights_path,
+            dtype=dtype,
+            base=previous_global,
+            topk=topk if previous_global is not None else None,
+            compression=compression,
+            metadata={'model': model}
+        )
+        scheme = f"{manifest['dtype']}{' delta' if manifest['delta'] else ''}, {manifest['compression']}"
+        print(f"Model weights saved to {weights_path} ({os.path.getsize(weights_path)} bytes, {scheme})")
         
-        # After training and evaluation
+        # Aggregate exactly what was exchanged
+        trader_models[trader_name] = load_weights(weights_path, base=previous_global)
+    return trader_models
+
+def upload_stage(trader_models: Dict[str, Dict]) -> Dict[str, str]:
+    cids = {}
+    for trader_name in trader_models:
         print(f"Uploading model weights for {trader_name}...")
         try:
-            weights_path = f'data/{trader_name}_model_weights1.pth'
-            torch.save(trainer.model.state_dict(), weights_path)
-            print(f"Model weights saved to {weights_path}")
-            cid = upload_model_weights(weights_path)
-            print(f"Model weights uploaded successfully for {trader_name}. CID: {cid}")
+            cids[trader_name] = upload_model_weights(f'data/{trader_name}_model_weights1.pth')
+            print(f"Model weights uploaded successfully for {trader_name}. CID: {cids[trader_name]}")
         except Exception as e:
             print(f"Error during upload for {trader_name}: {e}")
-    
-    # Aggregate models from all traders
-    print("\nAggregating models from all traders...")
+            cids[trader_name] = None
+    return cids
+
+def aggregate_stage(trader_models: Dict[str, Dict], model: Dict, global_weights_path: str,
+                    round_weights_path: str, manifest_path: str, dtype: str, compression: str) -> Dict:
+    print("Aggregating models from all traders...")
     global_weights = aggregate_models(list(trader_models.values()))
     print("Models aggregated into global model successfully.")
     
-    # Create global model and load aggregated weights
-    global_model = LocalTrainer(input_size=X_train.shape[2]).model
-    global_model.load_state_dict(global_weights)
-    
-    # Save the global model weights to the data directory
-    weights_path = 'data/global_model_weights1.pth'
-    torch.save(global_model.state_dict(), weights_path)
-    print(f"Global model weights saved to {weights_path}")
-    
-    # Upload the global model weights
+    # The architecture travels with the weights so agents rebuild the right model
+    save_weights(global_weights, global_weights_path, dtype=dtype, compression=compression,
+                 metadata={'model': model})
+    print(f"Global model weights saved to {global_weights_path} ({os.path.getsize(global_weights_path)} bytes)")
+    # Agents follow the latest file; the next round starts from this round's snapshot
+    shutil.copyfile(global_weights_path, round_weights_path)
+    
+    # Running agents watching the manifest hot-swap to the new version
+    manifest = write_manifest(manifest_path, global_weights_path, traders=list(trader_models), model=model)
+    print(f"Published global model version {manifest['version']} in {manifest_path}")
+    return global_weights
+
+def upload_global_stage(global_weights: Dict, global_weights_path: str) -> str:
     print(f"Uploading global model weights...")
     try:
-        global_cid = upload_model_weights(weights_path)
+        global_cid = upload_model_weights(global_weights_path)
         print(f"Global model weights uploaded successfully. CID: {global_cid}")
+        return global_cid
     except Exception as e:
         print(f"Error during upload of global model: {e}")
-    
-    # Evaluate global model
-    print("\nGlobal Model Performance:")
-    global_metrics = evaluate_model(global_model, X_test, y_test)
-    print(f"Accuracy: {global_metrics['accuracy']:.4f}")
-    print(f"Precision: {global_metrics['precision']:.4f}")
-    print(f"Recall: {global_metrics['recall']:.4f}")
-    print(f"F1 Score: {global_metrics['f1']:.4f}")
-    
-    
-    # After evaluating models for each trader
-    contributions = {}
+        return None
+
+def global_metrics_stage(global_weights: Dict, features: Dict, model: Dict, eval_batch_size: int) -> Dict:
+    global_model = build_model(model)
+    global_model.load_state_dict(global_weights)
+    return evaluate_model(global_model, test_batches(features, eval_batch_size)())
 
-    for trader_name, metrics in trader_performances.items():
-        contributions[trader_name] = metrics['accuracy']  # Use accuracy as a measure of contribution
+def contributions_stage(trader_models: Dict[str, Dict], features: Dict, model: Dict, eval_batch_size: int,
+                        contribution_csv_path: str) -> pd.DataFrame:
+    # Score each trader by its marginal contribution to the aggregated model
+    print("Scoring trader contributions...")
+    contribution_scores = score_contributions(
+        trader_models,
+        model_factory=lambda: build_model(model),
+        test_batches=test_batches(features, eval_batch_size)
+    )
+    for trader_name, scores in contribution_scores.items():
+        print(f"{trader_name}: Leave-one-out={scores['leave_one_out']:.4f}, Shapley={scores['shapley']:.4f}")
 
     # Normalize contributions to sum to 10
-    contribution_sum = sum(contributions.values())
-    contributions_normalized = {k: (v / contribution_sum) * 10 for k, v in contributions.items()}
+    contributions_normalized = normalize_contributions(
+        {k: v['shapley'] for k, v in contribution_scores.items()}
+    )
 
     # Create DataFrame for contributions
     contribution_df = pd.DataFrame(list(contributions_normalized.items()), columns=['traderAddress', 'contribution'])
 
     # Save contributions to CSV
-    contribution_csv_path = 'data/trader_contributions.csv'
     contribution_df.to_csv(contribution_csv_path, index=False)
     print(f"Trader contributions saved to {contribution_csv_path}")
+    return contribution_df
 
+def ensemble_stage(trader_models: Dict[str, Dict], contribution_df: pd.DataFrame, model: Dict, manifest_path: str,
+                   directory: str, dtype: str, compression: str) -> Dict:
+    # Full per-trader weights for agents serving the traders as an ensemble (exchange files may be deltas)
+    contributions = dict(zip(contribution_df['traderAddress'], contribution_df['contribution']))
+    manifest = save_ensemble(trader_models, manifest_path, directory=directory, contributions=contributions,
+                             model=model, dtype=dtype, compression=compression)
+    print(f"Ensemble of {len(manifest['members'])} trader models saved to {manifest_path}")
+    return manifest
 
-    # mock_contributions = [
-    #         {'traderAddress': 'secret1q42qnccxnrgnuy9ge92xs5kuyvxr4gweaa896c', 'contribution': 6.0},
-    #         {'traderAddress': 'secret1vrwne4zmpjnvhcp689j8pqlp8rss722mk72c9j', 'contribution': 4.0},
-    #     ]
-
-    # # Create DataFrame for mock contributions
-    # contribution_df = pd.DataFrame(mock_contributions)
-
+def record_contributions_stage(contribution_df: pd.DataFrame, api_url: str) -> Dict[str, bool]:
     # Send contributions to Next.js API for each contribution
-    api_url = 'http://localhost:3000/api/recordContribution'
-    
+    recorded = {}
     for index, row in contribution_df.iterrows():
         contribution_data = [row.to_dict()]  # Convert the row to a dictionary
-        response = requests.post(api_url, json=contribution_data)
+        try:
+            response = requests.post(api_url, json=contribution_data)
+        except requests.RequestException as e:
+            print(f"Failed to record contribution for {row['traderAddress']}: {e}")
+            recorded[row['traderAddress']] = False
+            continue
         
+        recorded[row['traderAddress']] = response.status_code == 200
         if response.status_code == 200:
             print(f"Contribution for {row['traderAddress']} recorded successfully.")
         else:
             print(f"Failed to record contribution for {row['traderAddress']}: {response.text}")
+    return recorded
+
+def print_metrics(title: str, metrics: Dict):
+    print(f"\n{title}:")
+    print(f"Accuracy: {metrics['accuracy']:.4f}")
+    print(f"Precision: {metrics['precision']:.4f}")
+    print(f"Recall: {metrics['recall']:.4f}")
+    print(f"F1 Score: {metrics['f1']:.4f}")
+
+def autotune_windows(config: Dict, max_windows: int = 4096):
+    """Training windows from the last round's feature store for autotuning, or (None, None) for synthetic ones"""
+    store_path = config['paths']['feature_store']
+    if not os.path.exists(os.path.join(store_path, 'meta.json')):
+        return None, None
+    store = FeatureStore(store_path)
+    sequence_length = config['sequence_length']
+    train_windows = int(max(len(store) - sequence_length, 0) * 0.8)
+    if train_windows < 1024:
+        return None, None
+    scaler = store.fit_scaler(train_windows, sequence_length)
+    return WindowDataset(store, sequence_length, stop=min(train_windows, max_windows), scaler=scaler).materialize()
+
+def build_pipeline(config: Dict, cache: StageCache, force: bool = False) -> Pipeline:
+    """Wire main()'s stages into a graph; each stage only reruns when its inputs, code or config change"""
+    pipeline = Pipeline(cache, force=force)
+    paths = config['paths']
+    strategies = load_strategies(config['strategies'], path=config['strategy_file'])
+    trader_names = list(strategies)
+    weights_format = dict(dtype=config['weights_dtype'], compression=config['weights_compression'])
+    if config['higher_timeframes'] and not config['timeframe']:
+        raise ValueError("higher_timeframes need a base 'timeframe' to join onto")
+    feature_cols = multi_timeframe_cols(config['higher_timeframes'])
+    # Normalized through the registry so defaults are recorded and part of the cache keys
+    model = model_spec(build_model({'architecture': config['architecture'], 'input_size': len(feature_cols),
+                                    **config['model_params']}))
+
+    pipeline.add('fetch', fetch_stage,
+                 params=dict(coin_id='bitcoin', days=config['days'], raw_data_path=paths['raw']),
+                 code=[DataProcessor.fetch_crypto_data, DataProcessor.create_sample_data, src.market_sim],
+                 outputs=[paths['raw']], ttl=config['fetch_ttl'])
+    pipeline.add('indicators', indicators_stage, deps=['fetch'],
+                 params=dict(timeframe=config['timeframe'], higher_timeframes=config['higher_timeframes'],
+                             processed_data_path=paths['processed']),
+                 code=[DataProcessor, src.indicators, src.resample], outputs=[paths['processed']])
+    pipeline.add('backtests', backtest_stage, deps=['indicators'],
+                 params=dict(strategies=strategies),
+                 code=[generate_training_data, backtest_trader, src.trader, src.strategies])
+    # A store with a missing or truncated file isn't a cache hit
+    store_files = [os.path.join(paths['feature_store'], name) for name in ('meta.json', 'features.bin', 'price.bin')]
+    pipeline.add('features', features_stage, deps=['indicators'],
+                 params=dict(feature_cols=feature_cols, store_path=paths['feature_store'],
+                             sequence_length=config['sequence_length'], scaler_path=paths['scaler']),
+                 code=[src.feature_store],
+                 outputs=store_files + [paths['scaler']])
+    pipeline.add('test_set', test_set_stage, deps=['features'],
+                 params=dict(X_test_path=paths['X_test'], batch_size=config['eval_batch_size']),
+                 code=[src.feature_store], outputs=[paths['X_test']])
+    # Training starts from, and uploads are deltas against, the previous round's snapshot. It
+    # isn't rewritten by this round, so rerunning a round with unchanged inputs stays cached.
+    base_weights_path = paths['round_weights'].format(round=config['round'] - 1)
+    base_sha256 = file_digest(base_weights_path)
+    round_weights_path = paths['round_weights'].format(round=config['round'])
+    # Training only needs the shared dataset, so a strategy change doesn't retrain every model
+    for trader_name in trader_names:
+        pipeline.add(f'train:{trader_name}', train_stage, deps=['features'],
+                     params=dict(trader_name=trader_name, model=model, epochs=config['epochs'],
+                                 batch_size=config['batch_size'], batch_first=config['batch_first'],
+                                 prefetch_batches=config['prefetch_batches'],
+                                 eval_batch_size=config['eval_batch_size'],
+                                 base_weights_path=base_weights_path, base_sha256=base_sha256,
+                                 seed=config['seed']),
+                     code=[src.model, src.feature_store, evaluate_model, test_batches])
+    pipeline.add('exchange', exchange_stage, deps=[f'train:{name}' for name in trader_names],
+                 params=dict(trader_names=trader_names, model=model, base_weights_path=base_weights_path,
+                             base_sha256=base_sha256, topk=config['weights_topk'], **weights_format),
+                 code=[src.serialization, load_delta_base],
+                 outputs=[f'data/{name}_model_weights1.pth' for name in trader_names])
+    pipeline.add('upload', upload_stage, deps=['exchange'],
+                 code=[upload_model_weights], cache_if=lambda cids: all(cids.values()))
+    pipeline.add('aggregate', aggregate_stage, deps=['exchange'],
+                 params=dict(model=model, global_weights_path=paths['global_weights'],
+                             round_weights_path=round_weights_path,
+                             manifest_path=paths['model_manifest'], **weights_format),
+                 code=[aggregate_models, src.serialization, write_manifest],
+                 outputs=[paths['global_weights'], round_weights_path])
+    pipeline.add('upload_global', upload_global_stage, deps=['aggregate'],
+                 params=dict(global_weights_path=paths['global_weights']),
+                 code=[upload_model_weights], cache_if=lambda cid: cid is not None)
+    pipeline.add('global_metrics', global_metrics_stage, deps=['aggregate', 'features'],
+                 params=dict(model=model, eval_batch_size=config['eval_batch_size']),
+                 code=[evaluate_model, test_batches, src.model, src.feature_store])
+    pipeline.add('contributions', contributions_stage, deps=['exchange', 'features'],
+                 params=dict(model=model, eval_batch_size=config['eval_batch_size'],
+                             contribution_csv_path=paths['contributions']),
+                 code=[src.contribution, src.model, test_batches, src.feature_store],
+                 outputs=[paths['contributions']])
+    pipeline.add('ensemble', ensemble_stage, deps=['exchange', 'contributions'],
+                 params=dict(model=model, manifest_path=paths['ensemble'], directory=paths['ensemble_dir'],
+                             **weights_format),
+                 code=[src.ensemble, src.serialization], outputs=[paths['ensemble']])
+    pipeline.add('record_contributions', record_contributions_stage, deps=['contributions'],
+                 params=dict(api_url=config['contribution_api_url']),
+                 cache_if=lambda recorded: all(recorded.values()))
+    return pipeline
+
+def main():
+    parser = argparse.ArgumentParser(description="Conflux-AI training round")
+    parser.add_argument('--force', action='store_true', help="Ignore cached stage results and rebuild everything")
+    parser.add_argument('--autotune', action='store_true',
+                        help="Time batch size, thread and layout choices on this machine before training")
+    parser.add_argument('--round', type=int, default=None,
+                        help="Federated round to run, warm-started from the previous round's global model")
+    args = parser.parse_args()
+    
+    # Configuration
+    config = {
+        'days': 90,  # 1 year of data
+        'sequence_length': 10,
+        'epochs': 30,
+        'seed': 42,
+        # Federated round: trains from round - 1's global model (see --round)
+        'round': 1,
+        'batch_size': 32,  # Overridden by this host's autotuned configuration, if any
+        'batch_first': True,  # LSTM input layout (see SimpleLSTM)
+        # Sequence model (see MODELS in src/model.py): 'lstm', 'tcn' or 'attention'
+        'architecture': 'lstm',
+        'model_params': {},  # e.g. {'hidden_size': 64} for the LSTM or {'channels': 32} for the TCN
+        'prefetch_batches': 4,  # Training batches read ahead from the feature store
+        'eval_batch_size': 1024,  # Test windows scored (and written to X_test.pt) at a time
+        'timeframe': None,  # e.g. '1h' to train on OHLCV bars instead of raw CoinGecko points
+        # e.g. ['4h', '1d']: also feed these timeframes' indicators (as of their last closed bar)
+        # to the model, joined onto the 'timeframe' bars. Batch replay only: the streaming
+        # agent computes base-timeframe features.
+        'higher_timeframes': [],
+        # Enabled strategies (see src/strategies.py); also e.g. 'breakout_trader',
+        # 'trend_following_trader', 'rsi_trader', 'volume_trader' or any from strategy_file
+        'strategies': ['momentum_trader', 'mean_reversion_trader'],
+        'strategy_file': None,  # Optional JSON with extra strategy definitions
+        # Weight exchange format (see src/serialization.py)
+        'weights_dtype': 'fp16',
+        'weights_compression': 'zlib',
+        'weights_topk': None,  # e.g. 0.1 to upload only the largest 10% of each delta
+        # Stage cache (see src/pipeline.py)
+        'cache_dir': 'data/cache',
+        'cache_max_bytes': 2 << 30,
+        'autotune_cache': 'data/autotune.json',
+        'fetch_ttl': 60 * 60,  # Refetch market data at most once an hour
+        'contribution_api_url': 'http://localhost:3000/api/recordContribution',
+        'paths': {
+            'raw': 'data/bitcoin_raw_data.csv',
+            'processed': 'data/bitcoin_processed_data.csv',
+            'feature_store': 'data/feature_store',
+            'scaler': 'data/feature_scaler.pkl',
+            'X_test': 'data/X_test.pt',
+            'global_weights': 'data/global_model_weights1.pth',
+            'round_weights': 'data/global_model_round{round}.pth',  # Per-round snapshots
+            'model_manifest': 'data/global_model.json',
+            'contributions': 'data/trader_contributions.csv',
+            'ensemble': 'data/ensemble.json',
+            'ensemble_dir': 'data/ensemble'
+        }
+    }
+    
+    if args.round is not None:
+        config['round'] = args.round
+    
+    # Create data directory if it doesn't exist
+    os.makedirs('data', exist_ok=True)
+    
+    # Batch size, threads and layout measured on this machine (see src/autotune.py)
+    if args.autotune:
+        autotune(*autotune_windows(config), cache_path=config['autotune_cache'])
+    tuned = apply_tuned_config('train', config['autotune_cache'])
+    if tuned is not None:
+        config['batch_size'], config['batch_first'] = tuned['batch_size'], tuned['batch_first']
+        print(f"Using autotuned training config: batch {tuned['batch_size']}, "
+              f"{tuned['intra_op_threads']}/{tuned['inter_op_threads']} threads, batch_first={tuned['batch_first']}")
+    
+    cache = StageCache(config['cache_dir'], max_bytes=config['cache_max_bytes'])
+    pipeline = build_pipeline(config, cache, force=args.force)
+    results = pipeline.run()
+    
+    for stage, result in results.items():
+        if stage.startswith('train:'):
+            print_metrics(f"{stage[len('train:'):]} Performance", result['metrics'])
+    print_metrics("Global Model Performance", results['global_metrics'])
+    pipeline.print_report()
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,9 +1,13 @@
 # app.py
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS  # Import CORS
+import os
+import json
 import subprocess
 import threading
 import time
+from src.profiling import to_prometheus
+from src.result_channel import RESULT_FD_ENV, ResultStore
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -11,9 +15,26 @@ CORS(app)  # Enable CORS for all routes
 # Global variable to store logs
 logs = []
 
+# Decision records streamed from the agent over its result channel
+trades = ResultStore()
+
+# Per-phase decision latency written by the agent while it runs
+LATENCY_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'agent_latency.json')
+
 def run_agent():
-    global logs
-    process = subprocess.Popen(['python', '/home/dharshan/dev/conflux-ai/models/agent.py'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    global logs, trades
+    # The agent writes length-prefixed JSON records to its end of this pipe
+    read_fd, write_fd = os.pipe()
+    # Each run gets its own store, so a previous run's reader can't write into this one
+    run_trades = ResultStore()
+    run_trades.reset()
+    trades = run_trades
+    # stderr goes to the logs with stdout: an unread pipe would block the agent once full
+    process = subprocess.Popen(['python', '/home/dharshan/dev/conflux-ai/models/agent.py',
+                                '--latency-report', LATENCY_REPORT], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               pass_fds=(write_fd,), env={**os.environ, RESULT_FD_ENV: str(write_fd)})
+    os.close(write_fd)
+    threading.Thread(target=run_trades.consume, args=(read_fd,), daemon=True).start()
 
     while True:
         output = process.stdout.readline()
@@ -27,6 +48,23 @@ def run_agent():
 def get_logs():
     return jsonify(logs)
 
+@app.route('/trades', methods=['GET'])
+def get_trades():
+    offset = request.args.get('offset', default=0, type=int)
+    limit = request.args.get('limit', default=100, type=int)
+    return jsonify(trades.page(max(offset, 0), min(max(limit, 1), 1000)))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text by default, the raw report with ?format=json
+    if not os.path.exists(LATENCY_REPORT):
+        return jsonify({"error": "No latency report yet."}), 404
+    with open(LATENCY_REPORT) as f:
+        report = json.load(f)
+    if request.args.get('format') == 'json':
+        return jsonify(report)
+    return Response(to_prometheus(report), mimetype='text/plain; version=0.0.4')
+
 @app.route('/start-trade', methods=['POST'])
 def start_trade():
     # Start the trading agent in a separate thread
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import hashlib
+import platform
+import multiprocessing
+import torch
+import numpy as np
+import torch.nn as nn
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from src.model import LocalTrainer, SimpleLSTM
+
+DEFAULT_CACHE = 'data/autotune.json'
+REFERENCE_BATCH_SIZE = 32  # LocalTrainer's default, what untuned hosts train with
+
+def _cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+def _usable_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def host_fingerprint() -> Dict:
+    """What the tuned configuration depends on: CPU model, usable cores and the torch build"""
+    host = {
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpu': _cpu_model(),
+        'cpus': _usable_cpus(),
+        'torch': torch.__version__
+    }
+    host['id'] = hashlib.sha256(json.dumps(host, sort_keys=True).encode()).hexdigest()[:16]
+    return host
+
+def thread_candidates(cpus: Optional[int] = None) -> List[Tuple[int, int]]:
+    """(intra-op, inter-op) thread counts to try: powers of two up to the usable cores"""
+    cpus = cpus or _usable_cpus()
+    intra = sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus})
+    return [(n, m) for n in intra for m in (1, 2) if m <= max(cpus // n, 1)]
+
+def synthetic_windows(n: int = 4096, sequence_length: int = 10, n_features: int = 20,
+                      seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Random windows whose label depends on the last rows, so the guard can measure convergence"""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, sequence_length, n_features)).astype(np.float32)
+    direction = rng.standard_normal(n_features)
+    score = X[:, -3:] @ direction
+    y = (score.sum(axis=1) + 0.5 * rng.standard_normal(n) > 0).astype(np.float32).reshape(-1, 1)
+    return X, y
+
+def _set_threads(intra: int, inter: int):
+    torch.set_num_threads(intra)
+    torch.set_num_interop_threads(inter)
+
+def _time_training(X: torch.Tensor, y: torch.Tensor, batch_size: int, batch_first: bool,
+                   steps: int, warmup: int) -> float:
+    """Training throughput in samples per second"""
+    torch.manual_seed(0)
+    model = SimpleLSTM(X.shape[2], batch_first=batch_first)
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    criterion = nn.BCELoss()
+    n_batches = len(X) // batch_size
+
+    def step(i):
+        start = (i % n_batches) * batch_size
+        optimizer.zero_grad()
+        loss = criterion(model(X[start:start + batch_size]), y[start:start + batch_size])
+        loss.backward()
+        optimizer.step()
+
+    for i in range(warmup):
+        step(i)
+    start = time.perf_counter()
+    for i in range(steps):
+        step(warmup + i)
+    return steps * batch_size / (time.perf_counter() - start)
+
+def _time_inference(X: torch.Tensor, batch_first: bool, repeats: int, warmup: int) -> float:
+    """Median latency in ms of scoring one window, as the agent does per decision"""
+    model = SimpleLSTM(X.shape[2], batch_first=batch_first)
+    model.eval()
+    latencies = []
+    with torch.no_grad():
+        for i in range(warmup + repeats):
+            window = X[i % len(X):i % len(X) + 1]
+            start = time.perf_counter()
+            model(window)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies[warmup:]))
+
+def run_trials(job: Dict) -> List[Dict]:
+    """Every batch size and layout under one thread configuration, run in a fresh worker process"""
+    X, y = torch.from_numpy(job['X']), torch.from_numpy(job['y'])
+    trials = []
+    for batch_first in job['layouts']:
+        base = {'intra_op_threads': job['intra'], 'inter_op_threads': job['inter'], 'batch_first': batch_first}
+        trials.append({**base, 'kind': 'inference',
+                       'latency_ms': _time_inference(X, batch_first, job['inference_repeats'], job['warmup'])})
+        for batch_size in job['batch_sizes']:
+            if batch_size > len(X):
+                continue
+            trials.append({**base, 'kind': 'train', 'batch_size': batch_size,
+                           'samples_per_second': _time_training(X, y, batch_size, batch_first,
+                                                                job['train_steps'], job['warmup'])})
+    return trials
+
+def convergence_guard(X: np.ndarray, y: np.ndarray, batch_sizes: List[int],
+                      reference_batch_size: int = REFERENCE_BATCH_SIZE,
+                      epochs: int = 3, tolerance: float = 0.01, seed: int = 0) -> Dict[int, Dict]:
+    """
+    Validation loss after a short training run per batch size
+
+    Larger batches take fewer optimizer steps per epoch; a batch size is accepted
+    when its loss is within `tolerance` of the reference batch size's. Threads and
+    layout don't change the math, so only the batch size is guarded. Batch sizes
+    larger than the training split are skipped; if that includes the reference,
+    the smallest evaluated batch size is the reference instead.
+    """
+    split = int(len(X) * 0.8)
+    X_train, y_train = torch.from_numpy(X[:split]), torch.from_numpy(y[:split])
+    X_val, y_val = torch.from_numpy(X[split:]), torch.from_numpy(y[split:])
+
+    losses = {}
+    for batch_size in sorted(set(batch_sizes) | {reference_batch_size}):
+        if batch_size > split:
+            continue
+        torch.manual_seed(seed)
+        trainer = LocalTrainer(input_size=X.shape[2], batch_size=batch_size)
+        trainer.train(X_train, y_train, epochs=epochs)
+        trainer.model.eval()
+        with torch.no_grad():
+            losses[batch_size] = nn.functional.binary_cross_entropy(trainer.model(X_val), y_val).item()
+
+    if not losses:
+        return {}
+    reference = losses.get(reference_batch_size, losses[min(losses)])
+    return {batch_size: {'val_loss': loss, 'accepted': loss <= reference + tolerance}
+            for batch_size, loss in losses.items()}
+
+def autotune(X: Optional[np.ndarray] = None, y: Optional[np.ndarray] = None,
+             batch_sizes: List[int] = (16, 32, 64, 128, 256), layouts: List[bool] = (True, False),
+             threads: Optional[List[Tuple[int, int]]] = None, train_steps: int = 20, warmup: int = 3,
+             inference_repeats: int = 200, guard_epochs: int = 3, tolerance: float = 0.01,
+             cache_path: str = DEFAULT_CACHE) -> Dict:
+    """
+    Time SimpleLSTM training and inference configurations on this machine and cache the fastest
+
+    Args:
+        X, y: Training windows (B, L, F) and labels (B, 1) for the trials; synthetic if omitted
+        batch_sizes: Training batch sizes to try
+        layouts: batch_first values to try (see SimpleLSTM)
+        threads: (intra-op, inter-op) thread counts; powers of two up to the usable cores by default
+        tolerance: Largest validation loss increase over the reference batch size that is accepted;
+            with too few windows to guard any batch size, training keeps the current configuration
+
+    Returns:
+        Dict: The cache entry, with the chosen 'train' and 'inference' configurations
+    """
+    if X is None:
+        X, y = synthetic_windows()
+    X, y = np.ascontiguousarray(X, dtype=np.float32), np.ascontiguousarray(y, dtype=np.float32)
+    # The reference batch size is always timed, so an accepted configuration exists if it fits
+    batch_sizes = sorted(set(batch_sizes) | {REFERENCE_BATCH_SIZE})
+    host = host_fingerprint()
+    threads = threads or thread_candidates(host['cpus'])
+    print(f"Autotuning on {host['cpu']} ({host['cpus']} cores): {len(threads)} thread configurations, "
+          f"batch sizes {list(batch_sizes)}")
+
+    guard = convergence_guard(X, y, batch_sizes, epochs=guard_epochs, tolerance=tolerance)
+    for batch_size, result in guard.items():
+        print(f"  batch {batch_size}: validation loss {result['val_loss']:.4f}"
+              f"{'' if result['accepted'] else ' (rejected)'}")
+
+    # Inter-op threads can only be set once per process, so every configuration gets its own
+    trials = []
+    for intra, inter in threads:
+        job = {'X': X, 'y': y, 'intra': intra, 'inter': inter, 'layouts': list(layouts),
+               'batch_sizes': batch_sizes, 'train_steps': train_steps, 'warmup': warmup,
+               'inference_repeats': inference_repeats}
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_set_threads, initargs=(intra, inter)) as executor:
+            trials.extend(executor.submit(run_trials, job).result())
+        print(f"  threads {intra}/{inter}: done")
+
+    train_trials = [t for t in trials if t['kind'] == 'train' and guard.get(t['batch_size'], {}).get('accepted')]
+    if train_trials:
+        best_train = max(train_trials, key=lambda t: t['samples_per_second'])
+    else:
+        # Too little data to time or guard any batch size: keep training as it runs untuned
+        print("No training configuration was accepted; keeping the current training configuration")
+        best_train = {'intra_op_threads': torch.get_num_threads(), 'inter_op_threads': torch.get_num_interop_threads(),
+                      'batch_first': True, 'batch_size': REFERENCE_BATCH_SIZE, 'samples_per_second': None}
+    best_inference = min((t for t in trials if t['kind'] == 'inference'), key=lambda t: t['latency_ms'])
+    keys = ('intra_op_threads', 'inter_op_threads', 'batch_first')
+    entry = {
+        'host': host,
+        'created': time.time(),
+        'train': {**{k: best_train[k] for k in keys}, 'batch_size': best_train['batch_size'],
+                  'samples_per_second': best_train['samples_per_second']},
+        'inference': {**{k: best_inference[k] for k in keys}, 'latency_ms': best_inference['latency_ms']},
+        'guard': {str(k): v for k, v in guard.items()},
+        'trials': trials
+    }
+    save_tuned_config(entry, cache_path)
+
+    train, inference = entry['train'], entry['inference']
+    throughput = f"{train['samples_per_second']:.0f} samples/s" if train['samples_per_second'] else "untimed"
+    print(f"Training: batch {train['batch_size']}, {train['intra_op_threads']}/{train['inter_op_threads']} threads, "
+          f"batch_first={train['batch_first']} ({throughput})")
+    print(f"Inference: {inference['intra_op_threads']}/{inference['inter_op_threads']} threads, "
+          f"batch_first={inference['batch_first']} ({inference['latency_ms']:.3f}ms per window)")
+    return entry
+
+def save_tuned_config(entry: Dict, cache_path: str = DEFAULT_CACHE):
+    """Store an entry under its host id, keeping other hosts' entries (the data dir may be shared)"""
+    entries = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            entries = json.load(f)
+    entries[entry['host']['id']] = entry
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+def load_tuned_config(cache_path: str = DEFAULT_CACHE) -> Optional[Dict]:
+    """This host's cached entry, if it has been tuned with the same CPU and torch build"""
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path) as f:
+        entries = json.load(f)
+    return entries.get(host_fingerprint()['id'])
+
+def apply_tuned_config(role: str, cache_path: str = DEFAULT_CACHE) -> Optional[Dict]:
+    """
+    Set torch's thread pools from this host's cached 'train' or 'inference' configuration
+
+    Call at startup, before any parallel work: inter-op threads can't be changed
+    afterwards. Returns the configuration (batch size, layout) or None if untuned.
+    """
+    entry = load_tuned_config(cache_path)
+    if entry is None:
+        return None
+    config = entry[role]
+    torch.set_num_threads(config['intra_op_threads'])
+    try:
+        torch.set_num_interop_threads(config['inter_op_threads'])
+    except RuntimeError:
+        print("Inter-op threads were already in use; keeping the current inter-op thread count")
+    return config
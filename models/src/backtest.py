@@ -0,0 +1,133 @@
+import torch
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional
+from src.indicators import INDICATOR_COLS, compute_indicators
+from src.trader import StrategyTrader
+
+def batch_indicators(paths: Dict[str, np.ndarray], columns: Optional[List[str]] = None,
+                     max_workers: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Indicator columns for every path, computed in parallel
+
+    Args:
+        paths (Dict[str, np.ndarray]): 'price', 'volume' and 'market_cap' arrays of shape (paths, time)
+        columns (List[str]): Indicator columns to keep (default: all)
+
+    Returns:
+        Dict[str, np.ndarray]: The input arrays plus each indicator column, shaped (paths, time)
+    """
+    columns = columns or INDICATOR_COLS
+    positions = [INDICATOR_COLS.index(col) for col in columns]
+    n_paths, n_steps = paths['price'].shape
+    data = {col: np.empty((n_paths, n_steps)) for col in columns}
+
+    def run(path: int):
+        block = compute_indicators(paths['price'][path], paths['volume'][path], paths['market_cap'][path])
+        for col, position in zip(columns, positions):
+            data[col][path] = block[:, position]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(run, range(n_paths)))
+
+    data.update(paths)
+    return data
+
+def batch_backtest(trader: StrategyTrader, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized backtest of one strategy over every path at once
+
+    Follows BaseTrader.execute_trade: buys spend `buy_fraction` of cash, sells
+    release `sell_fraction` of the position, and buys are skipped without cash.
+
+    Returns:
+        Dict[str, np.ndarray]: 'portfolio_value' (paths, time), 'n_trades' and 'total_return' (paths,)
+    """
+    actions = trader.signals(data)
+    price = data['price']
+    n_paths, n_steps = price.shape
+
+    balance = np.full(n_paths, float(trader.initial_balance))
+    position = np.zeros(n_paths)
+    n_trades = np.zeros(n_paths, dtype=np.int64)
+    portfolio_value = np.empty((n_paths, n_steps))
+
+    for t in range(n_steps):
+        current_price = price[:, t]
+        buy = (actions[:, t] == 1) & (balance > 0)
+        sell = actions[:, t] == -1
+
+        buy_size = np.where(buy, (balance * trader.buy_fraction) / current_price, 0.0)
+        balance = balance - buy_size * current_price
+        sell_size = np.where(sell & (position > 0), position * trader.sell_fraction, 0.0)
+        balance = balance + sell_size * current_price
+        position = position + buy_size - sell_size
+
+        n_trades += buy | sell
+        portfolio_value[:, t] = balance + position * current_price
+
+    return {
+        'portfolio_value': portfolio_value,
+        'n_trades': n_trades,
+        'total_return': (portfolio_value[:, -1] - trader.initial_balance) / trader.initial_balance * 100
+    }
+
+def evaluate_model_on_paths(model: torch.nn.Module, data: Dict[str, np.ndarray], feature_cols: List[str],
+                            mean: np.ndarray, scale: np.ndarray, sequence_length: int = 10,
+                            paths_per_batch: int = 16, initial_balance: float = 100000) -> pd.DataFrame:
+    """
+    Direction accuracy and TradingAgent-style returns of a model on every path
+
+    Windows are scaled with the training scaler's statistics, scored in batches of
+    paths, and traded with the agent's rule (one unit per decision at the window's
+    last price).
+    """
+    features = np.stack([data[col] for col in feature_cols], axis=-1)
+    features = ((features - mean) / scale).astype(np.float32)
+    price = data['price']
+    n_paths, n_steps = price.shape
+    n_windows = n_steps - sequence_length
+
+    probs = np.empty((n_paths, n_windows), dtype=np.float32)
+    model.eval()
+    with torch.no_grad():
+        for start in range(0, n_paths, paths_per_batch):
+            chunk = features[start:start + paths_per_batch]
+            # (paths, windows, features, time) -> (paths * windows, time, features)
+            windows = sliding_window_view(chunk[:, :n_windows + sequence_length - 1], sequence_length, axis=1)
+            windows = np.ascontiguousarray(windows.transpose(0, 1, 3, 2)).reshape(-1, sequence_length, len(feature_cols))
+            probs[start:start + len(chunk)] = model(torch.from_numpy(windows)).numpy().reshape(len(chunk), n_windows)
+
+    # Window i covers rows i..i+L-1 and predicts whether row i+L closes higher
+    last_price = price[:, sequence_length - 1:n_steps - 1]
+    went_up = price[:, sequence_length:] > last_price
+    accuracy = ((probs > 0.5) == went_up).mean(axis=1)
+
+    balance = np.full(n_paths, float(initial_balance))
+    positions = np.zeros(n_paths)
+    for i in range(n_windows):
+        current_price = last_price[:, i]
+        buy = (probs[:, i] > 0.51) & (balance >= current_price)
+        sell = (probs[:, i] < 0.49) & (positions > 0)
+        balance = balance - buy * current_price + sell * current_price
+        positions = positions + buy - sell
+    final_value = balance + positions * last_price[:, -1]
+
+    return pd.DataFrame({
+        'path': np.arange(n_paths),
+        'accuracy': accuracy,
+        'total_return': (final_value - initial_balance) / initial_balance * 100
+    })
+
+def summarize_returns(returns: np.ndarray) -> Dict[str, float]:
+    """Distribution summary of per-path total returns (%)"""
+    return {
+        'mean': float(np.mean(returns)),
+        'std': float(np.std(returns)),
+        'p5': float(np.percentile(returns, 5)),
+        'median': float(np.median(returns)),
+        'p95': float(np.percentile(returns, 95)),
+        'prob_loss': float(np.mean(returns < 0))
+    }
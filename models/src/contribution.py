@@ -0,0 +1,201 @@
+import os
+import threading
+import torch
+import torch.nn as nn
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+TestBatches = Callable[[], Iterable[Tuple[torch.Tensor, torch.Tensor]]]
+
+class CoalitionEvaluator:
+    """Score coalitions of trader models by the accuracy of their averaged weights.
+
+    Every state dict is flattened once into a row of a (n_models, n_params) matrix,
+    so a coalition's averaged weights are a running sum divided by its size instead
+    of a fresh re-aggregation. Scores are cached per coalition. The test set is a
+    re-iterable source of (X, y) batches, so it needn't fit in memory.
+    """
+
+    def __init__(self, model_weights: List[Dict], model_factory: Callable[[], nn.Module],
+                 test_batches: TestBatches):
+        self.keys = list(model_weights[0].keys())
+        self.shapes = [model_weights[0][key].shape for key in self.keys]
+        self.numels = [model_weights[0][key].numel() for key in self.keys]
+        self.flat = torch.stack([
+            torch.cat([weights[key].detach().reshape(-1).float() for key in self.keys])
+            for weights in model_weights
+        ])
+        self.n_models = len(model_weights)
+        self.model_factory = model_factory
+        self.test_batches = test_batches
+
+        # The empty coalition predicts the majority class
+        positives = total = 0
+        for _, y in test_batches():
+            positives += y.sum().item()
+            total += len(y)
+        positive_rate = positives / total if total else 0.0
+        self.empty_value = max(positive_rate, 1 - positive_rate)
+
+        self._cache: Dict[FrozenSet[int], float] = {}
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def _model(self) -> nn.Module:
+        # One model instance per worker thread so load_state_dict calls don't race
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            model = self.model_factory()
+            model.eval()
+            self._local.model = model
+        return model
+
+    def _unflatten(self, flat: torch.Tensor) -> Dict:
+        chunks = torch.split(flat, self.numels)
+        return {key: chunk.view(shape) for key, chunk, shape in zip(self.keys, chunks, self.shapes)}
+
+    def score_weights(self, flat: torch.Tensor) -> float:
+        """Accuracy of a model built from flattened weights on the test set"""
+        model = self._model()
+        model.load_state_dict(self._unflatten(flat))
+        correct = total = 0
+        with torch.no_grad():
+            for X, y in self.test_batches():
+                correct += ((model(X) > 0.5).float() == y).sum().item()
+                total += len(y)
+        return correct / total if total else 0.0
+
+    def value(self, members: FrozenSet[int], running_sum: Optional[torch.Tensor] = None) -> float:
+        """Value of a coalition, optionally given the sum of its members' weights"""
+        if not members:
+            return self.empty_value
+
+        cached = self._cache.get(members)
+        if cached is not None:
+            return cached
+
+        if running_sum is None:
+            running_sum = self.flat[sorted(members)].sum(dim=0)
+        score = self.score_weights(running_sum / len(members))
+
+        with self._cache_lock:
+            self._cache[members] = score
+        return score
+
+    def leave_one_out(self) -> np.ndarray:
+        """Drop in grand-coalition value when each model is left out"""
+        everyone = frozenset(range(self.n_models))
+        total = self.flat.sum(dim=0)
+        grand_value = self.value(everyone, total)
+
+        scores = np.zeros(self.n_models)
+        for i in range(self.n_models):
+            scores[i] = grand_value - self.value(everyone - {i}, total - self.flat[i])
+        return scores
+
+    def _permutation_marginals(self, order: np.ndarray, grand_value: float,
+                               tolerance: Optional[float]) -> np.ndarray:
+        marginals = np.zeros(self.n_models)
+        running_sum = torch.zeros_like(self.flat[0])
+        members: FrozenSet[int] = frozenset()
+        previous = self.empty_value
+
+        for i in order.tolist():
+            # Truncate once a non-empty coalition is as good as everyone together;
+            # the remaining members' marginals are treated as zero
+            if tolerance is not None and members and abs(grand_value - previous) <= tolerance:
+                break
+            running_sum += self.flat[i]
+            members = members | {i}
+            current = self.value(members, running_sum)
+            marginals[i] = current - previous
+            previous = current
+
+        return marginals
+
+    def monte_carlo_shapley(self, n_permutations: int = 100, seed: int = 42,
+                            max_workers: Optional[int] = None,
+                            tolerance: Optional[float] = None) -> np.ndarray:
+        """Truncated Monte Carlo estimate of each model's Shapley value
+
+        Args:
+            n_permutations (int): Number of random orderings to sample
+            seed (int): Seed for the permutation sampler
+            max_workers (int): Threads evaluating permutations in parallel
+            tolerance (float): Stop walking a permutation once a non-empty coalition's
+                value is within this distance of the grand coalition (None disables it)
+
+        Returns:
+            np.ndarray: Estimated Shapley value per model
+        """
+        everyone = frozenset(range(self.n_models))
+        grand_value = self.value(everyone, self.flat.sum(dim=0))
+
+        rng = np.random.default_rng(seed)
+        orders = [rng.permutation(self.n_models) for _ in range(n_permutations)]
+
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            marginals = list(executor.map(
+                lambda order: self._permutation_marginals(order, grand_value, tolerance),
+                orders
+            ))
+
+        return np.mean(marginals, axis=0)
+
+def score_contributions(trader_weights: Dict[str, Dict], model_factory: Callable[[], nn.Module],
+                        test_batches: TestBatches,
+                        n_permutations: Optional[int] = None, seed: int = 42,
+                        max_workers: Optional[int] = None,
+                        tolerance: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Score each trader's marginal contribution to the aggregated global model
+
+    Args:
+        trader_weights (Dict[str, Dict]): Trader name to model state dict
+        model_factory (Callable): Builds an empty model matching the state dicts
+        test_batches (Callable): Returns a fresh iterable of (sequences, labels) evaluation batches
+        n_permutations (int): Monte Carlo permutations (defaults to 2x the traders, at least 20)
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per trader 'leave_one_out' and 'shapley' scores
+    """
+    names = list(trader_weights.keys())
+    evaluator = CoalitionEvaluator(
+        [trader_weights[name] for name in names], model_factory, test_batches
+    )
+
+    if n_permutations is None:
+        n_permutations = max(20, 2 * len(names))
+
+    loo = evaluator.leave_one_out()
+    shapley = evaluator.monte_carlo_shapley(
+        n_permutations=n_permutations,
+        seed=seed,
+        max_workers=max_workers,
+        tolerance=tolerance
+    )
+    print(f"Evaluated {evaluator.cache_size} distinct coalitions over {n_permutations} permutations")
+
+    return {
+        name: {'leave_one_out': float(loo[i]), 'shapley': float(shapley[i])}
+        for i, name in enumerate(names)
+    }
+
+def normalize_contributions(scores: Dict[str, float], total: float = 10.0) -> Dict[str, float]:
+    """Clip negative scores to zero and rescale so contributions sum to `total`"""
+    if not scores:
+        return {}
+    clipped = {name: max(score, 0.0) for name, score in scores.items()}
+    score_sum = sum(clipped.values())
+    if score_sum <= 0:
+        # Nobody improved the global model: split evenly
+        return {name: total / len(scores) for name in scores}
+    return {name: (score / score_sum) * total for name, score in clipped.items()}
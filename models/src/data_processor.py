@@ -4,10 +4,28 @@ import ta
 from typing import Dict, List
 from pycoingecko import CoinGeckoAPI
 from datetime import datetime, timedelta
+from src.resample import resample_ohlcv, align_timeframes
+from src.indicators import add_indicators_fused
+from src.market_sim import MarketConfig, MarketSimulator
+
+# Model input features, in the order the LSTM expects them
+FEATURE_COLS = [
+    'returns', 'log_returns', 'rsi', 'stoch', 'stoch_signal',
+    'cci', 'adx', 'macd', 'macd_signal', 'macd_diff',
+    'bollinger_pband', 'bollinger_wband', 'atr', 'daily_volatility',
+    'force_index', 'ease_of_movement', 'volume_price_trend',
+    'mkt_cap_ratio', 'price_to_sma_20', 'volume_to_sma_20'
+]
+
+def multi_timeframe_cols(higher_timeframes: List[str]) -> List[str]:
+    """Model features of prepare_multi_timeframe: FEATURE_COLS, then each higher timeframe's copy"""
+    return FEATURE_COLS + [f"{col}_{tf}" for tf in higher_timeframes for col in FEATURE_COLS]
 
 class DataProcessor:
     def __init__(self):
         self.cg = CoinGeckoAPI()
+        # Resampled bars and their indicators, keyed by timeframe and source data
+        self._timeframe_cache: Dict[tuple, pd.DataFrame] = {}
         
     def fetch_crypto_data(self, coin_id: str = 'bitcoin', days: int = 90) -> pd.DataFrame:
         """Fetch real cryptocurrency data from CoinGecko"""
@@ -35,27 +53,62 @@ class DataProcessor:
             return self.create_sample_data(days)  # Fallback to sample data
     
     @staticmethod
-    def create_sample_data(days: int = 90) -> pd.DataFrame:
-        """Create sample price and volume data (fallback method)"""
+    def create_sample_data(days: int = 90, seed: int = 42, model: str = 'gbm') -> pd.DataFrame:
+        """Create seeded synthetic daily price and volume data (fallback method)"""
         print("Using sample data as fallback")
-        dates = pd.date_range(end=pd.Timestamp.now(), periods=days)
-        
-        # Generate sample price data with some trend and volatility
-        prices = np.random.normal(loc=100, scale=1, size=days).cumsum()
-        volumes = np.random.normal(loc=1000, scale=100, size=days)
-        market_caps = prices * volumes * np.random.normal(loc=10, scale=1, size=days)
-        
-        df = pd.DataFrame({
-            'timestamp': dates,
-            'price': prices,
-            'volume': volumes,
-            'market_cap': market_caps
-        })
-        return df
+        simulator = MarketSimulator(MarketConfig(steps_per_year=365), seed=seed)
+        paths = simulator.generate(n_paths=1, n_steps=days, model=model)
+        return MarketSimulator.to_frame(paths, step=pd.Timedelta(days=1))
+
+    @staticmethod
+    def _fingerprint(df: pd.DataFrame) -> int:
+        return int(pd.util.hash_pandas_object(df[['timestamp', 'price', 'volume']], index=False).sum())
+
+    def get_bars(self, df: pd.DataFrame, timeframe: str, volume_agg: str = 'last') -> pd.DataFrame:
+        """OHLCV bars for a timeframe, resampled once per source data"""
+        key = ('bars', timeframe, volume_agg, self._fingerprint(df))
+        if key not in self._timeframe_cache:
+            self._timeframe_cache[key] = resample_ohlcv(df, timeframe, volume_agg=volume_agg)
+        return self._timeframe_cache[key].copy()
+
+    def add_indicators_multi(self, df: pd.DataFrame, timeframes: List[str],
+                             volume_agg: str = 'last') -> Dict[str, pd.DataFrame]:
+        """Resample to each timeframe and add indicators, reusing cached results"""
+        fingerprint = self._fingerprint(df)
+        frames = {}
+        for timeframe in timeframes:
+            key = ('indicators', timeframe, volume_agg, fingerprint)
+            if key not in self._timeframe_cache:
+                bars = self.get_bars(df, timeframe, volume_agg=volume_agg)
+                self._timeframe_cache[key] = self.add_indicators(bars)
+            frames[timeframe] = self._timeframe_cache[key].copy()
+        return frames
+
+    def prepare_multi_timeframe(self, df: pd.DataFrame, base: str, timeframes: List[str],
+                                volume_agg: str = 'last') -> tuple:
+        """
+        Indicators for the base timeframe joined with those of higher timeframes
+
+        Returns:
+            tuple: (DataFrame on the base timeframe's bars, feature columns for prepare_sequences)
+        """
+        timeframes = [base] + [tf for tf in timeframes if tf != base]
+        frames = self.add_indicators_multi(df, timeframes, volume_agg=volume_agg)
+        combined = align_timeframes(frames, base, FEATURE_COLS)
+        return combined, multi_timeframe_cols(timeframes[1:])
 
     @staticmethod
     def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
-        """Add comprehensive technical indicators"""
+        """Add comprehensive technical indicators (fused engine, see src/indicators.py)"""
+        return add_indicators_fused(df)
+
+    @staticmethod
+    def add_indicators_ta(df: pd.DataFrame) -> pd.DataFrame:
+        """Reference implementation of add_indicators on top of the ta library"""
+        # Use real bar extremes when the data has them (see get_bars)
+        high = df['high'] if 'high' in df else df['price']
+        low = df['low'] if 'low' in df else df['price']
+        
         # Basic price indicators
         df['returns'] = df['price'].pct_change()
         df['log_returns'] = np.log(df['price']).diff()
@@ -68,10 +121,10 @@ class DataProcessor:
         
         # Momentum indicators
         df['rsi'] = ta.momentum.rsi(df['price'], window=14)
-        df['stoch'] = ta.momentum.stoch(df['price'], df['price'], df['price'], window=14)
-        df['stoch_signal'] = ta.momentum.stoch_signal(df['price'], df['price'], df['price'], window=14)
-        df['cci'] = ta.trend.cci(df['price'], df['price'], df['price'], window=20)
-        df['adx'] = ta.trend.adx(df['price'], df['price'], df['price'], window=14)
+        df['stoch'] = ta.momentum.stoch(high, low, df['price'], window=14)
+        df['stoch_signal'] = ta.momentum.stoch_signal(high, low, df['price'], window=14)
+        df['cci'] = ta.trend.cci(high, low, df['price'], window=20)
+        df['adx'] = ta.trend.adx(high, low, df['price'], window=14)
         
         # MACD
         macd = ta.trend.MACD(df['price'], window_slow=26, window_fast=12, window_sign=9)
@@ -88,14 +141,14 @@ class DataProcessor:
         df['bollinger_wband'] = bollinger.bollinger_wband()
         
         # ATR and other volatility measures
-        df['atr'] = ta.volatility.average_true_range(df['price'], df['price'], df['price'])
+        df['atr'] = ta.volatility.average_true_range(high, low, df['price'])
         df['daily_volatility'] = df['returns'].rolling(window=20).std()
         
         # Volume indicators
         df['volume_sma_20'] = ta.trend.sma_indicator(df['volume'], window=20)
         df['volume_ema_20'] = ta.trend.ema_indicator(df['volume'], window=20)
         df['force_index'] = ta.volume.force_index(df['price'], df['volume'])
-        df['ease_of_movement'] = ta.volume.ease_of_movement(df['price'], df['price'], df['volume'])
+        df['ease_of_movement'] = ta.volume.ease_of_movement(high, low, df['volume'])
         df['volume_price_trend'] = ta.volume.volume_price_trend(df['price'], df['volume'])
         
         # Market cap indicators
@@ -107,19 +160,15 @@ class DataProcessor:
         df['volume_to_sma_20'] = df['volume'] / df['volume_sma_20']
         
         # Fill NaN values
-        df = df.fillna(method='ffill').fillna(method='bfill')
+        df = df.ffill().bfill()
         return df
 
     @staticmethod
-    def prepare_sequences(df: pd.DataFrame, sequence_length: int = 10) -> tuple:
+    def prepare_sequences(df: pd.DataFrame, sequence_length: int = 10,
+                          feature_cols: List[str] = None) -> tuple:
         """Prepare sequences for LSTM training"""
-        feature_cols = [
-            'returns', 'log_returns', 'rsi', 'stoch', 'stoch_signal',
-            'cci', 'adx', 'macd', 'macd_signal', 'macd_diff',
-            'bollinger_pband', 'bollinger_wband', 'atr', 'daily_volatility',
-            'force_index', 'ease_of_movement', 'volume_price_trend',
-            'mkt_cap_ratio', 'price_to_sma_20', 'volume_to_sma_20'
-        ]
+        if feature_cols is None:
+            feature_cols = FEATURE_COLS
         
         X, y = [], []
         for i in range(len(df) - sequence_length):
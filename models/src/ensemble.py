@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import torch
+import torch.nn as nn
+from typing import Dict, List, Optional
+from src.serialization import save_weights, load_weights
+
+COMBINE_RULES = ('mean', 'weighted', 'median')
+
+class LSTMEnsemble(nn.Module):
+    """
+    N SimpleLSTM trader models evaluated as one stacked computation
+
+    The first layer's input weights of every model are concatenated, so one matmul
+    projects the shared input windows for all models at every time step; deeper
+    layers and the recurrent weights are stacked and applied with one bmm per step.
+    A forward pass therefore costs about one model's worth of kernel launches
+    rather than N. Inference only (dropout is skipped, as in eval mode).
+
+    Exposes forward, init_state and step like SimpleLSTM, returning the combined
+    probability, so it can stand in for the global model in TradingAgent and
+    SlidingWindowLSTM.
+    """
+
+    def __init__(self, state_dicts: List[Dict], combine: str = 'mean', weights: Optional[List[float]] = None,
+                 names: Optional[List[str]] = None):
+        super().__init__()
+        if combine not in COMBINE_RULES:
+            raise ValueError(f"Unknown combine rule {combine!r}; expected one of {COMBINE_RULES}")
+        if combine == 'weighted' and (weights is None or len(weights) != len(state_dicts)):
+            raise ValueError("The weighted combine rule needs one weight per model")
+        reference = state_dicts[0]
+        for state_dict in state_dicts[1:]:
+            if state_dict.keys() != reference.keys() or any(state_dict[k].shape != reference[k].shape for k in reference):
+                raise ValueError("All ensemble members must share the same architecture")
+
+        self.names = names or [f"model_{i}" for i in range(len(state_dicts))]
+        self.combine = combine
+        self.n_models = len(state_dicts)
+        self.num_layers = sum(key.startswith('lstm.weight_ih_l') for key in reference)
+        self.hidden_size = reference['lstm.weight_hh_l0'].shape[1]
+
+        def stacked(key, transpose=True):
+            tensors = [sd[key].detach().float() for sd in state_dicts]
+            return torch.stack([t.t() if transpose else t for t in tensors])
+
+        # Layer 0 sees the same input for every model: one (F, N*4H) projection
+        w_ih_l0 = torch.cat([sd['lstm.weight_ih_l0'].detach().float() for sd in state_dicts])
+        self.register_buffer('w_ih_l0', w_ih_l0.t().contiguous())
+        for layer in range(self.num_layers):
+            if layer > 0:
+                self.register_buffer(f'w_ih_l{layer}', stacked(f'lstm.weight_ih_l{layer}'))  # (N, H, 4H)
+            self.register_buffer(f'w_hh_l{layer}', stacked(f'lstm.weight_hh_l{layer}'))  # (N, H, 4H)
+            bias = stacked(f'lstm.bias_ih_l{layer}', False) + stacked(f'lstm.bias_hh_l{layer}', False)
+            self.register_buffer(f'bias_l{layer}', bias.unsqueeze(1))  # (N, 1, 4H)
+        self.register_buffer('fc1_w', stacked('fc1.weight'))  # (N, H, 64)
+        self.register_buffer('fc1_b', stacked('fc1.bias', False).unsqueeze(1))
+        self.register_buffer('fc2_w', stacked('fc2.weight'))  # (N, 64, 1)
+        self.register_buffer('fc2_b', stacked('fc2.bias', False).unsqueeze(1))
+
+        member_weights = torch.tensor(weights if weights is not None else [1.0] * self.n_models, dtype=torch.float32)
+        self.register_buffer('member_weights', member_weights / member_weights.sum())
+
+    @classmethod
+    def from_models(cls, models: List[nn.Module], **kwargs) -> 'LSTMEnsemble':
+        return cls([model.state_dict() for model in models], **kwargs)
+
+    def _input_gates(self, layer: int, inputs: torch.Tensor) -> torch.Tensor:
+        """Input projections (N, T, B, 4H) for layer inputs: (T, B, F) at layer 0, (N, T, B, H) above"""
+        if layer == 0:
+            T, B, F = inputs.shape
+            gates = (inputs.reshape(T * B, F) @ self.w_ih_l0).view(T, B, self.n_models, -1).permute(2, 0, 1, 3)
+        else:
+            N, T, B, H = inputs.shape
+            gates = torch.bmm(inputs.reshape(N, T * B, H), getattr(self, f'w_ih_l{layer}')).view(N, T, B, -1)
+        return gates + getattr(self, f'bias_l{layer}').unsqueeze(1)
+
+    def _cell(self, layer: int, input_gates: torch.Tensor, h: torch.Tensor, c: torch.Tensor):
+        # Same gate order as nn.LSTM: input, forget, cell, output
+        gates = input_gates + torch.bmm(h, getattr(self, f'w_hh_l{layer}'))
+        i, f, g, o = gates.chunk(4, dim=-1)
+        c = torch.sigmoid(f) * c + torch.sigmoid(i) * torch.tanh(g)
+        h = torch.sigmoid(o) * torch.tanh(c)
+        return h, c
+
+    def _head(self, h: torch.Tensor) -> torch.Tensor:
+        out = torch.relu(torch.bmm(h, self.fc1_w) + self.fc1_b)
+        return torch.sigmoid(torch.bmm(out, self.fc2_w) + self.fc2_b).squeeze(-1)  # (N, B)
+
+    def member_probs(self, x: torch.Tensor) -> torch.Tensor:
+        """Every member's probability for windows x (B, L, F), as (N, B)"""
+        B = x.shape[0]
+        layer_input = x.transpose(0, 1).float()
+        for layer in range(self.num_layers):
+            input_gates = self._input_gates(layer, layer_input)
+            h = layer_input.new_zeros(self.n_models, B, self.hidden_size)
+            c = torch.zeros_like(h)
+            outputs = []
+            for t in range(input_gates.shape[1]):
+                h, c = self._cell(layer, input_gates[:, t], h, c)
+                outputs.append(h)
+            # Only the last layer's final state feeds the head
+            if layer < self.num_layers - 1:
+                layer_input = torch.stack(outputs, dim=1)
+        return self._head(h)
+
+    def combine_probs(self, probs: torch.Tensor) -> torch.Tensor:
+        """Reduce (N, B) member probabilities to (B, 1)"""
+        if self.combine == 'median':
+            combined = probs.quantile(0.5, dim=0)
+        elif self.combine == 'weighted':
+            combined = self.member_weights @ probs
+        else:
+            combined = probs.mean(dim=0)
+        return combined.unsqueeze(-1)
+
+    def forward(self, x):
+        return self.combine_probs(self.member_probs(x))
+
+    def init_state(self, batch_size: int):
+        """Zero (h, c) state of shape (layers, batch, N, H)"""
+        h = torch.zeros(self.num_layers, batch_size, self.n_models, self.hidden_size)
+        return h, torch.zeros_like(h)
+
+    def step(self, x, state):
+        """Advance every member by one time step for inputs (batch, input_size)"""
+        h, c = state
+        new_h, new_c = [], []
+        layer_input = x.float().unsqueeze(0)  # (T=1, B, F)
+        for layer in range(self.num_layers):
+            input_gates = self._input_gates(layer, layer_input)[:, 0]
+            h_l, c_l = self._cell(layer, input_gates, h[layer].transpose(0, 1), c[layer].transpose(0, 1))
+            new_h.append(h_l.transpose(0, 1))
+            new_c.append(c_l.transpose(0, 1))
+            layer_input = h_l.unsqueeze(1)  # (N, T=1, B, H)
+        return self.combine_probs(self._head(h_l)), (torch.stack(new_h), torch.stack(new_c))
+
+def save_ensemble(trader_models: Dict[str, Dict], manifest_path: str, directory: str = 'data/ensemble',
+                  contributions: Optional[Dict[str, float]] = None, model: Optional[Dict] = None,
+                  **weights_format) -> Dict:
+    """
+    Write every trader's full weights (never deltas) and a manifest the agent can load as an ensemble
+
+    Args:
+        trader_models (Dict): Trader name to state dict
+        contributions (Dict): Trader name to contribution score, for the weighted combine rule
+        model (Dict): The traders' model spec (see src/model.py), recorded with the weights
+        weights_format: dtype / compression passed to save_weights
+    """
+    os.makedirs(directory, exist_ok=True)
+    members = []
+    for trader_name, state_dict in trader_models.items():
+        path = os.path.join(directory, f'{trader_name}_model_weights.pth')
+        save_weights(state_dict, path, metadata={'model': model}, **weights_format)
+        members.append({
+            'name': trader_name,
+            'path': path,
+            'contribution': (contributions or {}).get(trader_name)
+        })
+    manifest = {'created': time.time(), 'model': model, 'members': members}
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+def load_ensemble(manifest_path: str = 'data/ensemble.json', combine: str = 'mean') -> LSTMEnsemble:
+    """Build an LSTMEnsemble from a manifest written by save_ensemble"""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    architecture = (manifest.get('model') or {}).get('architecture', 'lstm')
+    if architecture != 'lstm':
+        raise ValueError(f"The batched ensemble only supports LSTM trader models, not '{architecture}'")
+    members = manifest['members']
+    weights = None
+    if combine == 'weighted':
+        weights = [member['contribution'] for member in members]
+        if any(weight is None for weight in weights):
+            raise ValueError(f"{manifest_path} has no contribution scores for the weighted combine rule")
+        if sum(weights) <= 0:
+            weights = [1.0] * len(members)
+    ensemble = LSTMEnsemble([load_weights(member['path']) for member in members], combine=combine,
+                            weights=weights, names=[member['name'] for member in members])
+    return ensemble.eval()
@@ -0,0 +1,228 @@
+import os
+import json
+import queue
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class StreamingScaler:
+    """
+    StandardScaler fitted chunk by chunk with optional per-row weights
+
+    Chunks are merged with Chan's parallel variance update in float64, so the
+    result doesn't depend on how the rows were split. Exposes mean_, var_ and
+    scale_ like sklearn's StandardScaler and pickles the same way for the agent.
+    """
+
+    def __init__(self):
+        self.n_samples_seen_ = 0.0
+        self.mean_ = None
+        self._m2 = None
+
+    def partial_fit(self, X: np.ndarray, sample_weight: Optional[np.ndarray] = None) -> 'StreamingScaler':
+        X = np.asarray(X, dtype=np.float64)
+        weight = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        total = weight.sum()
+        if total == 0:
+            return self
+
+        mean = weight @ X / total
+        m2 = weight @ (X - mean) ** 2
+        if self.mean_ is None:
+            self.n_samples_seen_, self.mean_, self._m2 = total, mean, m2
+            return self
+
+        seen = self.n_samples_seen_ + total
+        delta = mean - self.mean_
+        self.mean_ = self.mean_ + delta * (total / seen)
+        self._m2 = self._m2 + m2 + delta ** 2 * (self.n_samples_seen_ * total / seen)
+        self.n_samples_seen_ = seen
+        return self
+
+    @property
+    def var_(self) -> np.ndarray:
+        return self._m2 / self.n_samples_seen_
+
+    @property
+    def scale_(self) -> np.ndarray:
+        scale = np.sqrt(self.var_)
+        # Constant features are left unscaled, like StandardScaler
+        return np.where(scale < 10 * np.finfo(np.float64).eps, 1.0, scale)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+def window_weights(start: int, stop: int, n_windows: int, sequence_length: int) -> np.ndarray:
+    """
+    How many of windows 0..n_windows-1 contain each row in [start, stop)
+
+    Fitting with these weights reproduces a scaler fitted on the flattened windows
+    (what scale_features does) without building them.
+    """
+    rows = np.arange(start, stop)
+    first = np.maximum(rows - sequence_length + 1, 0)
+    last = np.minimum(rows, n_windows - 1)
+    return np.maximum(last - first + 1, 0).astype(np.float64)
+
+class FeatureStore:
+    """
+    Append-only, memory-mapped matrix of model features plus the price column
+
+    Rows live in raw binary files next to a small JSON header, so any slice can be
+    read without loading the rest. Frames must be appended in time order and
+    already carry their indicator columns.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        shape = (self.meta['n_rows'], len(self.meta['feature_cols']))
+        dtype = np.dtype(self.meta['dtype'])
+        self.features = np.memmap(os.path.join(path, 'features.bin'), dtype=dtype, mode='r', shape=shape)
+        self.price = np.memmap(os.path.join(path, 'price.bin'), dtype=np.float64, mode='r', shape=(shape[0],))
+
+    def __len__(self) -> int:
+        return self.meta['n_rows']
+
+    @property
+    def feature_cols(self) -> List[str]:
+        return self.meta['feature_cols']
+
+    @property
+    def digest(self) -> str:
+        return self.meta['sha256']
+
+    @classmethod
+    def write(cls, path: str, frames: Iterable[pd.DataFrame], feature_cols: List[str],
+              dtype: str = 'float64') -> 'FeatureStore':
+        """Stream DataFrame chunks into a new store at `path`"""
+        os.makedirs(path, exist_ok=True)
+        digest = hashlib.sha256()
+        n_rows = 0
+        with open(os.path.join(path, 'features.bin'), 'wb') as features, \
+                open(os.path.join(path, 'price.bin'), 'wb') as price:
+            for frame in frames:
+                block = np.ascontiguousarray(frame[feature_cols].to_numpy(dtype=dtype))
+                prices = np.ascontiguousarray(frame['price'].to_numpy(dtype=np.float64))
+                for data in (block.tobytes(), prices.tobytes()):
+                    digest.update(data)
+                features.write(block.tobytes())
+                price.write(prices.tobytes())
+                n_rows += len(frame)
+
+        meta = {'n_rows': n_rows, 'feature_cols': list(feature_cols), 'dtype': dtype, 'sha256': digest.hexdigest()}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return cls(path)
+
+    @classmethod
+    def from_frame(cls, path: str, df: pd.DataFrame, feature_cols: List[str],
+                   chunk_rows: int = 100_000, **kwargs) -> 'FeatureStore':
+        chunks = (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+        return cls.write(path, chunks, feature_cols, **kwargs)
+
+    def fit_scaler(self, n_windows: int, sequence_length: int, chunk_rows: int = 100_000) -> StreamingScaler:
+        """Scaler statistics over the rows of the first `n_windows` windows, weighted by window count"""
+        scaler = StreamingScaler()
+        stop = n_windows + sequence_length - 1
+        for start in range(0, stop, chunk_rows):
+            end = min(start + chunk_rows, stop)
+            scaler.partial_fit(self.features[start:end],
+                               sample_weight=window_weights(start, end, n_windows, sequence_length))
+        return scaler
+
+class WindowDataset:
+    """
+    Lazily built (sequence, next-row direction) samples over a FeatureStore
+
+    Window i covers rows i..i+L-1 and is labelled 1 when row i+L's price is above
+    row i+L-1's, like prepare_sequences. Only the rows of the requested batch are
+    read from disk and scaled.
+    """
+
+    def __init__(self, store: FeatureStore, sequence_length: int, start: int = 0, stop: Optional[int] = None,
+                 scaler: Optional[StreamingScaler] = None):
+        self.store = store
+        self.sequence_length = sequence_length
+        n_windows = max(len(store) - sequence_length, 0)
+        self.start = start
+        self.stop = n_windows if stop is None else min(stop, n_windows)
+        self.scaler = scaler
+
+    def __len__(self) -> int:
+        return max(self.stop - self.start, 0)
+
+    def batch(self, first: int, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Windows first..first+size-1 (relative to the dataset) as float32 X (B, L, F) and y (B, 1)"""
+        begin = self.start + first
+        end = min(begin + size, self.stop)
+        L = self.sequence_length
+        if end <= begin:
+            # sliding_window_view needs at least L rows
+            return (np.empty((0, L, len(self.store.feature_cols)), np.float32), np.empty((0, 1), np.float32))
+        rows = np.asarray(self.store.features[begin:end + L - 1], dtype=np.float64)
+        if self.scaler is not None:
+            rows = self.scaler.transform(rows)
+        X = np.lib.stride_tricks.sliding_window_view(rows, L, axis=0).transpose(0, 2, 1)
+        price = self.store.price[begin + L - 1:end + L]
+        y = (price[1:] > price[:-1]).astype(np.float32).reshape(-1, 1)
+        return X.astype(np.float32), y
+
+    def batches(self, batch_size: int = 32, drop_last: bool = True) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Consecutive batches in time order, like LocalTrainer.train's slicing"""
+        n = len(self) // batch_size * batch_size if drop_last else len(self)
+        for first in range(0, n, batch_size):
+            yield self.batch(first, batch_size)
+
+    def materialize(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The whole dataset in memory (for small evaluation splits)"""
+        return self.batch(0, len(self))
+
+def prefetch(batches: Iterable, depth: int = 2) -> Iterator:
+    """
+    Produce items from `batches` on a background thread, at most `depth` ahead
+
+    Disk reads and scaling of the next batches overlap with training on the
+    current one, while the bounded queue keeps memory constant.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in batches:
+                while not stop.is_set():
+                    try:
+                        buffer.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            buffer.put(e)
+        buffer.put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue
+        while thread.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
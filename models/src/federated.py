@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+import torch
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from src.model import LocalTrainer, aggregate_models, build_model, model_spec
+from src.feature_store import FeatureStore, WindowDataset, StreamingScaler
+from src.serialization import encode_state_dict, decode_state_dict
+
+class LocalModelServer:
+    """
+    Directory-backed stand-in for the upload/download server
+
+    Blobs are stored under their content id (SHA-256), like the real server's CIDs,
+    and the current global model is a small JSON pointer, so worker processes can
+    share it without a network round trip.
+    """
+
+    def __init__(self, root: str = 'data/federated_server'):
+        self.root = root
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+
+    def _blob(self, cid: str) -> str:
+        return os.path.join(self.root, 'blobs', cid)
+
+    def upload(self, data: bytes) -> str:
+        cid = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self._blob(cid)):
+            tmp_path = f"{self._blob(cid)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._blob(cid))
+        return cid
+
+    def download(self, cid: str) -> bytes:
+        with open(self._blob(cid), 'rb') as f:
+            return f.read()
+
+    def publish_global(self, cid: str, version: int):
+        pointer = os.path.join(self.root, 'global.json')
+        with open(pointer + '.tmp', 'w') as f:
+            json.dump({'cid': cid, 'version': version}, f)
+        os.replace(pointer + '.tmp', pointer)
+
+    def latest_global(self) -> Optional[Dict]:
+        pointer = os.path.join(self.root, 'global.json')
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            return json.load(f)
+
+@dataclass
+class ClientSpec:
+    client_id: int
+    start: int  # First training window of the client's shard
+    stop: int
+    slowdown: float = 1.0  # Simulated compute speed: wall time is stretched by this factor
+
+def _init_worker(threads: int):
+    torch.set_num_threads(threads)
+
+def client_update(job: Dict) -> Dict:
+    """
+    One client's local round, run in a worker process
+
+    Downloads the global model it was given, trains on its own shard of the
+    feature store and uploads the result, returning the CID.
+    """
+    start = time.perf_counter()
+    server = LocalModelServer(job['server_root'])
+    torch.manual_seed(job['seed'])
+
+    store = FeatureStore(job['store_path'])
+    shard = WindowDataset(store, job['sequence_length'], start=job['start'], stop=job['stop'],
+                          scaler=job['scaler'])
+    trainer = LocalTrainer(input_size=len(store.feature_cols), model=build_model(job['model']))
+    trainer.model.load_state_dict(decode_state_dict(server.download(job['global_cid'])))
+    weights = trainer.train_batches(lambda: shard.batches(job['batch_size']), epochs=job['epochs'])
+    cid = server.upload(encode_state_dict(weights, dtype=job['dtype'], compression='none'))
+
+    train_seconds = time.perf_counter() - start
+    # Slow clients take proportionally longer to report back
+    time.sleep(train_seconds * (job['slowdown'] - 1))
+    return {
+        'client_id': job['client_id'],
+        'cid': cid,
+        'base_version': job['base_version'],
+        'n_samples': len(shard),
+        'seconds': time.perf_counter() - start
+    }
+
+class FederatedSimulator:
+    """
+    Multi-round federated training over simulated clients in worker processes
+
+    Every client owns a contiguous shard of the training windows. run_sync is
+    FedAvg: each round waits for all clients and averages by sample count.
+    run_async applies each update as soon as it arrives, mixing it in with weight
+    alpha * (1 + staleness) ** -staleness_exponent (FedAsync), where staleness is
+    the number of global versions published since the client's base model.
+    """
+
+    def __init__(self, store_path: str, scaler: StreamingScaler, train_windows: int,
+                 X_test: torch.Tensor, y_test: torch.Tensor, server: LocalModelServer,
+                 n_clients: int = 4, sequence_length: int = 10, epochs: int = 1, batch_size: int = 32,
+                 max_workers: Optional[int] = None, slow_clients: int = 0, slowdown: float = 3.0,
+                 dtype: str = 'fp32', seed: int = 42, model: Optional[Dict] = None):
+        self.store_path = store_path
+        self.scaler = scaler
+        self.X_test = X_test
+        self.y_test = y_test
+        self.server = server
+        self.sequence_length = sequence_length
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.dtype = dtype
+        self.seed = seed
+        self.max_workers = max_workers or n_clients
+        self.input_size = X_test.shape[2]
+        # Model spec (see src/model.py) shared by the server and every client; SimpleLSTM by default
+        self.model = model or model_spec(build_model({'architecture': 'lstm', 'input_size': self.input_size}))
+
+        bounds = np.linspace(0, train_windows, n_clients + 1).astype(int)
+        self.clients = [
+            ClientSpec(i, bounds[i], bounds[i + 1], slowdown if i < slow_clients else 1.0)
+            for i in range(n_clients)
+        ]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Spawned workers don't inherit torch's thread pool state; one thread each avoids oversubscription
+        threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(threads,))
+
+    def _job(self, client: ClientSpec, global_cid: str, version: int, update: int) -> Dict:
+        return {
+            'client_id': client.client_id, 'start': client.start, 'stop': client.stop,
+            'slowdown': client.slowdown, 'global_cid': global_cid, 'base_version': version,
+            'store_path': self.store_path, 'scaler': self.scaler, 'server_root': self.server.root,
+            'sequence_length': self.sequence_length, 'epochs': self.epochs, 'batch_size': self.batch_size,
+            'dtype': self.dtype, 'model': self.model, 'seed': self.seed + 1000 * update + client.client_id
+        }
+
+    def _publish(self, state: Dict, version: int) -> str:
+        cid = self.server.upload(encode_state_dict(state, dtype='fp32', compression='none'))
+        self.server.publish_global(cid, version)
+        return cid
+
+    def _initial_global(self) -> Dict:
+        torch.manual_seed(self.seed)
+        return build_model(self.model).state_dict()
+
+    def evaluate(self, state: Dict) -> Dict[str, float]:
+        model = build_model(self.model)
+        model.load_state_dict(state)
+        model.eval()
+        with torch.no_grad():
+            predictions = model(self.X_test)
+            loss = torch.nn.functional.binary_cross_entropy(predictions, self.y_test).item()
+            accuracy = ((predictions > 0.5).float() == self.y_test).float().mean().item()
+        return {'accuracy': accuracy, 'loss': loss}
+
+    @staticmethod
+    def _update_norm(old: Dict, new: Dict) -> float:
+        return float(sum(((new[k] - old[k]) ** 2).sum() for k in new) ** 0.5)
+
+    def run_sync(self, rounds: int) -> pd.DataFrame:
+        """FedAvg: every round waits for the slowest client"""
+        state = self._initial_global()
+        history = []
+        start = time.perf_counter()
+        with self._executor() as executor:
+            for round_idx in range(rounds):
+                round_start = time.perf_counter()
+                global_cid = self._publish(state, round_idx)
+                futures = [executor.submit(client_update, self._job(client, global_cid, round_idx, round_idx))
+                           for client in self.clients]
+                results = [future.result() for future in futures]
+
+                updates = [decode_state_dict(self.server.download(r['cid'])) for r in results]
+                new_state = aggregate_models(updates, weights=[r['n_samples'] for r in results])
+                history.append({
+                    'mode': 'sync', 'round': round_idx + 1,
+                    'wall_seconds': time.perf_counter() - round_start,
+                    'elapsed_seconds': time.perf_counter() - start,
+                    'updates': len(results), 'mean_staleness': 0.0,
+                    'update_norm': self._update_norm(state, new_state),
+                    **self.evaluate(new_state)
+                })
+                state = new_state
+                print(f"[sync] round {round_idx + 1}/{rounds}: {history[-1]['wall_seconds']:.2f}s, "
+                      f"accuracy {history[-1]['accuracy']:.4f}, loss {history[-1]['loss']:.4f}")
+        self.final_state = state
+        return pd.DataFrame(history)
+
+    def run_async(self, rounds: int, alpha: float = 0.6, staleness_exponent: float = 0.5,
+                  max_staleness: Optional[int] = None) -> pd.DataFrame:
+        """
+        Staleness-weighted asynchronous aggregation with the same update budget as run_sync
+
+        A "round" is reported every n_clients applied updates. Updates staler than
+        max_staleness are dropped (the client still restarts from the latest model).
+        """
+        state = self._initial_global()
+        version = 0
+        global_cid = self._publish(state, version)
+        budget = rounds * len(self.clients)
+        history = []
+        round_updates, round_staleness = 0, []
+        round_state = state
+        start = round_start = time.perf_counter()
+
+        with self._executor() as executor:
+            pending = {}
+            submitted = 0
+            for client in self.clients[:budget]:
+                pending[executor.submit(client_update, self._job(client, global_cid, version, submitted))] = client
+                submitted += 1
+
+            completed = 0
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    client = pending.pop(future)
+                    result = future.result()
+                    completed += 1
+                    staleness = version - result['base_version']
+
+                    if max_staleness is None or staleness <= max_staleness:
+                        update = decode_state_dict(self.server.download(result['cid']))
+                        mix = alpha * (1 + staleness) ** -staleness_exponent
+                        state = {k: (1 - mix) * state[k] + mix * update[k] for k in state}
+                        version += 1
+                        global_cid = self._publish(state, version)
+                        round_staleness.append(staleness)
+                    round_updates += 1
+
+                    if round_updates == len(self.clients) or completed == budget:
+                        history.append({
+                            'mode': 'async', 'round': len(history) + 1,
+                            'wall_seconds': time.perf_counter() - round_start,
+                            'elapsed_seconds': time.perf_counter() - start,
+                            'updates': len(round_staleness),
+                            'mean_staleness': float(np.mean(round_staleness)) if round_staleness else 0.0,
+                            'update_norm': self._update_norm(round_state, state),
+                            **self.evaluate(state)
+                        })
+                        print(f"[async] round {len(history)}/{rounds}: {history[-1]['wall_seconds']:.2f}s, "
+                              f"accuracy {history[-1]['accuracy']:.4f}, loss {history[-1]['loss']:.4f}, "
+                              f"staleness {history[-1]['mean_staleness']:.2f}")
+                        round_updates, round_staleness = 0, []
+                        round_state = state
+                        round_start = time.perf_counter()
+
+                    # Fast clients start their next update right away from the newest model
+                    if submitted < budget:
+                        job = self._job(client, global_cid, version, submitted)
+                        pending[executor.submit(client_update, job)] = client
+                        submitted += 1
+
+        self.final_state = state
+        return pd.DataFrame(history)
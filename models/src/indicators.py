@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict
+
+try:
+    from numba import njit
+    _jit = njit(cache=True, nogil=True)
+    HAS_NUMBA = True
+except ImportError:
+    # The recurrences below are plain loops, so they also run (slower) without numba
+    _jit = lambda fn: fn
+    HAS_NUMBA = False
+
+# Columns produced by add_indicators, in the same order
+INDICATOR_COLS = [
+    'returns', 'log_returns', 'sma_20', 'sma_50', 'ema_12', 'ema_26',
+    'rsi', 'stoch', 'stoch_signal', 'cci', 'adx',
+    'macd', 'macd_signal', 'macd_diff',
+    'bollinger_high', 'bollinger_low', 'bollinger_mid', 'bollinger_pband', 'bollinger_wband',
+    'atr', 'daily_volatility',
+    'volume_sma_20', 'volume_ema_20', 'force_index', 'ease_of_movement', 'volume_price_trend',
+    'mkt_cap_sma_20', 'mkt_cap_ratio', 'price_to_sma_20', 'volume_to_sma_20'
+]
+_COL = {name: i for i, name in enumerate(INDICATOR_COLS)}
+
+@_jit
+def _ewm(x, alpha, min_periods, out):
+    """pandas ewm(adjust=False).mean() seeded by the first non-NaN value"""
+    value = np.nan
+    count = 0
+    for i in range(x.shape[0]):
+        if not np.isnan(x[i]):
+            value = x[i] if count == 0 else alpha * x[i] + (1 - alpha) * value
+            count += 1
+        out[i] = value if count >= min_periods else np.nan
+
+@_jit
+def _atr(true_range, window, out):
+    """ta's AverageTrueRange: zeros, a plain mean at window - 1, then Wilder smoothing"""
+    n = true_range.shape[0]
+    out[:] = 0.0
+    if n < window:
+        return
+    out[window - 1] = true_range[:window].mean()
+    for i in range(window, n):
+        out[i] = (out[i - 1] * (window - 1) + true_range[i]) / float(window)
+
+@_jit
+def _adx(dm_range, pos, neg, window, out):
+    """ta's ADXIndicator.adx() over precomputed range and directional moves (row 0 unused)"""
+    n = dm_range.shape[0]
+    out[:] = 0.0
+    if n < 2 * window:
+        return
+    trs = dm_range[1:window + 1].sum()
+    dip = pos[1:window + 1].sum()
+    din = neg[1:window + 1].sum()
+    seed = 0.0
+    adx = 0.0
+    for row in range(window, n):
+        if row > window:
+            trs = trs - trs / float(window) + dm_range[row]
+            dip = dip - dip / float(window) + pos[row]
+            din = din - din / float(window) + neg[row]
+        di_pos = 100 * (dip / trs) if trs != 0.0 else 0.0
+        di_neg = 100 * (din / trs) if trs != 0.0 else 0.0
+        total = di_pos + di_neg
+        if total == 0.0:
+            directional_index = np.nan
+        else:
+            directional_index = 100 * abs((di_pos - di_neg) / total)
+
+        if row < 2 * window - 1:
+            seed += directional_index
+        elif row == 2 * window - 1:
+            adx = (seed + directional_index) / window
+            out[row] = adx
+        else:
+            adx = ((adx * (window - 1)) + directional_index) / float(window)
+            out[row] = adx
+
+def _rolling(windows: np.ndarray, n: int, reducer, **kwargs) -> np.ndarray:
+    """Apply a reducer over sliding windows, NaN-padding the warm-up rows"""
+    out = np.full(n, np.nan)
+    if windows.shape[0]:
+        out[windows.shape[1] - 1:] = reducer(windows, axis=1, **kwargs)
+    return out
+
+def _windows(x: np.ndarray, window: int) -> np.ndarray:
+    if x.shape[0] < window:
+        return np.empty((0, window))
+    return sliding_window_view(x, window)
+
+def _fill(block: np.ndarray):
+    """Column-wise forward fill then backward fill, in place"""
+    rows = np.arange(block.shape[0])
+    for j in range(block.shape[1]):
+        column = block[:, j]
+        missing = np.isnan(column)
+        if not missing.any():
+            continue
+        valid = np.flatnonzero(~missing)
+        if not valid.size:
+            continue
+        first = valid[0]
+        # Most columns are only missing their warm-up rows; gaps after that need a forward fill
+        if missing[first:].any():
+            last_valid = np.maximum.accumulate(np.where(missing, 0, rows))
+            column[:] = column[last_valid]
+        column[:first] = column[first]
+
+def compute_indicators(price: np.ndarray, volume: np.ndarray, market_cap: np.ndarray,
+                       high: np.ndarray = None, low: np.ndarray = None) -> np.ndarray:
+    """
+    Compute every add_indicators column into one preallocated float64 block
+
+    Rolling statistics shared between indicators are computed once: SMA-20 feeds
+    sma_20, bollinger_mid and price_to_sma_20, one set of 20-row price windows
+    gives the Bollinger mean and std, and the market cap mean feeds both market
+    cap columns. Matches the `ta` implementation that
+    add_indicators_ta wraps, including its warm-up conventions.
+
+    Returns:
+        np.ndarray: (len(price), len(INDICATOR_COLS)) block, forward/backward filled
+    """
+    close = np.ascontiguousarray(price, dtype=np.float64)
+    volume = np.ascontiguousarray(volume, dtype=np.float64)
+    market_cap = np.ascontiguousarray(market_cap, dtype=np.float64)
+    ohlc = high is not None and low is not None
+    high = np.ascontiguousarray(high, dtype=np.float64) if ohlc else close
+    low = np.ascontiguousarray(low, dtype=np.float64) if ohlc else close
+    n = close.shape[0]
+
+    # Column-major so every indicator column is a contiguous array
+    block = np.empty((n, len(INDICATOR_COLS)), order='F')
+    col: Dict[str, np.ndarray] = {name: block[:, i] for name, i in _COL.items()}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prev_close = np.r_[np.nan, close[:-1]]
+        diff = close - prev_close
+
+        # Basic price indicators
+        col['returns'][:] = close / prev_close - 1
+        log_close = np.log(close)
+        col['log_returns'][:] = log_close - np.r_[np.nan, log_close[:-1]]
+
+        # Shared 20-row price statistics
+        price_20 = _windows(close, 20)
+        sma_20 = _rolling(price_20, n, np.mean)
+        std_20 = _rolling(price_20, n, np.std)
+        col['sma_20'][:] = sma_20
+        col['bollinger_mid'][:] = sma_20
+        col['sma_50'][:] = _rolling(_windows(close, 50), n, np.mean)
+        _ewm(close, 2 / 13, 12, col['ema_12'])
+        _ewm(close, 2 / 27, 26, col['ema_26'])
+
+        # Momentum indicators
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+        avg_up = np.empty(n)
+        avg_down = np.empty(n)
+        _ewm(up, 1 / 14, 14, avg_up)
+        _ewm(down, 1 / 14, 14, avg_down)
+        col['rsi'][:] = np.where(avg_down == 0, 100, 100 - (100 / (1 + avg_up / avg_down)))
+
+        lowest = _rolling(_windows(low, 14), n, np.min)
+        highest = _rolling(_windows(high, 14), n, np.max)
+        col['stoch'][:] = 100 * (close - lowest) / (highest - lowest)
+        col['stoch_signal'][:] = _rolling(_windows(col['stoch'], 3), n, np.mean)
+
+        typical = (high + low + close) / 3.0
+        typical_20 = _windows(typical, 20)
+        typical_mean = _rolling(typical_20, n, np.mean)
+        deviation = np.full(n, np.nan)
+        if typical_20.shape[0]:
+            deviation[19:] = np.abs(typical_20 - typical_mean[19:, None]).mean(axis=1)
+        col['cci'][:] = (typical - typical_mean) / (0.015 * deviation)
+
+        # True range and directional movement (row 0 has no previous close)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        dm_range = np.fmax(high, prev_close) - np.fmin(low, prev_close)
+        diff_up = high - np.r_[np.nan, high[:-1]]
+        diff_down = np.r_[np.nan, low[:-1]] - low
+        pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+        neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+        _adx(dm_range, pos, neg, 14, col['adx'])
+
+        # MACD
+        col['macd'][:] = col['ema_12'] - col['ema_26']
+        _ewm(col['macd'], 2 / 10, 9, col['macd_signal'])
+        col['macd_diff'][:] = col['macd'] - col['macd_signal']
+
+        # Volatility indicators
+        band_high = sma_20 + 2 * std_20
+        band_low = sma_20 - 2 * std_20
+        col['bollinger_high'][:] = band_high
+        col['bollinger_low'][:] = band_low
+        col['bollinger_pband'][:] = (close - band_low) / (band_high - band_low)
+        col['bollinger_wband'][:] = ((band_high - band_low) / sma_20) * 100
+
+        _atr(true_range, 14, col['atr'])
+        col['daily_volatility'][:] = _rolling(_windows(col['returns'], 20), n, np.std, ddof=1)
+
+        # Volume indicators
+        volume_sma = _rolling(_windows(volume, 20), n, np.mean)
+        col['volume_sma_20'][:] = volume_sma
+        _ewm(volume, 2 / 21, 20, col['volume_ema_20'])
+        _ewm(diff * volume, 2 / 14, 13, col['force_index'])
+        col['ease_of_movement'][:] = (
+            (diff_up - diff_down) * (high - low) / (2 * volume)) * 100000000
+        # Cumulative volume-weighted returns, like ta>=0.11 (the first row is filled below)
+        col['volume_price_trend'][0] = np.nan
+        col['volume_price_trend'][1:] = np.cumsum(volume[1:] * (diff[1:] / close[:-1]))
+
+        # Market cap indicators
+        mkt_cap_sma = _rolling(_windows(market_cap, 20), n, np.mean)
+        col['mkt_cap_sma_20'][:] = mkt_cap_sma
+        col['mkt_cap_ratio'][:] = market_cap / mkt_cap_sma
+
+        # Additional derived features
+        col['price_to_sma_20'][:] = close / sma_20
+        col['volume_to_sma_20'][:] = volume / volume_sma
+
+    _fill(block)
+    return block
+
+def add_indicators_fused(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame wrapper around compute_indicators with add_indicators' column layout"""
+    ohlc = 'high' in df and 'low' in df
+    block = compute_indicators(
+        df['price'].to_numpy(),
+        df['volume'].to_numpy(),
+        df['market_cap'].to_numpy(),
+        high=df['high'].to_numpy() if ohlc else None,
+        low=df['low'].to_numpy() if ohlc else None
+    )
+    base = df.drop(columns=[c for c in INDICATOR_COLS if c in df])
+    indicators = pd.DataFrame(block, index=df.index, columns=INDICATOR_COLS)
+    return pd.concat([base, indicators], axis=1)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+@dataclass
+class Regime:
+    drift: float  # Annualized drift of log price
+    volatility: float  # Annualized volatility
+
+@dataclass
+class MarketConfig:
+    s0: float = 90000.0
+    steps_per_year: int = 365 * 24  # Hourly points, roughly CoinGecko's 90-day granularity
+    drift: float = 0.3
+    volatility: float = 0.6
+    # Regime switching: per-step transition probabilities between regimes
+    regimes: List[Regime] = field(default_factory=lambda: [
+        Regime(drift=0.8, volatility=0.45),   # Bull
+        Regime(drift=-0.6, volatility=0.75),  # Bear
+        Regime(drift=0.0, volatility=1.2),    # Turbulent
+    ])
+    transition: Optional[np.ndarray] = None  # Defaults to sticky regimes (see regime_transition)
+    # Merton jumps: expected jumps per year and normal log jump size
+    jump_intensity: float = 12.0
+    jump_mean: float = -0.02
+    jump_std: float = 0.05
+    # Volume and market cap
+    base_volume: float = 5e10
+    volume_volatility: float = 0.25
+    volume_return_correlation: float = 0.6  # Correlation of log volume shocks with |returns|
+    circulating_supply: float = 19.8e6
+    supply_growth: float = 0.017  # Annual issuance
+
+    def regime_transition(self) -> np.ndarray:
+        if self.transition is not None:
+            return np.asarray(self.transition, dtype=np.float64)
+        k = len(self.regimes)
+        stay = 0.995
+        transition = np.full((k, k), (1 - stay) / (k - 1))
+        np.fill_diagonal(transition, stay)
+        return transition
+
+class MarketSimulator:
+    """Seeded generator of many synthetic market paths at once.
+
+    Every model produces a (n_paths, n_steps) array per field in one vectorized
+    pass (regime switching steps through time, vectorized over paths). Prices
+    follow exponentiated log returns, so they are always positive.
+    """
+
+    MODELS = ('gbm', 'regime', 'jump')
+
+    def __init__(self, config: MarketConfig = None, seed: int = 42):
+        self.config = config or MarketConfig()
+        self.seed = seed
+
+    def _log_returns(self, rng: np.random.Generator, model: str, n_paths: int, n_steps: int) -> np.ndarray:
+        config = self.config
+        dt = 1.0 / config.steps_per_year
+        shocks = rng.standard_normal((n_paths, n_steps))
+
+        if model == 'gbm':
+            return (config.drift - 0.5 * config.volatility ** 2) * dt + config.volatility * np.sqrt(dt) * shocks
+
+        if model == 'regime':
+            drifts = np.array([r.drift for r in config.regimes])
+            vols = np.array([r.volatility for r in config.regimes])
+            cumulative = np.cumsum(config.regime_transition(), axis=1)
+            uniforms = rng.random((n_paths, n_steps))
+            states = np.empty((n_paths, n_steps), dtype=np.int64)
+            state = rng.integers(0, len(config.regimes), size=n_paths)
+            for t in range(n_steps):
+                # Inverse-CDF draw of every path's next regime
+                state = np.minimum((uniforms[:, t, None] > cumulative[state]).sum(axis=1), len(vols) - 1)
+                states[:, t] = state
+            return (drifts[states] - 0.5 * vols[states] ** 2) * dt + vols[states] * np.sqrt(dt) * shocks
+
+        if model == 'jump':
+            # Merton jump diffusion, compensated so jumps don't change the expected drift
+            compensator = config.jump_intensity * (np.exp(config.jump_mean + 0.5 * config.jump_std ** 2) - 1)
+            diffusion = ((config.drift - compensator - 0.5 * config.volatility ** 2) * dt
+                         + config.volatility * np.sqrt(dt) * shocks)
+            n_jumps = rng.poisson(config.jump_intensity * dt, size=(n_paths, n_steps))
+            jumps = n_jumps * config.jump_mean + np.sqrt(n_jumps) * config.jump_std * rng.standard_normal((n_paths, n_steps))
+            return diffusion + jumps
+
+        raise ValueError(f"Unknown market model '{model}', expected one of {self.MODELS}")
+
+    def generate(self, n_paths: int = 1000, n_steps: int = 2160, model: str = 'gbm') -> Dict[str, np.ndarray]:
+        """
+        Generate synthetic market paths
+
+        Returns:
+            Dict[str, np.ndarray]: 'price', 'volume' and 'market_cap', each (n_paths, n_steps)
+        """
+        config = self.config
+        rng = np.random.default_rng(self.seed)
+        dt = 1.0 / config.steps_per_year
+
+        log_returns = self._log_returns(rng, model, n_paths, n_steps)
+        log_returns[:, 0] = 0.0
+        price = config.s0 * np.exp(np.cumsum(log_returns, axis=1))
+
+        # Volume rises with the size of moves: correlate log-volume shocks with |standardized returns|
+        abs_moves = np.abs(log_returns)
+        abs_moves = (abs_moves - abs_moves.mean()) / max(abs_moves.std(), 1e-12)
+        rho = config.volume_return_correlation
+        volume_shocks = rho * abs_moves + np.sqrt(1 - rho ** 2) * rng.standard_normal((n_paths, n_steps))
+        volume = config.base_volume * np.exp(config.volume_volatility * volume_shocks)
+
+        # Market cap tracks price through a slowly growing, slightly noisy supply
+        steps = np.arange(n_steps)
+        supply = config.circulating_supply * (1 + config.supply_growth * dt * steps)
+        supply = supply * (1 + 1e-4 * rng.standard_normal((n_paths, n_steps)))
+        market_cap = price * supply
+
+        return {'price': price, 'volume': volume, 'market_cap': market_cap}
+
+    @staticmethod
+    def to_frame(paths: Dict[str, np.ndarray], index: int = 0,
+                 step: pd.Timedelta = pd.Timedelta(hours=1)) -> pd.DataFrame:
+        """One path as a DataFrame with the columns fetch_crypto_data returns"""
+        n_steps = paths['price'].shape[1]
+        return pd.DataFrame({
+            'timestamp': pd.date_range(end=pd.Timestamp.now().floor('D'), periods=n_steps, freq=step),
+            'price': paths['price'][index],
+            'volume': paths['volume'][index],
+            'market_cap': paths['market_cap'][index],
+        })
@@ -1,17 +1,60 @@
 import torch
+import numpy as np
 import torch.nn as nn
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional
+from src.serialization import weights_from_bytes, weights_metadata
 
+MODELS: Dict[str, type] = {}
+
+def register_model(name: str):
+    """Class decorator adding a sequence model to the registry under `name`"""
+    def decorator(cls):
+        cls.architecture = name
+        MODELS[name] = cls
+        return cls
+    return decorator
+
+class ProbabilityHead(nn.Module):
+    """Dropout-MLP mapping the last time step's features to an up-move probability"""
+
+    def __init__(self, in_features: int, dropout: float = 0.2):
+        super().__init__()
+        self.dropout = nn.Dropout(dropout)
+        self.fc1 = nn.Linear(in_features, 64)
+        self.relu = nn.ReLU()
+        self.fc2 = nn.Linear(64, 1)
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        out = self.dropout(x)
+        out = self.relu(self.fc1(out))
+        out = self.dropout(out)
+        return self.sigmoid(self.fc2(out))
+
+@register_model('lstm')
 class SimpleLSTM(nn.Module):
-    def __init__(self, input_size: int, hidden_size: int = 128, num_layers: int = 2, dropout: float = 0.2):
+    """
+    Stacked LSTM classifier over (batch, sequence, features) windows
+
+    With batch_first=False inputs are transposed to a contiguous time-major layout
+    before the LSTM, which is faster on some CPUs. Inputs and outputs have the same
+    shapes either way and the state dicts are interchangeable.
+    """
+
+    def __init__(self, input_size: int, hidden_size: int = 128, num_layers: int = 2, dropout: float = 0.2,
+                 batch_first: bool = True):
         super().__init__()
+        self.hparams = dict(input_size=input_size, hidden_size=hidden_size, num_layers=num_layers, dropout=dropout)
+        self.batch_first = batch_first
         self.lstm = nn.LSTM(
             input_size=input_size,
             hidden_size=hidden_size,
             num_layers=num_layers,
-            batch_first=True,
+            batch_first=batch_first,
             dropout=dropout
         )
+        # Same layers as ProbabilityHead, but kept at the top level: existing weight files and
+        # LSTMEnsemble (src/ensemble.py) address them as fc1.* / fc2.*, not head.fc1.*
         self.dropout = nn.Dropout(dropout)
         self.fc1 = nn.Linear(hidden_size, 64)
         self.relu = nn.ReLU()
@@ -19,8 +62,24 @@ class SimpleLSTM(nn.Module):
         self.sigmoid = nn.Sigmoid()
         
     def forward(self, x):
-        lstm_out, _ = self.lstm(x)
-        out = self.dropout(lstm_out[:, -1, :])
+        if self.batch_first:
+            lstm_out, _ = self.lstm(x)
+            return self.head(lstm_out[:, -1, :])
+        lstm_out, _ = self.lstm(x.transpose(0, 1).contiguous())
+        return self.head(lstm_out[-1])
+
+    def init_state(self, batch_size: int):
+        """Zero (h, c) state for `batch_size` independent sequences"""
+        h = torch.zeros(self.lstm.num_layers, batch_size, self.lstm.hidden_size)
+        return h, torch.zeros_like(h)
+
+    def step(self, x, state):
+        """Advance the stacked LSTM by one time step for inputs of shape (batch, input_size)"""
+        lstm_out, state = self.lstm(x.unsqueeze(1 if self.batch_first else 0), state)
+        return self.head(lstm_out.squeeze(1 if self.batch_first else 0)), state
+
+    def head(self, last_hidden):
+        out = self.dropout(last_hidden)
         out = self.fc1(out)
         out = self.relu(out)
         out = self.dropout(out)
@@ -28,25 +87,139 @@ class SimpleLSTM(nn.Module):
         out = self.sigmoid(out)
         return out
 
+class CausalConvBlock(nn.Module):
+    def __init__(self, in_channels: int, channels: int, kernel_size: int, dilation: int, dropout: float):
+        super().__init__()
+        # Left padding only, so step t never sees steps after t
+        self.pad = (kernel_size - 1) * dilation
+        self.conv1 = nn.Conv1d(in_channels, channels, kernel_size, dilation=dilation)
+        self.conv2 = nn.Conv1d(channels, channels, kernel_size, dilation=dilation)
+        self.relu = nn.ReLU()
+        self.dropout = nn.Dropout(dropout)
+        self.residual = nn.Conv1d(in_channels, channels, 1) if in_channels != channels else nn.Identity()
+
+    def forward(self, x):
+        out = self.dropout(self.relu(self.conv1(nn.functional.pad(x, (self.pad, 0)))))
+        out = self.dropout(self.relu(self.conv2(nn.functional.pad(out, (self.pad, 0)))))
+        return self.relu(out + self.residual(x))
+
+@register_model('tcn')
+class TemporalConvNet(nn.Module):
+    """
+    Temporal convolution network: stacked causal dilated convolutions
+
+    Every time step of a window is computed in parallel. Each level holds two
+    convolutions with dilation 2 ** level, so the defaults (kernel size 3, levels
+    1, 2, 4) see 1 + 2 * 2 * (1 + 2 + 4) = 29 steps, more than a window.
+    """
+
+    def __init__(self, input_size: int, channels: int = 64, levels: int = 3, kernel_size: int = 3,
+                 dropout: float = 0.2):
+        super().__init__()
+        self.hparams = dict(input_size=input_size, channels=channels, levels=levels, kernel_size=kernel_size,
+                            dropout=dropout)
+        self.blocks = nn.Sequential(*[
+            CausalConvBlock(input_size if level == 0 else channels, channels, kernel_size, 2 ** level, dropout)
+            for level in range(levels)
+        ])
+        self.head = ProbabilityHead(channels, dropout)
+
+    @property
+    def receptive_field(self) -> int:
+        """Time steps that can influence the last output"""
+        return 1 + 2 * (self.hparams['kernel_size'] - 1) * (2 ** self.hparams['levels'] - 1)
+
+    def forward(self, x):
+        out = self.blocks(x.transpose(1, 2))  # (batch, channels, time)
+        return self.head(out[:, :, -1])
+
+@register_model('attention')
+class CausalAttention(nn.Module):
+    """Small transformer encoder with a causal mask, reading out the last time step"""
+
+    def __init__(self, input_size: int, d_model: int = 64, heads: int = 4, layers: int = 2,
+                 max_length: int = 64, dropout: float = 0.2):
+        super().__init__()
+        self.hparams = dict(input_size=input_size, d_model=d_model, heads=heads, layers=layers,
+                            max_length=max_length, dropout=dropout)
+        self.embed = nn.Linear(input_size, d_model)
+        self.position = nn.Parameter(0.02 * torch.randn(1, max_length, d_model))
+        layer = nn.TransformerEncoderLayer(d_model, heads, dim_feedforward=2 * d_model, dropout=dropout,
+                                           batch_first=True)
+        self.encoder = nn.TransformerEncoder(layer, layers)
+        self.head = ProbabilityHead(d_model, dropout)
+
+    def forward(self, x):
+        length = x.shape[1]
+        mask = torch.triu(torch.full((length, length), float('-inf'), device=x.device), diagonal=1)
+        out = self.encoder(self.embed(x) + self.position[:, :length], mask=mask)
+        return self.head(out[:, -1])
+
+def model_spec(model: nn.Module) -> Dict:
+    """Architecture name and hyperparameters, enough for build_model to rebuild the model"""
+    return {'architecture': model.architecture, **model.hparams}
+
+def default_spec(state_dict: Dict) -> Dict:
+    """Spec of weights saved before architectures were recorded: always SimpleLSTM"""
+    return {'architecture': 'lstm', 'input_size': state_dict['lstm.weight_ih_l0'].shape[1],
+            'hidden_size': state_dict['lstm.weight_hh_l0'].shape[1]}
+
+def build_model(spec: Dict, batch_first: bool = True) -> nn.Module:
+    """Instantiate a registered architecture from its spec (batch_first only applies to the LSTM)"""
+    kwargs = {k: v for k, v in spec.items() if k != 'architecture'}
+    if spec['architecture'] not in MODELS:
+        raise KeyError(f"Unknown architecture '{spec['architecture']}', registered: {sorted(MODELS)}")
+    if spec['architecture'] == 'lstm':
+        kwargs['batch_first'] = batch_first
+    return MODELS[spec['architecture']](**kwargs)
+
+def model_from_bytes(data: bytes, batch_first: bool = True) -> nn.Module:
+    """Rebuild the architecture recorded with encoded weights and load them, in eval mode"""
+    state_dict = weights_from_bytes(data)
+    model = build_model(weights_metadata(data).get('model') or default_spec(state_dict), batch_first=batch_first)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+def load_model(path: str, batch_first: bool = True) -> nn.Module:
+    with open(path, 'rb') as f:
+        return model_from_bytes(f.read(), batch_first=batch_first)
+
 class LocalTrainer:
-    def __init__(self, input_size: int):
-        self.model = SimpleLSTM(input_size)
+    def __init__(self, input_size: int, batch_size: int = 32, batch_first: bool = True,
+                 model: Optional[nn.Module] = None):
+        self.batch_size = batch_size
+        self.model = model if model is not None else SimpleLSTM(input_size, batch_first=batch_first)
         self.criterion = nn.BCELoss()
         self.optimizer = torch.optim.Adam(self.model.parameters(), lr=0.001)
         
     def train(self, X: torch.Tensor, y: torch.Tensor, epochs: int = 30) -> Dict:
         """Train the model and return its state dict"""
-        batch_size = 32
+        batch_size = self.batch_size
         n_batches = len(X) // batch_size
         
-        for epoch in range(epochs):
-            total_loss = 0
+        def batches():
             for i in range(n_batches):
                 start_idx = i * batch_size
                 end_idx = start_idx + batch_size
-                
-                batch_X = X[start_idx:end_idx]
-                batch_y = y[start_idx:end_idx]
+                yield X[start_idx:end_idx], y[start_idx:end_idx]
+        
+        return self.train_batches(batches, epochs=epochs)
+
+    def train_batches(self, batches: Callable[[], Iterable], epochs: int = 30) -> Dict:
+        """
+        Train from a source of (X, y) batches and return the model's state dict
+        
+        Args:
+            batches (Callable): Returns a fresh iterable of batches for each epoch;
+                NumPy arrays are wrapped as tensors without copying
+            epochs (int): Passes over the data
+        """
+        for epoch in range(epochs):
+            total_loss = 0
+            n_batches = 0
+            for batch_X, batch_y in batches():
+                if isinstance(batch_X, np.ndarray):
+                    batch_X, batch_y = torch.from_numpy(batch_X), torch.from_numpy(batch_y)
                 
                 self.optimizer.zero_grad()
                 outputs = self.model(batch_X)
@@ -55,6 +228,7 @@ class LocalTrainer:
                 self.optimizer.step()
                 
                 total_loss += loss.item()
+                n_batches += 1
             
             avg_loss = total_loss / n_batches
             if (epoch + 1) % 5 == 0:
@@ -62,12 +236,18 @@ class LocalTrainer:
                 
         return self.model.state_dict()
 
-def aggregate_models(model_weights_list: List[Dict]) -> Dict:
-    """Average the weights of multiple models"""
+def aggregate_models(model_weights_list: List[Dict], weights: Optional[List[float]] = None) -> Dict:
+    """Average the weights of multiple models, optionally weighted (e.g. by sample count for FedAvg)"""
     averaged_weights = {}
+    if weights is not None:
+        weights = torch.tensor(weights, dtype=torch.float32)
+        weights = weights / weights.sum()
     for key in model_weights_list[0].keys():
         # Stack same layers from different models
-        stacked = torch.stack([weights[key] for weights in model_weights_list])
+        stacked = torch.stack([model_weights[key] for model_weights in model_weights_list])
         # Take mean of stacked layers
-        averaged_weights[key] = torch.mean(stacked, dim=0)
-    return averaged_weights 
\ No newline at end of file
+        if weights is None:
+            averaged_weights[key] = torch.mean(stacked, dim=0)
+        else:
+            averaged_weights[key] = torch.tensordot(weights, stacked, dims=1)
+    return averaged_weights
@@ -0,0 +1,248 @@
+import os
+import json
+import lzma
+import zlib
+import pickle
+import struct
+import time
+import hashlib
+import threading
+import torch
+import torch.nn as nn
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from src.serialization import weights_from_bytes, weights_metadata
+from src.pipeline import file_digest
+from src.model import default_spec
+
+class ModelRejected(ValueError):
+    """A model version that loaded but must never be used"""
+
+def write_manifest(manifest_path: str, weights_path: str, **extra) -> Dict:
+    """Announce a new global model version next to its weights file"""
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    manifest = {
+        'version': previous.get('version', 0) + 1,
+        'path': weights_path,
+        'sha256': file_digest(weights_path),
+        'created': time.time(),
+        **extra
+    }
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+class ManifestSource:
+    """Versions announced in a JSON manifest written by write_manifest"""
+
+    def __init__(self, path: str = 'data/global_model.json'):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+
+    def latest(self) -> Optional[str]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            entry = json.load(f)
+        version = f"v{entry['version']}"
+        self._entries[version] = entry
+        return version
+
+    def fetch(self, version: str) -> bytes:
+        entry = self._entries[version]
+        with open(entry['path'], 'rb') as f:
+            data = f.read()
+        if entry.get('sha256') and hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise IOError(f"{entry['path']} doesn't match the digest announced for {version}")
+        return data
+
+class FileSource:
+    """Versions of a single weights file, identified by its content digest"""
+
+    def __init__(self, path: str = 'data/global_model_weights1.pth'):
+        self.path = path
+        self._stat = None
+        self._digest = None
+
+    def latest(self) -> Optional[str]:
+        if not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        # Only rehash when the file was replaced
+        if (stat.st_mtime_ns, stat.st_size) != self._stat:
+            self._stat, self._digest = (stat.st_mtime_ns, stat.st_size), file_digest(self.path)
+        return self._digest[:12]
+
+    def fetch(self, version: str) -> bytes:
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest()[:12] != version:
+            raise IOError(f"{self.path} changed while loading version {version}")
+        return data
+
+class ServerSource:
+    """Versions published to the storage server as CIDs (e.g. LocalModelServer)"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def latest(self) -> Optional[str]:
+        entry = self.server.latest_global()
+        return entry['cid'] if entry else None
+
+    def fetch(self, version: str) -> bytes:
+        data = self.server.download(version)
+        if hashlib.sha256(data).hexdigest() != version:
+            raise IOError(f"Downloaded model doesn't match CID {version}")
+        return data
+
+def validate_model(model: nn.Module, probe: torch.Tensor, holdout: Optional[tuple] = None,
+                   min_accuracy: Optional[float] = None):
+    """Raise ModelRejected unless the model gives finite probabilities (and enough holdout accuracy)"""
+    for name, tensor in model.state_dict().items():
+        if not torch.isfinite(tensor).all():
+            raise ModelRejected(f"Non-finite values in {name}")
+    with torch.no_grad():
+        probs = model(probe)
+    if probs.shape != (len(probe), 1) or not torch.isfinite(probs).all() or probs.min() < 0 or probs.max() > 1:
+        raise ModelRejected("Model doesn't produce valid probabilities on the probe batch")
+    if holdout is not None and min_accuracy is not None:
+        X, y = holdout
+        with torch.no_grad():
+            accuracy = ((model(X) > 0.5).float() == y).float().mean().item()
+        if accuracy < min_accuracy:
+            raise ModelRejected(f"Holdout accuracy {accuracy:.4f} below {min_accuracy:.4f}")
+
+@dataclass
+class LoadedModel:
+    version: str
+    model: nn.Module
+    load_ms: float
+    loaded_at: float = field(default_factory=time.time)
+
+class ModelWatcher:
+    """
+    Polls a model source and stages new versions for an atomic swap
+
+    New versions are loaded and validated on a background thread; the agent picks
+    them up with acquire() between decisions, so trading never waits on a load.
+    Replaced models are kept for rollback, and versions that fail validation or
+    are rolled back are never loaded again. build_model receives the model spec
+    recorded with each version's weights (see src/model.py), so a new version may
+    switch architecture.
+    """
+
+    def __init__(self, source, build_model: Callable[[Dict], nn.Module],
+                 validate: Optional[Callable[[nn.Module], None]] = None, keep: int = 3):
+        self.source = source
+        self.build_model = build_model
+        self.validate = validate
+        self.active: Optional[LoadedModel] = None
+        self.previous = deque(maxlen=keep)
+        self.rejected = set()
+        self.events: List[Dict] = []
+        self._pending: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _event(self, kind: str, version: str, detail: str = ''):
+        self.events.append({'time': time.time(), 'event': kind, 'version': version, 'detail': detail})
+
+    def _load(self, version: str) -> LoadedModel:
+        start = time.perf_counter()
+        data = self.source.fetch(version)
+        # Corrupt or truncated weights, encoded or legacy torch.save bytes, are never loaded
+        try:
+            state_dict = weights_from_bytes(data)
+        except (ValueError, KeyError, EOFError, struct.error, zlib.error, lzma.LZMAError, pickle.UnpicklingError,
+                RuntimeError) as e:
+            raise ModelRejected(f"Undecodable weights: {e}")
+        try:
+            model = self.build_model(weights_metadata(data).get('model') or default_spec(state_dict))
+            model.load_state_dict(state_dict)
+        except (KeyError, TypeError, RuntimeError) as e:
+            raise ModelRejected(f"Incompatible weights: {e}")
+        model.eval()
+        if self.validate is not None:
+            self.validate(model)
+        return LoadedModel(version, model, (time.perf_counter() - start) * 1000)
+
+    def load(self) -> LoadedModel:
+        """Load the latest version synchronously and make it active (startup)"""
+        version = self.source.latest()
+        if version is None:
+            raise FileNotFoundError(f"No global model version available from {type(self.source).__name__}")
+        loaded = self._load(version)
+        with self._lock:
+            if self.active is not None:
+                self.previous.append(self.active)
+            self.active = loaded
+        self._event('loaded', version)
+        return loaded
+
+    def check(self) -> bool:
+        """Poll once; stage a newer valid version and return whether one was staged"""
+        version = self.source.latest()
+        with self._lock:
+            known = {m.version for m in (self.active, self._pending) if m is not None}
+        if version is None or version in known or version in self.rejected:
+            return False
+        try:
+            loaded = self._load(version)
+        except ModelRejected as e:
+            self.rejected.add(version)
+            self._event('rejected', version, str(e))
+            print(f"Rejected global model {version}: {e}")
+            return False
+        except Exception as e:
+            # Unreadable or caught mid-write; try again on the next poll
+            self._event('load_failed', version, str(e))
+            return False
+        with self._lock:
+            self._pending = loaded
+        self._event('staged', version, f"{loaded.load_ms:.1f}ms")
+        return True
+
+    def acquire(self) -> Optional[LoadedModel]:
+        """The model to use for the next decision, promoting a staged version"""
+        with self._lock:
+            if self._pending is not None:
+                if self.active is not None:
+                    self.previous.append(self.active)
+                self.active, self._pending = self._pending, None
+                self._event('swapped', self.active.version)
+            return self.active
+
+    def rollback(self, reason: str = '') -> Optional[LoadedModel]:
+        """Return to the previous version and blacklist the current one"""
+        with self._lock:
+            if not self.previous:
+                return None
+            self.rejected.add(self.active.version)
+            self._event('rolled_back', self.active.version, reason)
+            self.active = self.previous.pop()
+            return self.active
+
+    def start(self, interval: float = 5.0):
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Model watcher error: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
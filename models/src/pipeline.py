@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def code_version(objects: Sequence[Any]) -> str:
+    """Digest of the source of functions, classes or modules a stage depends on"""
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            digest.update(repr(obj).encode())
+    return digest.hexdigest()
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable
+    deps: List[str] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    code: List[Any] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)  # Files the stage writes, re-checked on every hit
+    ttl: Optional[float] = None  # Seconds a cached result stays valid (for remote inputs)
+    cache: bool = True
+    cache_if: Optional[Callable[[Any], bool]] = None  # e.g. only keep uploads that succeeded
+
+class StageCache:
+    """
+    On-disk store of stage results keyed by content hash, evicted least recently used
+
+    Each entry is a pickle named by its key plus an index record with its size,
+    the digest of the pickled value, the digests of the files the stage wrote and
+    when it was last used.
+    """
+
+    def __init__(self, root: str = 'data/cache', max_bytes: int = 1 << 30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, 'index.json')
+        os.makedirs(root, exist_ok=True)
+        self.index: Dict[str, Dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        # Entries used during this run are never evicted by it
+        self.pinned = set()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.pkl')
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def lookup(self, key: str, ttl: Optional[float] = None) -> Optional[Dict]:
+        """Index record for a key if its value and output files are still intact"""
+        entry = self.index.get(key)
+        if entry is None or not os.path.exists(self._path(key)):
+            return None
+        if ttl is not None and time.time() - entry['created'] > ttl:
+            return None
+        if any(file_digest(path) != digest for path, digest in entry['files'].items()):
+            return None
+        entry['last_used'] = time.time()
+        self.pinned.add(key)
+        self._save_index()
+        return entry
+
+    def load(self, key: str) -> Any:
+        with open(self._path(key), 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, key: str, stage: str, payload: bytes, digest: str, files: Dict[str, str]):
+        tmp_path = self._path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+
+        now = time.time()
+        self.index[key] = {
+            'stage': stage,
+            'size': len(payload),
+            'digest': digest,
+            'files': files,
+            'created': now,
+            'last_used': now
+        }
+        self.pinned.add(key)
+        self.evict()
+        self._save_index()
+
+    def size(self) -> int:
+        return sum(entry['size'] for entry in self.index.values())
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.size()
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key in self.pinned:
+                continue
+            total -= self.index.pop(key)['size']
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+
+class Pipeline:
+    """
+    Explicit stage graph whose results are memoized by content
+
+    A stage's key hashes its name, code version, parameters and the digests of
+    its inputs' values, so a stage that recomputes to the same value leaves
+    everything downstream cached. Cached values are only loaded when a stage
+    that needs them actually runs.
+    """
+
+    def __init__(self, cache: StageCache, force: bool = False):
+        self.cache = cache
+        self.force = force
+        self.stages: Dict[str, Stage] = {}
+        self.report: List[Dict] = []
+
+    def add(self, name: str, fn: Callable, deps: Sequence[str] = (), **kwargs) -> Stage:
+        """Register a stage, called as fn(*dep_values, **params)"""
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        stage = Stage(name=name, fn=fn, deps=list(deps), **kwargs)
+        self.stages[name] = stage
+        return stage
+
+    def _required(self, targets: Sequence[str]) -> List[str]:
+        # Stages are registered after their dependencies, so registration order is topological
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def _key(self, stage: Stage, input_digests: List[str]) -> str:
+        description = {
+            'stage': stage.name,
+            'code': code_version([stage.fn] + stage.code),
+            'params': stage.params,
+            'inputs': input_digests
+        }
+        return _sha256(json.dumps(description, sort_keys=True, default=repr).encode())
+
+    def run(self, targets: Sequence[str] = None) -> Dict[str, Any]:
+        """
+        Run the stages needed for `targets` (default: all) and return their values
+        """
+        targets = list(targets or self.stages)
+        keys: Dict[str, str] = {}
+        digests: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        self.report = []
+
+        def value(name: str) -> Any:
+            if name not in values:
+                values[name] = self.cache.load(keys[name])
+            return values[name]
+
+        for name in self._required(targets):
+            stage = self.stages[name]
+            keys[name] = self._key(stage, [digests[dep] for dep in stage.deps])
+            start = time.perf_counter()
+
+            entry = None
+            if stage.cache and not self.force:
+                entry = self.cache.lookup(keys[name], ttl=stage.ttl)
+            if entry is not None:
+                digests[name] = entry['digest']
+                self.report.append({'stage': name, 'status': 'cached', 'seconds': time.perf_counter() - start})
+                continue
+
+            print(f"\n[{name}]")
+            result = stage.fn(*[value(dep) for dep in stage.deps], **stage.params)
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            values[name] = result
+            digests[name] = _sha256(payload)
+
+            if stage.cache and (stage.cache_if is None or stage.cache_if(result)):
+                files = {path: file_digest(path) for path in stage.outputs}
+                self.cache.put(keys[name], name, payload, digests[name], files)
+            self.report.append({'stage': name, 'status': 'ran', 'seconds': time.perf_counter() - start})
+
+        return {name: value(name) for name in targets}
+
+    def print_report(self):
+        print("\nPipeline stages:")
+        for row in self.report:
+            print(f"  {row['stage']:<32} {row['status']:<7} {row['seconds']:8.2f}s")
+        print(f"  Cache: {len(self.cache.index)} entries, {self.cache.size() / 1e6:.1f} MB "
+              f"(limit {self.cache.max_bytes / 1e6:.0f} MB)")
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+from typing import Dict
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of nanosecond latencies
+
+    Values below 2 * SUB_BUCKETS are counted exactly; above that each power-of-two
+    range is split into SUB_BUCKETS linear buckets, so every recorded value is
+    known to within 1 / SUB_BUCKETS (~1.6%) at constant memory and O(1) record cost.
+    """
+
+    SUB_BUCKET_BITS = 6
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # Linear buckets per power of two
+    MAX_EXPONENT = 48  # Up to ~3 days in nanoseconds
+
+    def __init__(self):
+        self.counts = [0] * (2 * self.SUB_BUCKETS + self.MAX_EXPONENT * self.SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < 2 * self.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS - 1
+        return 2 * self.SUB_BUCKETS + (shift - 1) * self.SUB_BUCKETS + (value >> shift) - self.SUB_BUCKETS
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        shift, offset = divmod(index - 2 * self.SUB_BUCKETS, self.SUB_BUCKETS)
+        shift += 1
+        return ((offset + self.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value_ns: int):
+        value_ns = max(int(value_ns), 0)
+        self.counts[min(self._index(value_ns), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        if self.min is None or value_ns < self.min:
+            self.min = value_ns
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentile(self, p: float) -> int:
+        """Value at or below which p% of recordings fall (bucket upper bound, capped at the max)"""
+        if self.count == 0:
+            return 0
+        rank = max(1, int(round(p / 100 * self.count + 0.5 - 1e-9)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        ms = 1e-6
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * ms if self.count else 0.0,
+            'p50_ms': self.percentile(50) * ms,
+            'p95_ms': self.percentile(95) * ms,
+            'p99_ms': self.percentile(99) * ms,
+            'max_ms': self.max * ms
+        }
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter_ns() - self.start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class PhaseProfiler:
+    """
+    Per-phase latency histograms for a hot loop
+
+    `with profiler.phase('model'): ...` times one phase of one iteration; timers
+    are created once per phase and reused, so instrumentation costs a couple of
+    perf_counter_ns calls per phase. Phases are reported in first-use order.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._timers: Dict[str, _Timer] = {}
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            self.histograms[name] = LatencyHistogram()
+            timer = self._timers[name] = _Timer(self.histograms[name])
+        return timer
+
+    def record(self, name: str, value_ns: int):
+        if not self.enabled:
+            return
+        if name not in self.histograms:
+            self.phase(name)
+        self.histograms[name].record(value_ns)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def slo_violations(self, slo_ms: Dict[str, float], percentile: float = 99) -> Dict[str, float]:
+        """Phases whose latency at `percentile` exceeds their SLO, with the observed value in ms"""
+        violations = {}
+        for name, limit in slo_ms.items():
+            if name in self.histograms:
+                observed = self.histograms[name].percentile(percentile) * 1e-6
+                if observed > limit:
+                    violations[name] = observed
+        return violations
+
+    def report(self, title: str = "Decision latency by phase"):
+        print(f"\n{title}:")
+        print(f"  {'phase':<12} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+        for name, stats in self.summary().items():
+            print(f"  {name:<12} {stats['count']:>7} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} "
+                  f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['max_ms']:>9.3f}")
+
+    def save(self, path: str, **extra):
+        """Write the summary as JSON atomically, so readers never see a partial file"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'updated': time.time(), 'phases': self.summary(), **extra}, f, indent=2)
+        os.replace(tmp_path, path)
+
+def to_prometheus(report: Dict, metric: str = 'agent_decision_latency_ms') -> str:
+    """Render a saved profiler report in the Prometheus text exposition format"""
+    lines = [f"# HELP {metric} Trading agent decision latency by phase",
+             f"# TYPE {metric} summary"]
+    for phase, stats in report.get('phases', {}).items():
+        for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms'), ('1', 'max_ms')):
+            lines.append(f'{metric}{{phase="{phase}",quantile="{quantile}"}} {stats[key]:.6f}')
+        lines.append(f'{metric}_sum{{phase="{phase}"}} {stats["mean_ms"] * stats["count"]:.6f}')
+        lines.append(f'{metric}_count{{phase="{phase}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
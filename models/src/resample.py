@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+# Bar length in seconds for each supported timeframe
+TIMEFRAMES: Dict[str, int] = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1d': 24 * 60 * 60,
+}
+
+def timeframe_seconds(timeframe: str) -> int:
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe '{timeframe}', expected one of {list(TIMEFRAMES)}")
+    return TIMEFRAMES[timeframe]
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, volume_agg: str = 'last') -> pd.DataFrame:
+    """
+    Build OHLCV bars from tick or point data
+
+    Args:
+        df (pd.DataFrame): Rows with 'timestamp', 'price', 'volume', 'market_cap' and
+            optionally 'open', 'high', 'low' (e.g. finer bars being resampled again)
+        timeframe (str): Bar length, one of TIMEFRAMES
+        volume_agg (str): 'last' for snapshot volumes such as CoinGecko's rolling
+            24h totals, 'sum' for per-trade volumes
+
+    Returns:
+        pd.DataFrame: One row per non-empty bar, stamped with the bar's open time;
+            'price' holds the close so downstream stages work unchanged
+    """
+    if volume_agg not in ('last', 'sum'):
+        raise ValueError(f"volume_agg must be 'last' or 'sum', got '{volume_agg}'")
+    step_ns = timeframe_seconds(timeframe) * 1_000_000_000
+
+    df = df.sort_values('timestamp', kind='stable')
+    timestamps = pd.to_datetime(df['timestamp']).values.astype('datetime64[ns]').astype(np.int64)
+    close = df['price'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64) if 'high' in df else close
+    low = df['low'].to_numpy(dtype=np.float64) if 'low' in df else close
+    first = df['open'].to_numpy(dtype=np.float64) if 'open' in df else close
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    market_cap = df['market_cap'].to_numpy(dtype=np.float64)
+
+    # Rows are sorted, so each bar is a contiguous run of equal bucket ids
+    buckets = timestamps // step_ns
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    bars = pd.DataFrame({
+        'timestamp': pd.to_datetime(buckets[starts] * step_ns),
+        'open': first[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'price': close[ends],
+        'volume': np.add.reduceat(volume, starts) if volume_agg == 'sum' else volume[ends],
+        'market_cap': market_cap[ends],
+        'n_ticks': ends - starts + 1,
+    })
+    return bars
+
+def align_timeframes(frames: Dict[str, pd.DataFrame], base: str, columns: list) -> pd.DataFrame:
+    """
+    Join higher-timeframe indicator columns onto the base timeframe's rows
+
+    Each higher bar only becomes visible once it has closed, so base rows never see
+    a bar that is still forming. Joined columns are suffixed with the timeframe,
+    e.g. 'rsi_1h'. Base rows before every higher timeframe's first closed bar are
+    dropped.
+    """
+    merged = frames[base].copy()
+    joined = []
+    merged['_available_at'] = merged['timestamp'] + pd.Timedelta(seconds=timeframe_seconds(base))
+
+    for timeframe, frame in frames.items():
+        if timeframe == base:
+            continue
+        higher = frame[['timestamp'] + columns].copy()
+        higher['_available_at'] = higher['timestamp'] + pd.Timedelta(seconds=timeframe_seconds(timeframe))
+        higher = higher.drop(columns='timestamp').rename(columns={c: f"{c}_{timeframe}" for c in columns})
+        joined += [c for c in higher.columns if c != '_available_at']
+        merged = pd.merge_asof(merged, higher, on='_available_at', direction='backward')
+
+    merged = merged.drop(columns='_available_at')
+    # Backfilling these rows would show them a bar that closes after them
+    return merged.dropna(subset=joined).reset_index(drop=True)
@@ -0,0 +1,123 @@
+import os
+import json
+import math
+import struct
+import threading
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+
+RESULT_FD_ENV = 'CONFLUX_RESULT_FD'
+_HEADER = struct.Struct('>I')
+
+def _jsonable(value):
+    # Trade records carry NumPy scalars and pandas timestamps read from DataFrames
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _finite(value):
+    # NaN/inf (e.g. a warm-up predicted_prob) aren't JSON; the web app's JSON.parse would reject the page
+    if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def encode_frame(kind: str, data: Dict) -> bytes:
+    """One message as a 4-byte big-endian length followed by its JSON body (non-finite floats as null)"""
+    body = json.dumps({'type': kind, 'data': _finite(data)}, default=_jsonable, allow_nan=False).encode()
+    return _HEADER.pack(len(body)) + body
+
+class ResultWriter:
+    """
+    Publishes agent results as length-prefixed JSON frames on a file descriptor
+
+    The server passes the write end of a pipe to the agent process (its number in
+    CONFLUX_RESULT_FD), so records arrive as they are made and stdout stays free
+    for human-readable progress.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['ResultWriter']:
+        fd = os.environ.get(RESULT_FD_ENV)
+        return cls(int(fd)) if fd else None
+
+    def publish(self, kind: str, data: Dict):
+        frame = memoryview(encode_frame(kind, data))
+        with self._lock:
+            # Pipes may accept only part of a large write
+            while frame:
+                frame = frame[os.write(self.fd, frame):]
+
+    def close(self):
+        os.close(self.fd)
+
+def _read_exact(fd: int, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            if chunks:
+                raise EOFError("Result channel closed mid-frame")
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def read_frames(fd: int) -> Iterator[Dict]:
+    """Decoded messages from a result channel until the writer closes it"""
+    while True:
+        header = _read_exact(fd, _HEADER.size)
+        if header is None:
+            return
+        yield json.loads(_read_exact(fd, _HEADER.unpack(header)[0]))
+
+class ResultStore:
+    """Records received from the agent, kept decoded in memory for paginated reads"""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+        self.status: Dict = {'running': False}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+            self.status = {'running': True}
+
+    def handle(self, message: Dict):
+        with self._lock:
+            if message['type'] == 'trade':
+                self.records.append(message['data'])
+            elif message['type'] == 'run_started':
+                self.status = {'running': True, **message['data']}
+            elif message['type'] == 'run_finished':
+                self.status = {**self.status, **message['data'], 'running': False}
+
+    def consume(self, fd: int):
+        """Read a channel until the agent closes it (run on a background thread)"""
+        try:
+            for message in read_frames(fd):
+                self.handle(message)
+        finally:
+            os.close(fd)
+            with self._lock:
+                self.status['running'] = False
+
+    def page(self, offset: int = 0, limit: int = 100) -> Dict:
+        with self._lock:
+            return {
+                'total': len(self.records),
+                'offset': offset,
+                'limit': limit,
+                'status': dict(self.status),
+                'records': self.records[offset:offset + limit]
+            }
@@ -0,0 +1,218 @@
+import io
+import json
+import lzma
+import struct
+import zlib
+import hashlib
+import torch
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Container layout: MAGIC | manifest length (uint32, big endian) | manifest JSON | payload
+MAGIC = b'CFXW\x01'
+FORMAT_VERSION = 1
+
+DTYPES = ('fp32', 'fp16', 'bf16')
+COMPRESSIONS = ('none', 'zlib', 'lzma')
+
+def state_dict_digest(state_dict: Dict) -> str:
+    """SHA-256 over the float32 values of a state dict, in key order"""
+    digest = hashlib.sha256()
+    for key, tensor in state_dict.items():
+        digest.update(key.encode())
+        digest.update(_to_numpy(tensor).tobytes())
+    return digest.hexdigest()
+
+def _to_numpy(tensor) -> np.ndarray:
+    if isinstance(tensor, torch.Tensor):
+        tensor = tensor.detach().cpu().float().numpy()
+    return np.ascontiguousarray(tensor, dtype=np.float32)
+
+def _cast(values: np.ndarray, dtype: str) -> np.ndarray:
+    """Cast float32 values to the wire dtype"""
+    if dtype == 'fp32':
+        return values
+    if dtype == 'fp16':
+        return values.astype(np.float16)
+    # bfloat16 is the top half of a float32, rounded to nearest even
+    bits = values.view(np.uint32)
+    rounding = ((bits >> 16) & 1) + np.uint32(0x7FFF)
+    return ((bits + rounding) >> 16).astype(np.uint16)
+
+def _uncast(buffer: bytes, dtype: str) -> np.ndarray:
+    """Decode wire values back to float32"""
+    if dtype == 'fp32':
+        return np.frombuffer(buffer, dtype=np.float32).copy()
+    if dtype == 'fp16':
+        return np.frombuffer(buffer, dtype=np.float16).astype(np.float32)
+    bits = np.frombuffer(buffer, dtype=np.uint16).astype(np.uint32) << 16
+    return bits.view(np.float32)
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Group bytes by significance so exponents sit together and compress better"""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+def _unshuffle(buffer: bytes, itemsize: int) -> bytes:
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+def _compress(payload: bytes, compression: str) -> bytes:
+    if compression == 'zlib':
+        return zlib.compress(payload, 6)
+    if compression == 'lzma':
+        return lzma.compress(payload)
+    return payload
+
+def _decompress(payload: bytes, compression: str) -> bytes:
+    if compression == 'zlib':
+        return zlib.decompress(payload)
+    if compression == 'lzma':
+        return lzma.decompress(payload)
+    return payload
+
+def encode_state_dict(state_dict: Dict, dtype: str = 'fp16', base: Optional[Dict] = None,
+                      topk: Optional[float] = None, compression: str = 'zlib',
+                      metadata: Optional[Dict] = None) -> bytes:
+    """
+    Encode model weights into the compact exchange format
+
+    Args:
+        state_dict (Dict): Weights to encode
+        dtype (str): Wire precision, one of 'fp32', 'fp16' or 'bf16'
+        base (Dict): Previous global weights; when given only the delta is sent
+        topk (float): Fraction of delta entries to keep per tensor (requires base)
+        compression (str): Lossless codec, one of 'none', 'zlib' or 'lzma'
+        metadata (Dict): Extra fields recorded in the manifest
+
+    Returns:
+        bytes: Self-describing encoded weights
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}', expected one of {DTYPES}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}', expected one of {COMPRESSIONS}")
+    if topk is not None and base is None:
+        raise ValueError("Top-k sparsification requires a base model to take deltas against")
+    if topk is not None and not 0 < topk <= 1:
+        raise ValueError(f"topk must be in (0, 1], got {topk}")
+
+    tensors = []
+    chunks = []
+    offset = 0
+    for key, tensor in state_dict.items():
+        values = _to_numpy(tensor)
+        shape = list(values.shape)
+        values = values.reshape(-1)
+        if base is not None:
+            values = values - _to_numpy(base[key]).reshape(-1)
+
+        entry = {'name': key, 'shape': shape, 'encoding': 'dense'}
+        if topk is not None and topk < 1:
+            k = max(1, int(np.ceil(topk * values.size)))
+            indices = np.sort(np.argpartition(np.abs(values), -k)[-k:]).astype(np.uint32)
+            # Gaps between sorted indices are small and compress far better than raw indices
+            index_bytes = np.diff(indices, prepend=np.uint32(0)).astype(np.uint32).tobytes()
+            chunks.append(index_bytes)
+            entry.update({'encoding': 'sparse', 'nnz': k, 'index_nbytes': len(index_bytes)})
+            offset += len(index_bytes)
+            values = values[indices]
+
+        wire = _cast(values, dtype)
+        value_bytes = _shuffle(wire)
+        chunks.append(value_bytes)
+        entry.update({'offset': offset, 'nbytes': len(value_bytes)})
+        offset += len(value_bytes)
+        tensors.append(entry)
+
+    raw_payload = b''.join(chunks)
+    payload = _compress(raw_payload, compression)
+
+    manifest = {
+        'format': 'conflux-weights',
+        'version': FORMAT_VERSION,
+        'dtype': dtype,
+        'compression': compression,
+        'delta': base is not None,
+        'base_sha256': state_dict_digest(base) if base is not None else None,
+        'topk': topk,
+        'raw_nbytes': len(raw_payload),
+        'payload_sha256': hashlib.sha256(payload).hexdigest(),
+        'tensors': tensors,
+        'metadata': metadata or {}
+    }
+    manifest_bytes = json.dumps(manifest).encode()
+    return MAGIC + struct.pack('>I', len(manifest_bytes)) + manifest_bytes + payload
+
+def _split(data: bytes) -> Tuple[Dict, bytes]:
+    if not data.startswith(MAGIC):
+        raise ValueError("Not an encoded weights file")
+    header_end = len(MAGIC) + 4
+    (manifest_len,) = struct.unpack('>I', data[len(MAGIC):header_end])
+    manifest = json.loads(data[header_end:header_end + manifest_len].decode())
+    return manifest, data[header_end + manifest_len:]
+
+def decode_state_dict(data: bytes, base: Optional[Dict] = None) -> Dict[str, torch.Tensor]:
+    """Decode weights produced by encode_state_dict back into a float32 state dict"""
+    manifest, payload = _split(data)
+
+    if hashlib.sha256(payload).hexdigest() != manifest['payload_sha256']:
+        raise ValueError("Weights payload checksum mismatch")
+    if manifest['delta']:
+        if base is None:
+            raise ValueError("Weights are a delta; the base model they were encoded against is required")
+        if state_dict_digest(base) != manifest['base_sha256']:
+            raise ValueError("Base model does not match the one the delta was encoded against")
+
+    raw_payload = _decompress(payload, manifest['compression'])
+    itemsize = 4 if manifest['dtype'] == 'fp32' else 2
+
+    state_dict = {}
+    for entry in manifest['tensors']:
+        numel = int(np.prod(entry['shape'], dtype=np.int64))
+        value_bytes = raw_payload[entry['offset']:entry['offset'] + entry['nbytes']]
+        values = _uncast(_unshuffle(value_bytes, itemsize), manifest['dtype'])
+
+        if entry['encoding'] == 'sparse':
+            index_start = entry['offset'] - entry['index_nbytes']
+            gaps = np.frombuffer(raw_payload[index_start:entry['offset']], dtype=np.uint32)
+            dense = np.zeros(numel, dtype=np.float32)
+            dense[np.cumsum(gaps, dtype=np.int64)] = values
+            values = dense
+
+        if manifest['delta']:
+            values = values + _to_numpy(base[entry['name']]).reshape(-1)
+        state_dict[entry['name']] = torch.from_numpy(values.reshape(entry['shape']).copy())
+
+    return state_dict
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """Return the manifest of an encoded weights file, or None for a legacy torch.save file"""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC) + 4)
+        if not head.startswith(MAGIC):
+            return None
+        (manifest_len,) = struct.unpack('>I', head[len(MAGIC):])
+        return json.loads(f.read(manifest_len).decode())
+
+def weights_metadata(data: bytes) -> Dict:
+    """The metadata recorded with encoded weights ({} for legacy torch.save bytes)"""
+    if not data.startswith(MAGIC):
+        return {}
+    return _split(data)[0].get('metadata', {})
+
+def save_weights(state_dict: Dict, path: str, **kwargs) -> Dict:
+    """Encode weights to `path` and return the manifest (see encode_state_dict)"""
+    data = encode_state_dict(state_dict, **kwargs)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return _split(data)[0]
+
+def weights_from_bytes(data: bytes, base: Optional[Dict] = None) -> Dict[str, torch.Tensor]:
+    """Decode encoded weights, falling back to torch.load for legacy torch.save bytes"""
+    if not data.startswith(MAGIC):
+        return torch.load(io.BytesIO(data))
+    return decode_state_dict(data, base=base)
+
+def load_weights(path: str, base: Optional[Dict] = None) -> Dict[str, torch.Tensor]:
+    """Load weights from an encoded file, falling back to torch.load for legacy files"""
+    with open(path, 'rb') as f:
+        return weights_from_bytes(f.read(), base=base)
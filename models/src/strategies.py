@@ -0,0 +1,387 @@
+import ast
+import json
+import numpy as np
+from dataclasses import dataclass, field
+from importlib import metadata
+from typing import Callable, Dict, List, Optional, Union
+
+ENTRY_POINT_GROUP = 'conflux_ai.strategies'
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """Shift along the time (last) axis, NaN-padding the start"""
+    if periods < 1:
+        raise ValueError(f"Shift periods must be at least 1 (only past values), got {periods}")
+    shifted = np.full_like(values, np.nan, dtype=np.float64)
+    shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+def _actions(buy: np.ndarray, sell: np.ndarray, warmup: int) -> np.ndarray:
+    """Combine buy/sell conditions into -1/0/1 actions; buy wins like in should_trade"""
+    actions = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+    actions[..., :warmup] = 0
+    return actions
+
+class Expr:
+    """
+    Node of a strategy rule over indicator columns
+
+    Rules are built with Python operators, e.g. `(col('price') < col('sma_20')) & ...`,
+    and evaluate to arrays shaped like the indicator columns, (..., time).
+    """
+    args: tuple = ()
+
+    def apply(self, data: Dict[str, np.ndarray], *values):
+        raise NotImplementedError
+
+    def columns(self) -> List[str]:
+        names = []
+        for arg in self.args:
+            names.extend(name for name in arg.columns() if name not in names)
+        return names
+
+    def shift(self, periods: int = 1) -> 'Expr':
+        return Shift(self, periods)
+
+    def __add__(self, other): return BinaryOp('+', self, other)
+    def __radd__(self, other): return BinaryOp('+', other, self)
+    def __sub__(self, other): return BinaryOp('-', self, other)
+    def __rsub__(self, other): return BinaryOp('-', other, self)
+    def __mul__(self, other): return BinaryOp('*', self, other)
+    def __rmul__(self, other): return BinaryOp('*', other, self)
+    def __truediv__(self, other): return BinaryOp('/', self, other)
+    def __rtruediv__(self, other): return BinaryOp('/', other, self)
+    def __gt__(self, other): return BinaryOp('>', self, other)
+    def __lt__(self, other): return BinaryOp('<', self, other)
+    def __ge__(self, other): return BinaryOp('>=', self, other)
+    def __le__(self, other): return BinaryOp('<=', self, other)
+    def __and__(self, other): return BinaryOp('&', self, other)
+    def __or__(self, other): return BinaryOp('|', self, other)
+    def __invert__(self): return Not(self)
+
+class Column(Expr):
+    def __init__(self, name: str):
+        self.name = name
+
+    def apply(self, data, *values):
+        if self.name not in data:
+            raise KeyError(f"Strategy uses unknown column '{self.name}', available: {sorted(data)}")
+        return data[self.name]
+
+    def columns(self) -> List[str]:
+        return [self.name]
+
+    def __repr__(self):
+        return self.name
+
+class Constant(Expr):
+    def __init__(self, value: float):
+        self.value = value
+
+    def apply(self, data, *values):
+        return self.value
+
+    def __repr__(self):
+        return repr(self.value)
+
+def _wrap(value) -> Expr:
+    return value if isinstance(value, Expr) else Constant(value)
+
+class BinaryOp(Expr):
+    OPS = {
+        '+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide,
+        '>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal,
+        '&': np.logical_and, '|': np.logical_or
+    }
+
+    def __init__(self, op: str, left, right):
+        self.op = op
+        self.args = (_wrap(left), _wrap(right))
+
+    def apply(self, data, left, right):
+        return self.OPS[self.op](left, right)
+
+    def __repr__(self):
+        return f"({self.args[0]!r} {self.op} {self.args[1]!r})"
+
+class Not(Expr):
+    def __init__(self, operand):
+        self.args = (_wrap(operand),)
+
+    def apply(self, data, operand):
+        return np.logical_not(operand)
+
+    def __repr__(self):
+        return f"~{self.args[0]!r}"
+
+class Shift(Expr):
+    def __init__(self, operand, periods: int):
+        if isinstance(periods, Expr) or periods != int(periods) or periods < 1:
+            raise ValueError(f"Shift periods must be an integer of at least 1 (only past values), got {periods!r}")
+        self.args = (_wrap(operand),)
+        self.periods = int(periods)
+
+    def apply(self, data, operand):
+        return _shift(np.asarray(operand, dtype=np.float64), self.periods)
+
+    def __repr__(self):
+        return f"shift({self.args[0]!r}, {self.periods})"
+
+def col(name: str) -> Column:
+    return Column(name)
+
+def pct_change(expr: Expr, periods: int = 1) -> Expr:
+    past = _wrap(expr).shift(periods)
+    return (expr - past) / past
+
+def crosses_above(fast, slow) -> Expr:
+    """True on the row where `fast` moves from at or below `slow` to above it"""
+    fast, slow = _wrap(fast), _wrap(slow)
+    return (fast.shift(1) <= slow.shift(1)) & (fast > slow)
+
+def crosses_below(fast, slow) -> Expr:
+    fast, slow = _wrap(fast), _wrap(slow)
+    return (fast.shift(1) >= slow.shift(1)) & (fast < slow)
+
+def breaks_above(value, band) -> Expr:
+    return _wrap(value) > band
+
+def breaks_below(value, band) -> Expr:
+    return _wrap(value) < band
+
+# Functions available to rules written as text (config files)
+FUNCTIONS = {
+    'shift': lambda expr, periods=1: _wrap(expr).shift(periods),
+    'pct_change': pct_change,
+    'crosses_above': crosses_above,
+    'crosses_below': crosses_below,
+    'breaks_above': breaks_above,
+    'breaks_below': breaks_below,
+}
+
+_AST_OPS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.Gt: '>', ast.Lt: '<', ast.GtE: '>=', ast.LtE: '<=',
+}
+
+def parse(text: str) -> Expr:
+    """
+    Parse a rule such as "rsi < 30" or "crosses_above(ema_12, ema_26)"
+
+    Bare names are indicator columns; `and`/`or`/`not`, arithmetic, comparisons
+    (chains included) and FUNCTIONS, with positional or keyword arguments, are
+    supported. Nothing is evaluated as Python.
+    """
+    def visit(node):
+        if isinstance(node, ast.Name):
+            return col(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp):
+            operand = visit(node.operand)
+            if isinstance(node.op, ast.Not):
+                return ~_wrap(operand)
+            if isinstance(node.op, ast.USub):
+                return -operand if not isinstance(operand, Expr) else 0 - operand
+        if isinstance(node, ast.BinOp) and type(node.op) in _AST_OPS:
+            return BinaryOp(_AST_OPS[type(node.op)], visit(node.left), visit(node.right))
+        if isinstance(node, ast.BoolOp):
+            op = '&' if isinstance(node.op, ast.And) else '|'
+            result = _wrap(visit(node.values[0]))
+            for value in node.values[1:]:
+                result = BinaryOp(op, result, visit(value))
+            return result
+        if isinstance(node, ast.Compare) and all(type(op) in _AST_OPS for op in node.ops):
+            operands = [visit(node.left)] + [visit(c) for c in node.comparators]
+            result = None
+            for op, left, right in zip(node.ops, operands, operands[1:]):
+                comparison = BinaryOp(_AST_OPS[type(op)], left, right)
+                result = comparison if result is None else result & comparison
+            return result
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+            if any(keyword.arg is None for keyword in node.keywords):
+                raise ValueError(f"Unsupported **arguments in strategy rule '{text}'")
+            args = [visit(arg) for arg in node.args]
+            kwargs = {keyword.arg: visit(keyword.value) for keyword in node.keywords}
+            try:
+                return FUNCTIONS[node.func.id](*args, **kwargs)
+            except TypeError as e:
+                raise ValueError(f"Bad arguments to {node.func.id} in strategy rule '{text}': {e}") from e
+        raise ValueError(f"Unsupported syntax in strategy rule '{text}': {ast.dump(node)}")
+
+    return _wrap(visit(ast.parse(text, mode='eval').body))
+
+def compile_exprs(exprs: List[Expr]) -> Callable[[Dict[str, np.ndarray]], List[np.ndarray]]:
+    """
+    Flatten expressions into one straight-line program of NumPy calls
+
+    Identical subexpressions (e.g. a shifted column used by both the buy and the
+    sell rule) are computed once per call.
+    """
+    slots: Dict[str, int] = {}
+    steps = []
+
+    def visit(node: Expr) -> int:
+        key = repr(node)
+        if key not in slots:
+            args = [visit(arg) for arg in node.args]
+            steps.append((node, args))
+            slots[key] = len(steps) - 1
+        return slots[key]
+
+    outputs = [visit(expr) for expr in exprs]
+
+    def run(data: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        values = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for node, args in steps:
+                values.append(node.apply(data, *[values[i] for i in args]))
+        return [values[i] for i in outputs]
+
+    return run
+
+@dataclass
+class Sizing:
+    buy_fraction: float = 0.1  # Share of cash spent on a buy
+    sell_fraction: float = 0.5  # Share of the position sold on a sell
+
+@dataclass
+class Strategy:
+    name: str
+    buy: Expr
+    sell: Expr
+    warmup: int = 0  # Leading rows that never trade
+    sizing: Sizing = field(default_factory=Sizing)
+    description: str = ''
+
+    def columns(self) -> List[str]:
+        return list(dict.fromkeys(self.buy.columns() + self.sell.columns()))
+
+    def compile(self) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+        """Vectorized signal function: indicator arrays (..., time) -> int8 actions"""
+        program = compile_exprs([_wrap(self.buy), _wrap(self.sell)])
+
+        def signals(data: Dict[str, np.ndarray]) -> np.ndarray:
+            shape = np.shape(data['price'])
+            buy, sell = (np.broadcast_to(value, shape) for value in program(data))
+            return _actions(buy, sell, self.warmup)
+
+        return signals
+
+    @classmethod
+    def from_config(cls, name: str, spec: Dict) -> 'Strategy':
+        """Build a strategy from {'buy': rule, 'sell': rule, 'warmup', 'buy_fraction', 'sell_fraction'}"""
+        return cls(
+            name=name,
+            buy=parse(spec['buy']),
+            sell=parse(spec['sell']),
+            warmup=int(spec.get('warmup', 0)),
+            sizing=Sizing(spec.get('buy_fraction', 0.1), spec.get('sell_fraction', 0.5)),
+            description=spec.get('description', '')
+        )
+
+STRATEGIES: Dict[str, Strategy] = {}
+
+def register(strategy: Strategy) -> Strategy:
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+def get_strategy(name: str) -> Strategy:
+    if name not in STRATEGIES:
+        raise KeyError(f"Unknown strategy '{name}', registered: {sorted(STRATEGIES)}")
+    return STRATEGIES[name]
+
+def momentum_strategy(window: int = 5, buy_threshold: float = 0.02,
+                      sell_threshold: float = -0.01, name: str = 'momentum_trader') -> Strategy:
+    momentum = pct_change(col('price'), window)
+    return Strategy(name, buy=momentum > buy_threshold, sell=momentum < sell_threshold, warmup=window,
+                    description=f"Buy on {window}-row gains above {buy_threshold:.0%}, sell on drops")
+
+price, sma_20, sma_50 = col('price'), col('sma_20'), col('sma_50')
+volume_spike = col('volume') > col('volume_sma_20') * 1.5
+price_change = price / price.shift(1) - 1
+
+register(momentum_strategy())
+register(Strategy(
+    'mean_reversion_trader',
+    buy=(price < sma_20) & (sma_20 < sma_50),
+    sell=(price > sma_20) & (sma_20 > sma_50),
+    warmup=50,
+    description="Buy below a falling SMA stack, sell above a rising one"
+))
+register(Strategy(
+    'breakout_trader',
+    buy=breaks_above(price, col('bollinger_high')),
+    sell=breaks_below(price, col('bollinger_low')),
+    warmup=20,
+    description="Trade Bollinger band breaks"
+))
+register(Strategy(
+    'trend_following_trader',
+    buy=crosses_above(col('ema_12'), col('ema_26')),
+    sell=crosses_below(col('ema_12'), col('ema_26')),
+    warmup=26,
+    description="EMA 12/26 crossovers"
+))
+register(Strategy(
+    'rsi_trader',
+    buy=col('rsi') < 30,
+    sell=col('rsi') > 70,
+    warmup=14,
+    description="Buy oversold, sell overbought"
+))
+register(Strategy(
+    'volume_trader',
+    buy=volume_spike & (price_change > 0),
+    sell=volume_spike & (price_change < 0),
+    warmup=20,
+    description="Follow price moves on volume spikes"
+))
+del price, sma_20, sma_50, volume_spike, price_change
+
+def load_entry_points(group: str = ENTRY_POINT_GROUP) -> List[str]:
+    """
+    Register strategies published by installed packages
+
+    Each entry point may load a Strategy, a list of them, or a callable returning either.
+    """
+    try:
+        entry_points = metadata.entry_points(group=group)
+    except TypeError:  # Python < 3.10
+        entry_points = metadata.entry_points().get(group, [])
+
+    names = []
+    for entry_point in entry_points:
+        try:
+            loaded = entry_point.load()
+            loaded = loaded() if callable(loaded) and not isinstance(loaded, Strategy) else loaded
+        except Exception as e:
+            print(f"Error loading strategy entry point {entry_point.name}: {e}")
+            continue
+        for strategy in loaded if isinstance(loaded, (list, tuple)) else [loaded]:
+            names.append(register(strategy).name)
+    return names
+
+def load_strategy_file(path: str) -> List[str]:
+    """Register strategies from a JSON file: {"strategies": {name: spec}}, see Strategy.from_config"""
+    with open(path) as f:
+        specs = json.load(f).get('strategies', {})
+    return [register(Strategy.from_config(name, spec)).name for name, spec in specs.items()]
+
+def load_strategies(names: Optional[List[str]] = None, path: Optional[str] = None,
+                    entry_points: bool = True) -> Dict[str, Strategy]:
+    """
+    Collect the enabled strategies
+
+    Args:
+        names (List[str]): Strategies to enable (default: every registered one)
+        path (str): Optional JSON file with extra strategy definitions
+        entry_points (bool): Also register strategies from installed packages
+
+    Returns:
+        Dict[str, Strategy]: Enabled strategies by name, in the order given
+    """
+    if entry_points:
+        load_entry_points()
+    if path:
+        load_strategy_file(path)
+    return {name: get_strategy(name) for name in (names or list(STRATEGIES))}
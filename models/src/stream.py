@@ -0,0 +1,384 @@
+import math
+import time
+import torch
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+class ReplayFeed:
+    """Replays candles from a local CSV file as a stand-in for an exchange feed"""
+
+    def __init__(self, path: str, interval: float = 0.0, start: int = 0, limit: Optional[int] = None):
+        self.df = pd.read_csv(path)
+        self.interval = interval  # Seconds between ticks, 0 replays as fast as possible
+        self.start = start
+        self.limit = limit
+
+    def __len__(self) -> int:
+        end = len(self.df) if self.limit is None else min(len(self.df), self.start + self.limit)
+        return max(0, end - self.start)
+
+    def __iter__(self) -> Iterator[Dict]:
+        rows = self.df.iloc[self.start:self.start + len(self)].to_dict('records')
+        next_tick = time.perf_counter()
+        for row in rows:
+            if self.interval:
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_tick += self.interval
+            yield row
+
+class _Ema:
+    """pandas ewm(adjust=False) with min_periods, seeded by the first non-NaN value"""
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        if not math.isnan(x):
+            self.value = x if self.count == 0 else self.alpha * x + (1 - self.alpha) * self.value
+            self.count += 1
+        return self.value if self.count >= self.min_periods else math.nan
+
+def _span(window: int, min_periods: Optional[int] = None) -> _Ema:
+    return _Ema(2 / (window + 1), window if min_periods is None else min_periods)
+
+class _Window:
+    """Fixed-size rolling window that reports NaN until it is full of valid values"""
+
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size)
+
+    def push(self, x: float):
+        self.values.append(x)
+
+    def full(self) -> Optional[np.ndarray]:
+        if len(self.values) < self.values.maxlen:
+            return None
+        values = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+        return None if np.isnan(values).any() else values
+
+    def mean(self) -> float:
+        values = self.full()
+        return math.nan if values is None else values.mean()
+
+    def std(self, ddof: int = 1) -> float:
+        values = self.full()
+        return math.nan if values is None else values.std(ddof=ddof)
+
+def _div(a: float, b: float) -> float:
+    # Mirror pandas float division: x/0 is +-inf, 0/0 is NaN
+    if b == 0:
+        return math.nan if a == 0 or math.isnan(a) else math.copysign(math.inf, a) * math.copysign(1, b)
+    return a / b
+
+class StreamingIndicators:
+    """Tick-by-tick version of DataProcessor.add_indicators.
+
+    Exponential indicators are O(1) recurrences and rolling ones only look at a
+    bounded window, so the cost per tick doesn't grow with history. Missing values
+    are forward-filled like the batch version; the backward fill of the warm-up
+    rows can't be reproduced online, so `update` returns None until every
+    indicator has produced a value.
+    """
+
+    def __init__(self):
+        self.t = 0
+        self.prev_price = math.nan
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.vpt = 0.0
+        self.last_valid: Dict[str, float] = {}
+
+        self.price_20 = _Window(20)
+        self.price_50 = _Window(50)
+        self.high_14 = _Window(14)
+        self.low_14 = _Window(14)
+        self.typical_20 = _Window(20)
+        self.stoch_3 = _Window(3)
+        self.returns_20 = _Window(20)
+        self.volume_20 = _Window(20)
+        self.mkt_cap_20 = _Window(20)
+
+        self.ema_12 = _span(12)
+        self.ema_26 = _span(26)
+        self.macd_signal = _span(9)
+        self.volume_ema = _span(20)
+        self.force_ema = _span(13)
+        self.rsi_up = _Ema(1 / 14, 14)
+        self.rsi_down = _Ema(1 / 14, 14)
+
+        # Wilder-smoothed state for ATR and ADX (window 14)
+        self.window = 14
+        self.tr_initial = []
+        self.atr = 0.0
+        self.adx_sums = None  # Running (tr, +dm, -dm) sums
+        self.adx_seed = []
+        self.adx_warmup = [0.0, 0.0, 0.0]
+        self.adx = 0.0
+
+    def _adx_update(self, tr: float, pos: float, neg: float) -> float:
+        w = self.window
+        if self.t == 0:
+            return 0.0
+
+        if self.adx_sums is None:
+            self.adx_warmup = [s + x for s, x in zip(self.adx_warmup, (tr, pos, neg))]
+            if self.t < w:
+                return 0.0
+            self.adx_sums = self.adx_warmup
+        else:
+            self.adx_sums = [s - s / float(w) + x for s, x in zip(self.adx_sums, (tr, pos, neg))]
+
+        trs, dip, din = self.adx_sums
+        di_pos = 100 * (dip / trs) if trs != 0.0 else 0
+        di_neg = 100 * (din / trs) if trs != 0.0 else 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            directional_index = float(100 * np.abs(np.float64(di_pos - di_neg) / np.float64(di_pos + di_neg)))
+
+        if len(self.adx_seed) < w:
+            self.adx_seed.append(directional_index)
+            if len(self.adx_seed) < w:
+                return 0.0
+            self.adx = float(np.mean(self.adx_seed))
+        else:
+            self.adx = ((self.adx * (w - 1)) + directional_index) / float(w)
+        return self.adx
+
+    def _atr_update(self, tr: float) -> float:
+        w = self.window
+        if self.t < w - 1:
+            self.tr_initial.append(tr)
+            return 0.0
+        if self.t == w - 1:
+            self.tr_initial.append(tr)
+            self.atr = float(np.mean(self.tr_initial))
+        else:
+            self.atr = (self.atr * (w - 1) + tr) / float(w)
+        return self.atr
+
+    def update(self, candle: Dict) -> Optional[Dict[str, float]]:
+        """Consume one candle and return its indicator row once warmed up"""
+        price = float(candle['price'])
+        high = float(candle.get('high', price))
+        low = float(candle.get('low', price))
+        volume = float(candle['volume'])
+        market_cap = float(candle['market_cap'])
+        prev_price = self.prev_price
+        row: Dict[str, float] = {}
+
+        # Basic price indicators
+        diff = price - prev_price
+        row['returns'] = price / prev_price - 1
+        row['log_returns'] = math.log(price) - math.log(prev_price) if self.t else math.nan
+
+        # Trend indicators
+        self.price_20.push(price)
+        self.price_50.push(price)
+        sma_20 = self.price_20.mean()
+        row['sma_20'] = sma_20
+        row['sma_50'] = self.price_50.mean()
+        ema_12 = self.ema_12.update(price)
+        ema_26 = self.ema_26.update(price)
+        row['ema_12'] = ema_12
+        row['ema_26'] = ema_26
+
+        # Momentum indicators
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        avg_up = self.rsi_up.update(up)
+        avg_down = self.rsi_down.update(down)
+        row['rsi'] = 100.0 if avg_down == 0 else 100 - (100 / (1 + _div(avg_up, avg_down)))
+
+        self.high_14.push(high)
+        self.low_14.push(low)
+        highs, lows = self.high_14.full(), self.low_14.full()
+        if highs is None or lows is None:
+            stoch = math.nan
+        else:
+            lowest = lows.min()
+            stoch = 100 * _div(price - lowest, highs.max() - lowest)
+        self.stoch_3.push(stoch)
+        row['stoch'] = stoch
+        row['stoch_signal'] = self.stoch_3.mean()
+
+        typical = (high + low + price) / 3.0
+        self.typical_20.push(typical)
+        typicals = self.typical_20.full()
+        if typicals is None:
+            row['cci'] = math.nan
+        else:
+            typical_mean = typicals.mean()
+            mean_deviation = np.mean(np.abs(typicals - np.mean(typicals)))
+            row['cci'] = _div(typical - typical_mean, 0.015 * mean_deviation)
+
+        # True range and directional movement (first tick has no previous close)
+        if self.t:
+            true_range = max(high - low, abs(high - prev_price), abs(low - prev_price))
+            adx_range = max(high, prev_price) - min(low, prev_price)
+            diff_up = high - self.prev_high
+            diff_down = self.prev_low - low
+            pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+            neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+        else:
+            true_range = high - low
+            adx_range = pos = neg = 0.0
+        row['adx'] = self._adx_update(adx_range, abs(pos), abs(neg))
+
+        # MACD
+        macd = ema_12 - ema_26
+        macd_signal = self.macd_signal.update(macd)
+        row['macd'] = macd
+        row['macd_signal'] = macd_signal
+        row['macd_diff'] = macd - macd_signal
+
+        # Volatility indicators
+        band_std = self.price_20.std(ddof=0)
+        band_high = sma_20 + 2 * band_std
+        band_low = sma_20 - 2 * band_std
+        row['bollinger_high'] = band_high
+        row['bollinger_low'] = band_low
+        row['bollinger_mid'] = sma_20
+        row['bollinger_pband'] = _div(price - band_low, band_high - band_low)
+        row['bollinger_wband'] = _div(band_high - band_low, sma_20) * 100
+
+        row['atr'] = self._atr_update(true_range)
+        self.returns_20.push(row['returns'])
+        row['daily_volatility'] = self.returns_20.std(ddof=1)
+
+        # Volume indicators
+        self.volume_20.push(volume)
+        volume_sma = self.volume_20.mean()
+        row['volume_sma_20'] = volume_sma
+        row['volume_ema_20'] = self.volume_ema.update(volume)
+        row['force_index'] = self.force_ema.update(diff * volume)
+        row['ease_of_movement'] = (
+            (high - self.prev_high) + (low - self.prev_low)) * (high - low) / (2 * volume) * 100000000
+        # Cumulative volume-weighted returns, like ta>=0.11
+        if self.t:
+            self.vpt += volume * (diff / prev_price)
+        row['volume_price_trend'] = self.vpt if self.t else math.nan
+
+        # Market cap indicators
+        self.mkt_cap_20.push(market_cap)
+        mkt_cap_sma = self.mkt_cap_20.mean()
+        row['mkt_cap_sma_20'] = mkt_cap_sma
+        row['mkt_cap_ratio'] = _div(market_cap, mkt_cap_sma)
+
+        # Additional derived features
+        row['price_to_sma_20'] = _div(price, sma_20)
+        row['volume_to_sma_20'] = _div(volume, volume_sma)
+
+        self.prev_price, self.prev_high, self.prev_low = price, high, low
+        self.t += 1
+
+        # Forward fill like the batch version
+        for col, value in row.items():
+            if math.isnan(value):
+                row[col] = self.last_valid.get(col, math.nan)
+            else:
+                self.last_valid[col] = value
+
+        if len(self.last_valid) < len(row):
+            return None
+        return row
+
+class SlidingWindowLSTM:
+    """Scores the latest `sequence_length` ticks with one LSTM step per tick.
+
+    SimpleLSTM scores every window from a zero state, so a single carried state
+    would drift from the batch model. Instead one state is kept per window still
+    in flight (a ring of `sequence_length` slots); each tick starts a fresh slot,
+    advances all slots with a single batched step and reads out the slot whose
+    window just completed.
+    """
+
+    def __init__(self, model, sequence_length: int = 10):
+        self.model = model
+        self.sequence_length = sequence_length
+        self.h, self.c = model.init_state(sequence_length)
+        self.ticks = 0
+        # Enough recent inputs to rebuild every in-flight window for another model
+        self.recent = deque(maxlen=sequence_length)
+
+    def _advance(self, features: np.ndarray) -> Optional[float]:
+        slot = self.ticks % self.sequence_length
+        self.h[:, slot] = 0
+        self.c[:, slot] = 0
+
+        x = torch.as_tensor(features, dtype=torch.float32).expand(self.sequence_length, -1).contiguous()
+        with torch.no_grad():
+            probs, (self.h, self.c) = self.model.step(x, (self.h, self.c))
+        self.ticks += 1
+
+        if self.ticks < self.sequence_length:
+            return None
+        return probs[self.ticks % self.sequence_length].item()
+
+    def push(self, features: np.ndarray) -> Optional[float]:
+        self.recent.append(features)
+        return self._advance(features)
+
+    def swap_model(self, model) -> Optional[float]:
+        """
+        Continue with another model by replaying the recent ticks through it
+
+        Returns the new model's score for the window ending at the latest tick, so
+        the last push can be re-scored (e.g. after a rollback).
+        """
+        self.model = model
+        self.h, self.c = model.init_state(self.sequence_length)
+        self.ticks -= len(self.recent)
+        prob = None
+        for features in self.recent:
+            prob = self._advance(features)
+        return prob
+
+class FullWindowScorer:
+    """Scores the latest `sequence_length` ticks with one full forward pass per tick.
+
+    For models without an incremental step (TCN, attention), which compute all
+    time steps of a window in parallel anyway.
+    """
+
+    def __init__(self, model, sequence_length: int = 10):
+        self.model = model
+        self.sequence_length = sequence_length
+        self.recent = deque(maxlen=sequence_length)
+
+    def _score(self) -> Optional[float]:
+        if len(self.recent) < self.sequence_length:
+            return None
+        window = torch.as_tensor(np.stack(self.recent), dtype=torch.float32).unsqueeze(0)
+        with torch.no_grad():
+            return self.model(window).item()
+
+    def push(self, features: np.ndarray) -> Optional[float]:
+        self.recent.append(features)
+        return self._score()
+
+    def swap_model(self, model) -> Optional[float]:
+        self.model = model
+        return self._score()
+
+def window_scorer(model, sequence_length: int = 10, previous=None):
+    """
+    A per-tick window scorer suited to `model`, continuing from `previous`'s recent ticks
+
+    Models with init_state/step get the incremental SlidingWindowLSTM, others are
+    scored on the full window. Returns the scorer and its score for the latest
+    tick (None until a window is complete).
+    """
+    incremental = hasattr(model, 'step')
+    if previous is not None and isinstance(previous, SlidingWindowLSTM) == incremental:
+        return previous, previous.swap_model(model)
+    scorer = SlidingWindowLSTM(model, sequence_length) if incremental else FullWindowScorer(model, sequence_length)
+    prob = None
+    for features in (previous.recent if previous is not None else ()):
+        prob = scorer.push(features)
+    return scorer, prob
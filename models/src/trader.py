@@ -1,7 +1,9 @@
+import weakref
 from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Tuple
+from src.strategies import Strategy, get_strategy, momentum_strategy
 
 @dataclass
 class TradeAction:
@@ -13,6 +15,10 @@ class TradeAction:
     technical_features: Dict[str, float]
 
 class BaseTrader:
+    # Share of cash spent on a buy and share of the position sold on a sell
+    buy_fraction = 0.1
+    sell_fraction = 0.5
+
     def __init__(self, initial_balance: float = 100000):
         self.initial_balance = initial_balance
         self.balance = initial_balance
@@ -47,156 +53,81 @@ class BaseTrader:
             technical_features=features
         ))
 
-class MomentumTrader(BaseTrader):
-    def __init__(self, momentum_window: int = 5, 
-                 buy_threshold: float = 0.02,
-                 sell_threshold: float = -0.01,
-                 initial_balance: float = 10000):
-        super().__init__(initial_balance=initial_balance)
-        self.momentum_window = momentum_window
-        self.buy_threshold = buy_threshold
-        self.sell_threshold = sell_threshold
-        
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
-        if idx < self.momentum_window:
-            return 0, 0
-        
-        price = df['price'].iloc[idx]
-        past_price = df['price'].iloc[idx - self.momentum_window]
-        momentum = (price - past_price) / past_price
-        
-        if momentum > self.buy_threshold:
-            if self.balance <= 0:
-                return 0, 0
-            position_size = (self.balance * 0.1) / price
-            return 1, position_size
-        elif momentum < self.sell_threshold:
-            position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
-            return -1, position_size
-        
-        return 0, 0
+class StrategyTrader(BaseTrader):
+    """Trader driven by a declarative Strategy (see src/strategies.py)"""
 
-class MeanReversionTrader(BaseTrader):
-    def __init__(self, initial_balance: float = 10000):
+    def __init__(self, strategy: Strategy, initial_balance: float = 10000):
         super().__init__(initial_balance=initial_balance)
+        self.strategy = strategy
+        self.buy_fraction = strategy.sizing.buy_fraction
+        self.sell_fraction = strategy.sizing.sell_fraction
+        self._signals = strategy.compile()
+        self._cached_actions = (None, None)  # (weak reference to the frame, its actions)
+
+    @property
+    def name(self) -> str:
+        return self.strategy.name
+
+    def signals(self, data: Dict[str, np.ndarray]) -> np.ndarray:
+        """Vectorized should_trade actions for indicator arrays of shape (..., time)"""
+        return self._signals(data)
+
+    def _actions_for(self, df: pd.DataFrame) -> np.ndarray:
+        # Signals for the whole frame are computed once, should_trade then just looks them up.
+        # A weak reference can't match a new frame that reuses a collected frame's id().
+        frame_ref, actions = self._cached_actions
+        if frame_ref is None or frame_ref() is not df or len(actions) != len(df):
+            data = {c: df[c].to_numpy(dtype=np.float64) for c in ['price'] + self.strategy.columns()}
+            actions = self.signals(data)
+            self._cached_actions = (weakref.ref(df), actions)
+        return actions
 
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:  
-        if idx < 50:
-            return 0, 0
+    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
+        action = self._actions_for(df)[idx]
 
-        price = df['price'].iloc[idx]
-        sma_20 = df['sma_20'].iloc[idx]
-        sma_50 = df['sma_50'].iloc[idx]
-        
-        if price < sma_20 and sma_20 < sma_50:
+        if action == 1:
             if self.balance <= 0:
                 return 0, 0
-            position_size = (self.balance * 0.1) / price
+            position_size = (self.balance * self.buy_fraction) / df['price'].iloc[idx]
             return 1, position_size
-        elif price > sma_20 and sma_20 > sma_50:
+        elif action == -1:
             position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
+            position_size = position * self.sell_fraction if position > 0 else 0
             return -1, position_size
-        
-        return 0, 0
-
-class BreakoutTrader(BaseTrader):
-    def __init__(self, initial_balance: float = 10000):
-        super().__init__(initial_balance=initial_balance)
 
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
-        if idx < 20:
-            return 0, 0
-        
-        price = df['price'].iloc[idx]
-        upper_band = df['bollinger_high'].iloc[idx]
-        lower_band = df['bollinger_low'].iloc[idx]
-        
-        if price > upper_band:
-            if self.balance <= 0:
-                return 0, 0
-            position_size = (self.balance * 0.1) / price
-            return 1, position_size
-        elif price < lower_band:
-            position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
-            return -1, position_size
-        
         return 0, 0
 
-class TrendFollowingTrader(BaseTrader):  
-    def __init__(self, initial_balance: float = 10000):
-        super().__init__(initial_balance=initial_balance)
+class MomentumTrader(StrategyTrader):
+    def __init__(self, momentum_window: int = 5, 
+                 buy_threshold: float = 0.02,
+                 sell_threshold: float = -0.01,
+                 initial_balance: float = 10000):
+        super().__init__(momentum_strategy(momentum_window, buy_threshold, sell_threshold),
+                         initial_balance=initial_balance)
+        self.momentum_window = momentum_window
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
 
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
-        if idx < 26:
-            return 0, 0
-        
-        ema_12 = df['ema_12'].iloc[idx]
-        ema_26 = df['ema_26'].iloc[idx]
-        prev_ema_12 = df['ema_12'].iloc[idx-1] 
-        prev_ema_26 = df['ema_26'].iloc[idx-1]
-        
-        if prev_ema_12 <= prev_ema_26 and ema_12 > ema_26:
-            if self.balance <= 0:
-                return 0, 0
-            position_size = (self.balance * 0.1) / df['price'].iloc[idx] 
-            return 1, position_size
-        elif prev_ema_12 >= prev_ema_26 and ema_12 < ema_26:
-            position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
-            return -1, position_size
-        
-        return 0, 0
-    
-class RSITrader(BaseTrader):
+class MeanReversionTrader(StrategyTrader):
     def __init__(self, initial_balance: float = 10000):
-        super().__init__(initial_balance=initial_balance)
+        super().__init__(get_strategy('mean_reversion_trader'), initial_balance=initial_balance)
 
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
-        if idx < 14:
-            return 0, 0
-        
-        rsi = df['rsi'].iloc[idx]
-        price = df['price'].iloc[idx]
-        
-        if rsi < 30:
-            if self.balance <= 0:
-                return 0, 0
-            position_size = (self.balance * 0.1) / price
-            return 1, position_size
-        elif rsi > 70:
-            position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
-            return -1, position_size
+class BreakoutTrader(StrategyTrader):
+    def __init__(self, initial_balance: float = 10000):
+        super().__init__(get_strategy('breakout_trader'), initial_balance=initial_balance)
 
-        return 0, 0
-    
-class VolumeBasedTrader(BaseTrader):
+class TrendFollowingTrader(StrategyTrader):
     def __init__(self, initial_balance: float = 10000):
-        super().__init__(initial_balance=initial_balance)
+        super().__init__(get_strategy('trend_following_trader'), initial_balance=initial_balance)
 
-    def should_trade(self, coin: str, df, idx: int) -> Tuple[int, float]:
-        if idx < 20:
-            return 0, 0
-        
-        volume = df['volume'].iloc[idx]  
-        volume_sma = df['volume_sma_20'].iloc[idx]
-        price_change = df['price'].iloc[idx] / df['price'].iloc[idx-1] - 1
+class RSITrader(StrategyTrader):
+    def __init__(self, initial_balance: float = 10000):
+        super().__init__(get_strategy('rsi_trader'), initial_balance=initial_balance)
 
-        if volume > volume_sma * 1.5 and price_change > 0:
-            if self.balance <= 0:
-                return 0, 0
-            position_size = (self.balance * 0.1) / df['price'].iloc[idx]
-            return 1, position_size
-        elif volume > volume_sma * 1.5 and price_change < 0:
-            position = self.positions.get(coin, 0)
-            position_size = position * 0.5 if position > 0 else 0
-            return -1, position_size
+class VolumeBasedTrader(StrategyTrader):
+    def __init__(self, initial_balance: float = 10000):
+        super().__init__(get_strategy('volume_trader'), initial_balance=initial_balance)
 
-        return 0, 0
-        
     def generate_trades(self, df: pd.DataFrame, n_trades: int = 50) -> List[Dict]:
         """Generate sample trades based on technical indicators"""
         self.trades = []  # Reset trades
@@ -0,0 +1,71 @@
+import os
+import time
+import pickle
+import argparse
+import warnings
+import pandas as pd
+from src.data_processor import FEATURE_COLS
+from src.model import load_model
+from src.market_sim import MarketSimulator
+from src.backtest import batch_indicators, batch_backtest, evaluate_model_on_paths, summarize_returns
+from src.strategies import load_strategies
+from src.trader import StrategyTrader
+
+def load_global_model(weights_path: str):
+    # Rebuilds whichever architecture the weights were trained with
+    return load_model(weights_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress-test traders and the global model on synthetic markets")
+    parser.add_argument('--paths', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=2160, help="Points per path (hourly by default)")
+    parser.add_argument('--model', default='all', choices=list(MarketSimulator.MODELS) + ['all'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--weights', default='data/global_model_weights1.pth')
+    parser.add_argument('--scaler', default='data/feature_scaler.pkl')
+    parser.add_argument('--strategies', nargs='+', default=None, help="Strategies to test (default: all registered)")
+    parser.add_argument('--strategy-file', default=None, help="JSON file with extra strategy definitions")
+    parser.add_argument('--output', default='data/stress_test_results.csv')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    market_models = MarketSimulator.MODELS if args.model == 'all' else [args.model]
+    simulator = MarketSimulator(seed=args.seed)
+    strategies = load_strategies(args.strategies, path=args.strategy_file)
+
+    global_model, scaler = None, None
+    if os.path.exists(args.weights) and os.path.exists(args.scaler):
+        global_model = load_global_model(args.weights)
+        with open(args.scaler, 'rb') as f:
+            scaler = pickle.load(f)
+    else:
+        print("Global model or scaler not found, skipping model evaluation")
+
+    rows = []
+    for market_model in market_models:
+        start = time.perf_counter()
+        paths = simulator.generate(args.paths, args.steps, market_model)
+        data = batch_indicators(paths)
+        print(f"{market_model}: {args.paths} paths x {args.steps} steps with indicators "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        for name, strategy in strategies.items():
+            result = batch_backtest(StrategyTrader(strategy, initial_balance=100000), data)
+            rows.append({'market': market_model, 'strategy': name,
+                         **summarize_returns(result['total_return'])})
+
+        if global_model is not None:
+            evaluation = evaluate_model_on_paths(global_model, data, FEATURE_COLS,
+                                                 scaler.mean_, scaler.scale_)
+            rows.append({'market': market_model, 'strategy': 'GlobalModel',
+                         **summarize_returns(evaluation['total_return'].values),
+                         'accuracy': evaluation['accuracy'].mean()})
+
+    results = pd.DataFrame(rows)
+    print("\nReturn distribution (%) per market model and strategy:")
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    results.to_csv(args.output, index=False)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
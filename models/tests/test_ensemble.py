@@ -0,0 +1,51 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.ensemble import LSTMEnsemble
+from src.model import SimpleLSTM
+
+def make_models(n=3, input_size=6, num_layers=2):
+    torch.manual_seed(0)
+    return [SimpleLSTM(input_size, hidden_size=16, num_layers=num_layers).eval() for _ in range(n)]
+
+@pytest.mark.parametrize('num_layers', [1, 2, 3])
+def test_member_probs_match_separate_forwards(num_layers):
+    models = make_models(num_layers=num_layers)
+    ensemble = LSTMEnsemble.from_models(models)
+    x = torch.randn(8, 10, 6, generator=torch.Generator().manual_seed(1))
+    with torch.no_grad():
+        expected = torch.stack([model(x).squeeze(-1) for model in models])
+        assert torch.allclose(ensemble.member_probs(x), expected, atol=1e-6)
+
+@pytest.mark.parametrize('combine', ['mean', 'weighted', 'median'])
+def test_forward_combines_member_probs(combine):
+    models = make_models()
+    weights = [1.0, 2.0, 5.0]
+    ensemble = LSTMEnsemble.from_models(models, combine=combine, weights=weights)
+    x = torch.randn(8, 10, 6, generator=torch.Generator().manual_seed(2))
+    with torch.no_grad():
+        probs = torch.stack([model(x).squeeze(-1) for model in models])
+        expected = {
+            'mean': probs.mean(dim=0),
+            'weighted': (torch.tensor(weights) / sum(weights)) @ probs,
+            'median': probs.median(dim=0).values
+        }[combine]
+        assert torch.allclose(ensemble(x), expected.unsqueeze(-1), atol=1e-6)
+
+def test_step_matches_separate_steps():
+    models = make_models()
+    ensemble = LSTMEnsemble.from_models(models)
+    x = torch.randn(4, 10, 6, generator=torch.Generator().manual_seed(3))
+    with torch.no_grad():
+        state = ensemble.init_state(4)
+        member_states = [model.init_state(4) for model in models]
+        for t in range(x.shape[1]):
+            probs, state = ensemble.step(x[:, t], state)
+            member_probs = []
+            for i, model in enumerate(models):
+                prob, member_states[i] = model.step(x[:, t], member_states[i])
+                member_probs.append(prob)
+            assert torch.allclose(probs, torch.stack(member_probs).mean(dim=0), atol=1e-6)
+        # After a full window the step path equals the batch forward
+        assert torch.allclose(probs, ensemble(x), atol=1e-6)
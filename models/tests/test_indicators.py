@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("ta")
+pytest.importorskip("pycoingecko")
+
+from src.data_processor import DataProcessor
+from src.indicators import INDICATOR_COLS, add_indicators_fused
+from src.market_sim import MarketConfig, MarketSimulator
+from src.resample import resample_ohlcv
+
+def assert_columns_match(expected, actual):
+    for col in INDICATOR_COLS:
+        a, b = actual[col].to_numpy(), expected[col].to_numpy()
+        # Floored at a share of the column's scale, for values that cross zero (MACD histogram, CCI)
+        scale = np.nanmax(np.abs(b)) if not np.isnan(b).all() else 1.0
+        assert np.allclose(a, b, rtol=1e-6, atol=scale * 1e-6, equal_nan=True), col
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_fused_matches_ta(seed):
+    df = DataProcessor.create_sample_data(days=500, seed=seed)
+    assert_columns_match(DataProcessor.add_indicators_ta(df.copy()), add_indicators_fused(df.copy()))
+
+def test_fused_matches_ta_on_bars():
+    # Resampled bars carry real highs and lows
+    paths = MarketSimulator(MarketConfig(), seed=0).generate(n_paths=1, n_steps=2000)
+    bars = resample_ohlcv(MarketSimulator.to_frame(paths), '4h')
+    assert_columns_match(DataProcessor.add_indicators_ta(bars.copy()), add_indicators_fused(bars.copy()))
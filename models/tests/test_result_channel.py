@@ -0,0 +1,27 @@
+import json
+import os
+import numpy as np
+from src.result_channel import ResultStore, ResultWriter, encode_frame, read_frames
+
+def test_non_finite_floats_are_encoded_as_null():
+    frame = encode_frame('trade', {'predicted_prob': float('nan'), 'price': np.float64(np.inf),
+                                   'positions': {'bitcoin': -np.inf}, 'history': [1.0, float('nan')]})
+    body = json.loads(frame[4:])  # Strict parsers (JSON.parse) reject NaN tokens
+    assert body['data'] == {'predicted_prob': None, 'price': None, 'positions': {'bitcoin': None},
+                            'history': [1.0, None]}
+
+def test_records_round_trip_through_a_pipe():
+    read_fd, write_fd = os.pipe()
+    writer = ResultWriter(write_fd)
+    writer.publish('run_started', {'mode': 'batch'})
+    for day in range(3):
+        writer.publish('trade', {'day': day, 'price': np.float64(100.0 + day), 'predicted_prob': float('nan')})
+    writer.publish('run_finished', {'decisions': 3})
+    writer.close()
+
+    store = ResultStore()
+    store.consume(read_fd)
+    page = store.page(offset=1, limit=5)
+    assert page['total'] == 3
+    assert [record['day'] for record in page['records']] == [1, 2]
+    assert page['status'] == {'running': False, 'mode': 'batch', 'decisions': 3}
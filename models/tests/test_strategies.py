@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.indicators import add_indicators_fused
+from src.market_sim import MarketConfig, MarketSimulator
+from src.strategies import col, compile_exprs, parse, pct_change
+from src.trader import (BreakoutTrader, MeanReversionTrader, MomentumTrader, RSITrader, TrendFollowingTrader,
+                        VolumeBasedTrader)
+
+# Row-by-row rules of the hand-written traders the strategies replaced: (warmup, action at idx)
+def momentum(df, idx):
+    momentum = (df['price'][idx] - df['price'][idx - 5]) / df['price'][idx - 5]
+    return 1 if momentum > 0.02 else -1 if momentum < -0.01 else 0
+
+def mean_reversion(df, idx):
+    price, sma_20, sma_50 = df['price'][idx], df['sma_20'][idx], df['sma_50'][idx]
+    return 1 if price < sma_20 and sma_20 < sma_50 else -1 if price > sma_20 and sma_20 > sma_50 else 0
+
+def breakout(df, idx):
+    price = df['price'][idx]
+    return 1 if price > df['bollinger_high'][idx] else -1 if price < df['bollinger_low'][idx] else 0
+
+def trend_following(df, idx):
+    ema_12, ema_26 = df['ema_12'][idx], df['ema_26'][idx]
+    prev_ema_12, prev_ema_26 = df['ema_12'][idx - 1], df['ema_26'][idx - 1]
+    if prev_ema_12 <= prev_ema_26 and ema_12 > ema_26:
+        return 1
+    return -1 if prev_ema_12 >= prev_ema_26 and ema_12 < ema_26 else 0
+
+def rsi(df, idx):
+    return 1 if df['rsi'][idx] < 30 else -1 if df['rsi'][idx] > 70 else 0
+
+def volume(df, idx):
+    spike = df['volume'][idx] > df['volume_sma_20'][idx] * 1.5
+    price_change = df['price'][idx] / df['price'][idx - 1] - 1
+    return 1 if spike and price_change > 0 else -1 if spike and price_change < 0 else 0
+
+REFERENCES = [
+    (MomentumTrader, 5, momentum),
+    (MeanReversionTrader, 50, mean_reversion),
+    (BreakoutTrader, 20, breakout),
+    (TrendFollowingTrader, 26, trend_following),
+    (RSITrader, 14, rsi),
+    (VolumeBasedTrader, 20, volume),
+]
+
+@pytest.fixture(scope='module', params=[0, 1])
+def data(request):
+    paths = MarketSimulator(MarketConfig(), seed=request.param).generate(n_paths=1, n_steps=1000)
+    df = add_indicators_fused(MarketSimulator.to_frame(paths))
+    return {c: df[c].to_numpy() for c in df.columns if c != 'timestamp'}
+
+@pytest.mark.parametrize('trader_cls, warmup, rule', REFERENCES, ids=[r[0].__name__ for r in REFERENCES])
+def test_signals_match_hand_written_traders(data, trader_cls, warmup, rule):
+    expected = np.array([0 if idx < warmup else rule(data, idx) for idx in range(len(data['price']))])
+    actions = trader_cls().signals(data)
+    assert np.array_equal(actions, expected)
+    # Signals of stacked paths are computed per path
+    stacked = trader_cls().signals({c: np.stack([v, v]) for c, v in data.items()})
+    assert np.array_equal(stacked, np.stack([expected, expected]))
+
+def test_parsed_rules_match_builders(data):
+    price = col('price')
+    cases = [
+        ("price < sma_20 and sma_20 < sma_50", (price < col('sma_20')) & (col('sma_20') < col('sma_50'))),
+        ("sma_50 > sma_20 > price", (col('sma_50') > col('sma_20')) & (col('sma_20') > price)),
+        ("pct_change(price, 5) > 0.02", pct_change(price, 5) > 0.02),
+        ("pct_change(price, periods=5) > 0.02", pct_change(price, 5) > 0.02),
+        ("not crosses_above(ema_12, ema_26)", ~((col('ema_12').shift(1) <= col('ema_26').shift(1))
+                                                & (col('ema_12') > col('ema_26')))),
+    ]
+    for text, built in cases:
+        parsed_values, built_values = compile_exprs([parse(text), built])(data)
+        assert np.array_equal(parsed_values, built_values), text
+
+@pytest.mark.parametrize('text', ["shift(price, window=2)", "shift(price, **kwargs)", "__import__('os')"])
+def test_parse_rejects_bad_rules(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+@pytest.mark.parametrize('periods', [0, -1, 1.5])
+def test_shift_rejects_non_positive_periods(periods):
+    with pytest.raises(ValueError):
+        col('price').shift(periods)
+    with pytest.raises(ValueError):
+        parse(f"shift(price, {periods})")
+
+def test_should_trade_recomputes_signals_for_a_new_frame(data):
+    trader = RSITrader()
+    df = pd.DataFrame(data)
+    first = [trader.should_trade('bitcoin', df, idx)[0] for idx in range(len(df))]
+    # Same length and possibly the same id() once the old frame is gone
+    del df
+    flipped = pd.DataFrame({**data, 'rsi': 100 - data['rsi']})
+    second = [trader.should_trade('bitcoin', flipped, idx)[0] for idx in range(len(flipped))]
+    assert np.array_equal(second, trader.signals({c: flipped[c].to_numpy() for c in flipped}))
+    assert first != second
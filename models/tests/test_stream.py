@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ta")
+pytest.importorskip("pycoingecko")
+
+from src.data_processor import DataProcessor
+from src.indicators import INDICATOR_COLS
+from src.model import SimpleLSTM
+from src.stream import SlidingWindowLSTM, StreamingIndicators
+
+def test_streaming_indicators_match_batch():
+    df = DataProcessor.create_sample_data(days=300)
+    batch = DataProcessor.add_indicators(df.copy())
+
+    indicators = StreamingIndicators()
+    rows = {i: indicators.update(candle) for i, candle in enumerate(df.to_dict('records'))}
+    # Warm-up rows are backfilled in the batch version and withheld by the stream
+    warm = [i for i, row in rows.items() if row is not None]
+    assert warm and warm[-1] == len(df) - 1
+
+    streamed = pd.DataFrame([rows[i] for i in warm], index=warm)
+    assert set(INDICATOR_COLS) <= set(streamed.columns)
+    assert np.allclose(streamed[INDICATOR_COLS].to_numpy(), batch.loc[warm, INDICATOR_COLS].to_numpy(),
+                       rtol=1e-6, atol=1e-8)
+
+def test_sliding_window_lstm_matches_batch_forward():
+    torch.manual_seed(0)
+    model = SimpleLSTM(input_size=6).eval()
+    features = np.random.default_rng(0).standard_normal((40, 6)).astype(np.float32)
+
+    scorer = SlidingWindowLSTM(model, sequence_length=10)
+    streamed = [scorer.push(row) for row in features]
+    windows = np.lib.stride_tricks.sliding_window_view(features, 10, axis=0).transpose(0, 2, 1)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(np.ascontiguousarray(windows))).squeeze(1)
+
+    assert streamed[:9] == [None] * 9
+    assert torch.allclose(torch.tensor(streamed[9:]), expected, atol=1e-6)
+
+def test_sliding_window_lstm_swap_model_rescores_latest_window():
+    torch.manual_seed(0)
+    first, second = SimpleLSTM(input_size=6).eval(), SimpleLSTM(input_size=6).eval()
+    features = np.random.default_rng(1).standard_normal((15, 6)).astype(np.float32)
+
+    scorer = SlidingWindowLSTM(first, sequence_length=10)
+    for row in features:
+        scorer.push(row)
+    with torch.no_grad():
+        expected = second(torch.from_numpy(features[None, -10:])).item()
+    assert np.isclose(scorer.swap_model(second), expected, atol=1e-6)